@@ -0,0 +1,79 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_build_placemarks.py
+#
+"""
+Compares building Placemarks from columns of values with
+pykml.factory.build_placemarks and placemarks_to_bytes against nesting
+KML_ElementMaker calls for each Placemark.
+
+Usage: python benchmarks/bench_build_placemarks.py [FEATURES]
+"""
+import random
+import sys
+import time
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.factory import build_placemarks
+from pykml.factory import placemarks_to_bytes
+
+
+def make_columns(features):
+    random.seed(0)
+    return dict(
+        names=[f'feature {i}' for i in range(features)],
+        coordinates=[(round(random.uniform(-180, 180), 6),
+                      round(random.uniform(-90, 90), 6))
+                     for _ in range(features)],
+        style_urls=['#style%d' % (i % 10) for i in range(features)],
+        extended_data=[{'index': i, 'category': 'abc'[i % 3]}
+                       for i in range(features)],
+    )
+
+
+def build_with_element_maker(names, coordinates, style_urls, extended_data):
+    return [
+        KML.Placemark(
+            KML.name(name),
+            KML.styleUrl(style_url),
+            KML.ExtendedData(*[
+                KML.Data(KML.value(value), name=key)
+                for key, value in data.items()
+            ]),
+            KML.Point(KML.coordinates('%s,%s' % coords)),
+        )
+        for name, coords, style_url, data in zip(
+            names, coordinates, style_urls, extended_data)
+    ]
+
+
+def timed(label, features, func):
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    print(f'{label:36} {seconds:8.3f}s {features / seconds:12.0f} features/s')
+    return result
+
+
+def main(features=1000000):
+    columns = make_columns(features)
+    print(f'{features} features')
+    placemarks = timed('KML_ElementMaker', features,
+                       lambda: build_with_element_maker(**columns))
+    expected = b''.join(etree.tostring(pm) for pm in placemarks[:100])
+    del placemarks
+
+    placemarks = timed('build_placemarks', features,
+                       lambda: build_placemarks(**columns))
+    assert b''.join(etree.tostring(pm) for pm in placemarks[:100]) == expected
+    del placemarks
+
+    timed('placemarks_to_bytes', features,
+          lambda: placemarks_to_bytes(**columns))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
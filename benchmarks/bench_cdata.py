@@ -0,0 +1,110 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_cdata.py
+#
+"""
+Compares the time and peak memory of writing a parsed KML document with
+CDATA sections:
+
+- reparse: the previous format_xml_with_cdata, which serialized and
+  re-parsed the whole document before adding the CDATA sections
+- copy: format_xml_with_cdata, which modifies a copy of the document
+- in_place: format_xml_with_cdata(inplace=True), which modifies the parsed
+  document
+- streaming: write_xml_with_cdata, which swaps in CDATA copies of the
+  elements while writing
+
+Each variant runs in a separate process so that its peak resident memory
+can be measured.
+
+Usage: python benchmarks/bench_cdata.py [SIZE_MB]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from pykml.parser import parse
+from pykml.util import format_xml_with_cdata
+from pykml.util import write_xml_with_cdata
+
+
+def format_xml_with_cdata_reparse(
+        obj,
+        cdata_elements=('description', 'text', 'linkDescription', 'displayName',)):
+    """The previous implementation of format_xml_with_cdata"""
+    root = etree.fromstring(etree.tostring(etree.ElementTree(obj)))
+    xpath = '|'.join('//kml:' + tag for tag in cdata_elements)
+    results = root.xpath(xpath, namespaces={'kml': 'http://www.opengis.net/kml/2.2'})
+    for element in results:
+        element.text = etree.CDATA(element.text)
+    return root
+
+
+def make_document(path, size_mb):
+    placemark = (
+        '<Placemark><name>Placemark {0}</name>'
+        '<description>&lt;b&gt;Placemark&lt;/b&gt; number {0}</description>'
+        '<Point><coordinates>-122.{0},37.{0},0</coordinates></Point>'
+        '</Placemark>\n'
+    )
+    with open(path, 'w') as f:
+        f.write('<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n')
+        i = 0
+        while f.tell() < size_mb * 1e6:
+            f.write(placemark.format(i))
+            i += 1
+        f.write('</Document></kml>\n')
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_variant(variant, path):
+    with open(path, 'rb') as f:
+        doc = parse(f).getroot()
+    parsed_rss = max_rss_mb()
+
+    start = time.perf_counter()
+    with open(os.devnull, 'wb') as output:
+        if variant == 'reparse':
+            root = format_xml_with_cdata_reparse(doc)
+            output.write(etree.tostring(root, encoding='utf-8', xml_declaration=True))
+        elif variant == 'copy':
+            root = format_xml_with_cdata(doc)
+            etree.ElementTree(root).write(output, encoding='utf-8', xml_declaration=True)
+        elif variant == 'in_place':
+            root = format_xml_with_cdata(doc, inplace=True)
+            etree.ElementTree(root).write(output, encoding='utf-8', xml_declaration=True)
+        else:
+            write_xml_with_cdata(doc, output)
+    elapsed = time.perf_counter() - start
+
+    print(f'{variant:10} {elapsed:8.2f}s {parsed_rss:10.0f}MB {max_rss_mb():10.0f}MB')
+
+
+def main(size_mb=50):
+    fd, path = tempfile.mkstemp(suffix='.kml')
+    os.close(fd)
+    try:
+        make_document(path, size_mb)
+        print(f'document size {os.path.getsize(path) / 1e6:.0f}MB')
+        print(f'{"variant":10} {"time":>9} {"rss parsed":>12} {"rss peak":>12}')
+        for variant in ('reparse', 'copy', 'in_place', 'streaming'):
+            subprocess.run([sys.executable, __file__, '--variant', variant, path],
+                           check=True)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--variant']:
+        run_variant(sys.argv[2], sys.argv[3])
+    else:
+        main(*[int(arg) for arg in sys.argv[1:]])
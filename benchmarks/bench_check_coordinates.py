@@ -0,0 +1,56 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_check_coordinates.py
+#
+"""
+Compares check_coordinates with parsing and validating a generated document
+against the XML Schema, for a valid document and for documents with out of
+range coordinates in their first and in their last placemark.
+
+Usage: python benchmarks/bench_check_coordinates.py [PLACEMARKS]
+"""
+import sys
+import time
+from io import BytesIO
+
+from pykml.parser import Schema
+from pykml.parser import check_coordinates
+from pykml.parser import parse
+
+
+def make_document(count, error=None):
+    placemarks = [
+        f'<Placemark id="p{i}"><name>placemark {i}</name><visibility>1</visibility>'
+        f'<LineString><coordinates>{i % 360 - 180},{i % 180 - 90},0 '
+        f'{i % 360 - 179},{i % 180 - 89},0</coordinates></LineString>'
+        f'</Placemark>'
+        for i in range(count)
+    ]
+    if error is not None:
+        placemarks[error] = placemarks[error].replace('<coordinates>', '<coordinates>200,0 ')
+    return ('<kml xmlns="http://www.opengis.net/kml/2.2"><Document>'
+            + ''.join(placemarks) + '</Document></kml>').encode()
+
+
+def timed(function):
+    start = time.perf_counter()
+    try:
+        function()
+    except ValueError:
+        pass
+    return time.perf_counter() - start
+
+
+def main(count=100000):
+    schema = Schema('kml22gx.xsd')
+    print(f'{"document":12} {"coordinates":>12} {"schema":>12}')
+    for label, error in (('valid', None), ('first', 0), ('last', count - 1)):
+        data = make_document(count, error)
+        checked = timed(lambda: check_coordinates(BytesIO(data)))
+        validated = timed(lambda: schema.assertValid(parse(BytesIO(data))))
+        print(f'{label:12} {checked * 1e3:10.1f}ms {validated * 1e3:10.1f}ms')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,91 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_columnar.py
+#
+"""
+Compares pykml.columnar.iter_record_batches with building the same columns by
+looping over the objectify Placemarks of a parsed document, for a document
+of Points with a TimeStamp and ExtendedData.
+
+Usage: python benchmarks/bench_columnar.py [PLACEMARKS]
+"""
+import random
+import sys
+import time
+from io import BytesIO
+
+import numpy
+from lxml import etree
+
+from pykml.columnar import iter_record_batches
+from pykml.factory import KML_ElementMaker as KML
+from pykml.parser import fromstring
+
+
+def objectify_columns(doc):
+    """Builds the columns with objectify attribute access"""
+    names, lon, lat, alt, when, values = [], [], [], [], [], []
+    for placemark in doc.Document.Placemark:
+        names.append(str(placemark.name))
+        x, y, z = map(float, str(placemark.Point.coordinates).split(','))
+        lon.append(x)
+        lat.append(y)
+        alt.append(z)
+        when.append(numpy.datetime64(str(placemark.TimeStamp.when)[:-1], 'ms'))
+        for data in placemark.ExtendedData.Data:
+            if data.get('name') == 'value':
+                values.append(float(data.value))
+    return {
+        'name': numpy.array(names, dtype=object),
+        'longitude': numpy.array(lon),
+        'latitude': numpy.array(lat),
+        'altitude': numpy.array(alt),
+        'when': numpy.array(when, dtype='datetime64[ms]'),
+        'value': numpy.array(values),
+    }
+
+
+def make_document(placemarks):
+    random.seed(0)
+    return etree.tostring(KML.kml(KML.Document(*[
+        KML.Placemark(
+            KML.name(f'Placemark {i}'),
+            KML.TimeStamp(KML.when(f'2020-01-01T00:00:{i % 60:02d}Z')),
+            KML.ExtendedData(KML.Data(KML.value(repr(random.random())), name='value')),
+            KML.Point(KML.coordinates(
+                f'{random.uniform(-180, 180)!r},{random.uniform(-90, 90)!r},0')),
+        )
+        for i in range(placemarks)
+    ])))
+
+
+def main(placemarks=100000):
+    data = make_document(placemarks)
+    doc = fromstring(data)
+    print(f'{placemarks} placemarks, {len(data) / 1e6:.1f} MB')
+
+    start = time.perf_counter()
+    expected = objectify_columns(doc)
+    elapsed = time.perf_counter() - start
+    print(f'{"objectify loop":26} {elapsed:8.3f}s {placemarks / elapsed:12.0f} placemarks/s')
+
+    start = time.perf_counter()
+    columns, = iter_record_batches(doc, batch_size=placemarks)
+    elapsed = time.perf_counter() - start
+    print(f'{"iter_record_batches":26} {elapsed:8.3f}s {placemarks / elapsed:12.0f} placemarks/s')
+
+    start = time.perf_counter()
+    for _ in iter_record_batches(BytesIO(data)):
+        pass
+    elapsed = time.perf_counter() - start
+    print(f'{"iter_record_batches, file":26} {elapsed:8.3f}s {placemarks / elapsed:12.0f} placemarks/s')
+
+    print('identical columns:', all(
+        (columns[name] == values).all() for name, values in expected.items()
+        if name != 'value'
+    ) and (columns['value'].astype(float) == expected['value']).all())
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
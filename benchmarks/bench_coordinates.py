@@ -0,0 +1,98 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_coordinates.py
+#
+"""
+Compares pykml.geometry.parse_coordinates with the previous implementation,
+which counted the commas of every tuple before parsing, on coordinate
+strings separated by single spaces and by mixed whitespace, and times the
+other users of the coordinate tokenizer: WKT conversion and
+set_max_decimal_places.
+
+Usage: python benchmarks/bench_coordinates.py [VERTICES]
+"""
+import random
+import sys
+import time
+from array import array
+from operator import methodcaller
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.geometry import parse_coordinates
+from pykml.helpers import set_max_decimal_places
+from pykml.parser import fromstring
+from pykml.util import to_wkt_list
+
+_count_commas = methodcaller('count', ',')
+
+
+def parse_coordinates_split(text):
+    """The previous implementation, without error reporting"""
+    tuples = text.split()
+    sizes = set(map(_count_commas, tuples))
+    if len(sizes) == 1:
+        size = sizes.pop() + 1
+        values = array('d', map(float, text.replace(',', ' ').split()))
+        if size == 3 and len(values) == 3 * len(tuples):
+            return values
+        if size == 2 and len(values) == 2 * len(tuples):
+            coords = array('d', bytes(24 * len(tuples)))
+            coords[0::3] = values[0::2]
+            coords[1::3] = values[1::2]
+            return coords
+
+    coords = array('d', bytes(24 * len(tuples)))
+    for i, t in enumerate(tuples):
+        values = t.split(',')
+        if not 2 <= len(values) <= 3:
+            raise ValueError(f'invalid coordinate tuple: {t!r}')
+        coords[3 * i:3 * i + len(values)] = array('d', map(float, values))
+    return coords
+
+
+def make_coordinates(vertices, separators):
+    random.seed(0)
+    return ''.join(
+        f'{random.uniform(-180, 180):.6f},'
+        f'{random.uniform(-90, 90):.6f},'
+        f'{random.uniform(0, 1000):.1f}{random.choice(separators)}'
+        for _ in range(vertices)
+    )
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main(vertices=200000, vertices_per_line=1000):
+    numbers = 3 * vertices
+    for label, separators in (('single spaces', [' ']),
+                              ('mixed whitespace', [' ', '\n', '\t\t', ' \r\n  '])):
+        texts = [make_coordinates(vertices_per_line, separators)
+                 for _ in range(vertices // vertices_per_line)]
+        print(f'{vertices} vertices, {label}')
+        results = []
+        for name, func in (('split and count commas', parse_coordinates_split),
+                           ('parse_coordinates', parse_coordinates)):
+            elapsed, coords = timed(lambda: [func(text) for text in texts])
+            results.append(coords)
+            print(f'  {name:24} {elapsed:8.3f}s {numbers / elapsed / 1e6:8.2f}M numbers/s')
+        print('  identical output:', results[0] == results[1])
+
+        data = etree.tostring(KML.kml(KML.Document(*[
+            KML.Placemark(KML.LineString(KML.coordinates(text))) for text in texts
+        ])))
+        elapsed, _ = timed(to_wkt_list, fromstring(data))
+        print(f'  {"to_wkt_list":24} {elapsed:8.3f}s {numbers / elapsed / 1e6:8.2f}M numbers/s')
+        elapsed, _ = timed(set_max_decimal_places, fromstring(data),
+                           {'longitude': 4, 'latitude': 4, 'altitude': 0})
+        print(f'  {"set_max_decimal_places":24} {elapsed:8.3f}s {numbers / elapsed / 1e6:8.2f}M numbers/s')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,87 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_count_elements.py
+#
+"""
+Compares pykml.util.count_elements with the previous implementation, which
+matched a regular expression against the tag of every element, on a parsed
+document and when reading the file incrementally.
+
+Usage: python benchmarks/bench_count_elements.py [PLACEMARKS]
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.parser import parse
+from pykml.util import count_elements
+from pykml.util import element_statistics
+
+
+def count_elements_regex(doc):
+    """The regular expression based implementation"""
+    summary = {}
+    for el in doc.iter():
+        try:
+            namespace, element_name = re.search('^{(.+)}(.+)$', el.tag).groups()
+        except:
+            namespace = None
+            element_name = el.tag
+        if namespace not in summary:
+            summary[namespace] = {}
+        if element_name not in summary[namespace]:
+            summary[namespace][element_name] = 1
+        else:
+            summary[namespace][element_name] += 1
+    return summary
+
+
+def make_document(placemarks):
+    return KML.kml(KML.Document(*[
+        KML.Placemark(
+            KML.name(f'placemark {i}'),
+            KML.styleUrl('#style'),
+            KML.ExtendedData(KML.Data(KML.value(str(i)), name='index')),
+            KML.Point(KML.coordinates(f'{i % 360 - 180},{i % 180 - 90}')),
+            id=f'pm{i}',
+        )
+        for i in range(placemarks)
+    ]))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main(placemarks=200000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.kml')
+        etree.ElementTree(make_document(placemarks)).write(path)
+        with open(path, 'rb') as f:
+            doc = parse(f)
+        elements = sum(1 for _ in doc.iter())
+
+        seconds, expected = timed(count_elements_regex, doc)
+        print(f'{elements} elements')
+        print(f'{"regex, parsed document":40} {seconds:8.3f}s')
+        seconds, result = timed(count_elements, doc)
+        assert result == expected
+        print(f'{"count_elements, parsed document":40} {seconds:8.3f}s')
+        seconds, result = timed(count_elements, path)
+        assert result == expected
+        print(f'{"count_elements, streamed file":40} {seconds:8.3f}s')
+        seconds, _ = timed(lambda: element_statistics(
+            path, text_bytes=True, attributes=True, depths=True))
+        print(f'{"all statistics, streamed file":40} {seconds:8.3f}s')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
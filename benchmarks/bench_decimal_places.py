@@ -0,0 +1,81 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_decimal_places.py
+#
+"""
+Compares pykml.helpers.set_max_decimal_places with the previous
+implementation, which walked the document once per coordinate component and
+rounded each value with Decimal.quantize.
+
+Usage: python benchmarks/bench_decimal_places.py [VERTICES]
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.helpers import set_max_decimal_places
+from pykml.parser import fromstring
+
+MAX_DECIMALS = {'longitude': 6, 'latitude': 6, 'altitude': 1}
+
+
+def set_max_decimal_places_decimal(doc, max_decimals):
+    """The Decimal based implementation, for coordinate strings only"""
+
+    def replace_delimited_string_member(delimited_str, separator, index_no_, q):
+        values = delimited_str.split(separator)
+        values[index_no_] = str(Decimal(values[index_no_]).quantize(q))
+        return separator.join(values)
+
+    for index_no, data_type in enumerate(('longitude', 'latitude', 'altitude')):
+        if data_type not in max_decimals:
+            continue
+        q = Decimal(10) ** -max_decimals[data_type]
+        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}coordinates'):
+            vertex_str_list = []
+            for vertex in el.text.strip().split(' '):
+                vertex_str_list.append(
+                    replace_delimited_string_member(vertex, ',', index_no, q)
+                )
+            el_new = KML.coordinates(' '.join(vertex_str_list).strip())
+            el.getparent().replace(el, el_new)
+
+
+def make_document(vertices, vertices_per_line=1000):
+    random.seed(0)
+    placemarks = []
+    for start in range(0, vertices, vertices_per_line):
+        coordinates = ' '.join(
+            f'{random.uniform(-180, 180)!r},'
+            f'{random.uniform(-90, 90)!r},'
+            f'{random.uniform(0, 1000)!r}'
+            for _ in range(min(vertices_per_line, vertices - start))
+        )
+        placemarks.append(KML.Placemark(KML.LineString(KML.coordinates(coordinates))))
+    return etree.tostring(KML.kml(KML.Document(*placemarks)))
+
+
+def main(vertices=200000):
+    data = make_document(vertices)
+    print(f'{vertices} vertices, {len(data) / 1e6:.1f} MB')
+
+    results = []
+    for name, func in (('Decimal, one pass per component', set_max_decimal_places_decimal),
+                       ('set_max_decimal_places', set_max_decimal_places)):
+        doc = fromstring(data)
+        start = time.perf_counter()
+        func(doc, MAX_DECIMALS)
+        elapsed = time.perf_counter() - start
+        results.append(etree.tostring(doc))
+        print(f'{name:34} {elapsed:8.3f}s {vertices / elapsed:12.0f} vertices/s')
+
+    print('identical output:', results[0] == results[1])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
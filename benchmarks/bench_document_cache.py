@@ -0,0 +1,63 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_document_cache.py
+#
+"""
+Compares parsing a style file again on every request with
+pykml.parser.parse and with a pykml.parser.DocumentCache, keyed by
+modification time and by content hash, with and without schema validation.
+
+Usage: python benchmarks/bench_document_cache.py [STYLES] [REQUESTS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.parser import DocumentCache
+from pykml.parser import Schema
+from pykml.parser import parse
+
+
+def make_document(styles):
+    return KML.kml(KML.Document(*[
+        KML.Style(
+            KML.IconStyle(KML.scale('1.2'), KML.Icon(KML.href(f'icon{i}.png'))),
+            KML.LineStyle(KML.color('ff0000ff'), KML.width('2')),
+            id=f'style{i}',
+        )
+        for i in range(styles)
+    ]))
+
+
+def timed(func, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - start) / requests
+
+
+def main(styles=2000, requests=50):
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, 'styles.kml')
+        with open(path, 'wb') as f:
+            f.write(etree.tostring(make_document(styles)))
+        print(f'{styles} styles, {os.path.getsize(path) / 1e3:.0f} kB')
+        for schema in (None, Schema('ogckml22.xsd')):
+            label = 'validated' if schema else 'not validated'
+            print(f'{label}:')
+            elapsed = timed(lambda: parse(path, schema), requests)
+            print(f'  parse:          {elapsed * 1e3:8.2f} ms')
+            for key in ('mtime', 'hash'):
+                cache = DocumentCache(key=key)
+                elapsed = timed(lambda: cache.parse(path, schema), requests)
+                print(f'  cache ({key}):{" " * (6 - len(key))} {elapsed * 1e3:8.2f} ms  '
+                      f'{cache.cache_info()}')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
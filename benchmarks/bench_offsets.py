@@ -0,0 +1,73 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_offsets.py
+#
+"""
+Measures pykml.offsets.OffsetIndex on a generated file of Points: the time
+to build the index, to look up a Placemark by id compared with searching the
+file with pykml.parser.iterparse, and to update the index after Placemarks
+are appended to the file.
+
+Usage: python benchmarks/bench_offsets.py [PLACEMARKS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pykml.offsets import OffsetIndex
+from pykml.parser import iterparse
+
+HEAD = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        b'<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n')
+TAIL = b'</Document></kml>\n'
+
+
+def placemark(i):
+    return (f'<Placemark id="p{i}"><name>point {i}</name>'
+            f'<Point><coordinates>{i % 360 - 180},{i % 180 - 90}</coordinates></Point>'
+            '</Placemark>\n').encode()
+
+
+def write(path, placemarks):
+    with open(path, 'wb') as f:
+        f.write(HEAD + b''.join(map(placemark, range(placemarks))) + TAIL)
+
+
+def main(placemarks=200000):
+    with tempfile.TemporaryDirectory() as tempdir:
+        path = os.path.join(tempdir, 'doc.kml')
+        write(path, placemarks)
+        print(f'{placemarks} placemarks, {os.path.getsize(path) / 1e6:.1f} MB')
+
+        start = time.perf_counter()
+        index = OffsetIndex(path)
+        print(f'build index:       {time.perf_counter() - start:8.3f} s')
+
+        start = time.perf_counter()
+        OffsetIndex(path)
+        print(f'load index:        {time.perf_counter() - start:8.3f} s')
+
+        target = f'p{placemarks // 2}'
+        start = time.perf_counter()
+        for el in iterparse(path):
+            if el.get('id') == target:
+                break
+        print(f'iterparse search:  {time.perf_counter() - start:8.3f} s')
+
+        rounds = 1000
+        start = time.perf_counter()
+        for i in range(rounds):
+            index.get(f'p{i * placemarks // rounds}')
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f'index get:         {elapsed * 1e6:8.1f} us')
+
+        write(path, placemarks + placemarks // 100)
+        start = time.perf_counter()
+        scanned = index.update()
+        print(f'update ({scanned} new):{time.perf_counter() - start:8.3f} s')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,79 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_parallel_parse.py
+#
+"""
+Compares reading the Placemarks of a large KML file with
+pykml.parser.iterparse, in one process, and with
+pykml.parser.iterparse_parallel, which splits the file at the Placemark
+boundaries and parses the parts in a pool of processes.  The scan for the
+boundaries, which runs in the calling process, is timed separately.
+
+Usage: python benchmarks/bench_parallel_parse.py [PLACEMARKS] [JOBS]
+"""
+import mmap
+import os
+import random
+import sys
+import tempfile
+import time
+
+from pykml.parser import PARALLEL_CHUNK_SIZE
+from pykml.parser import _feature_ranges
+from pykml.parser import iterparse
+from pykml.parser import iterparse_parallel
+
+
+def placemark_name(elem):
+    return str(elem.name)
+
+
+def write_document(path, placemarks):
+    random.seed(0)
+    with open(path, 'wb') as f:
+        f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n')
+        for i in range(placemarks):
+            f.write(
+                f'<Placemark id="p{i}"><name>Placemark {i}</name>'
+                f'<description><![CDATA[<p>Row <b>{i}</b></p>]]></description>'
+                f'<ExtendedData><Data name="value"><value>{random.random()}</value>'
+                f'</Data></ExtendedData><Point><coordinates>'
+                f'{random.uniform(-180, 180)!r},{random.uniform(-90, 90)!r},0'
+                f'</coordinates></Point></Placemark>\n'.encode()
+            )
+        f.write(b'</Document></kml>\n')
+
+
+def main(placemarks=200000, jobs=None):
+    jobs = jobs or os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'large.kml')
+        write_document(path, placemarks)
+        size = os.path.getsize(path)
+        print(f'{placemarks} placemarks, {size / 1e6:.1f} MB, {jobs} jobs')
+
+        with open(path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = time.perf_counter()
+            for _ in _feature_ranges(data, ['Placemark', 'Folder'], PARALLEL_CHUNK_SIZE):
+                pass
+            elapsed = time.perf_counter() - start
+        print(f'{"scan for boundaries":24} {elapsed:8.3f}s {size / elapsed / 1e6:8.1f} MB/s')
+
+        results = []
+        for name, func in (
+            ('iterparse', lambda: [placemark_name(el) for el in iterparse(path)]),
+            ('iterparse_parallel', lambda: list(iterparse_parallel(
+                path, placemark_name, jobs=jobs))),
+        ):
+            start = time.perf_counter()
+            results.append(func())
+            elapsed = time.perf_counter() - start
+            print(f'{name:24} {elapsed:8.3f}s {size / elapsed / 1e6:8.1f} MB/s')
+        print('identical results:', results[0] == results[1])
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,51 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_parser_pool.py
+#
+"""
+Compares the latency of parsing small KML documents with pykml.parser.fromstring,
+which reuses the parsers of the calling thread, with making a new parser for
+every document as before, with and without schema validation.
+
+Usage: python benchmarks/bench_parser_pool.py [DOCUMENTS]
+"""
+import sys
+import time
+
+from lxml import objectify
+
+from pykml.parser import Schema
+from pykml.parser import _make_parser_options
+from pykml.parser import fromstring
+
+SMALL_KML = (
+    b'<kml xmlns="http://www.opengis.net/kml/2.2"><Placemark>'
+    b'<name>Small payload</name>'
+    b'<description><![CDATA[<b>bold</b>]]></description>'
+    b'<Point><coordinates>-122.0822035425683,37.42228990140251,0</coordinates></Point>'
+    b'</Placemark></kml>'
+)
+
+
+def fromstring_new_parser(text, schema=None, parser_options=None):
+    """The previous implementation, making a parser for every document"""
+    parser = objectify.makeparser(**_make_parser_options(schema, parser_options))
+    return objectify.fromstring(text, parser=parser)
+
+
+def main(documents=50000):
+    for label, schema in (('no schema', None), ('ogckml22.xsd', Schema('ogckml22.xsd'))):
+        print(f'{documents} documents, {label}')
+        for name, func in (('new parser per document', fromstring_new_parser),
+                           ('thread parser pool', fromstring)):
+            func(SMALL_KML, schema)
+            start = time.perf_counter()
+            for _ in range(documents):
+                func(SMALL_KML, schema)
+            elapsed = time.perf_counter() - start
+            print(f'  {name:24} {elapsed:8.3f}s {elapsed / documents * 1e6:8.1f}us/document')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,41 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_schema.py
+#
+"""
+Compares the cost of constructing pykml.parser.Schema objects with and
+without the process-wide cache of compiled XML Schemas.
+
+Usage: python benchmarks/bench_schema.py [REPEAT]
+"""
+import sys
+import timeit
+
+from pykml.parser import OGCKML_SCHEMA
+from pykml.parser import Schema
+from pykml.parser import clear_schema_cache
+
+
+def construct_uncached(schema):
+    clear_schema_cache()
+    Schema(schema)
+
+
+def construct_cached(schema):
+    Schema(schema)
+
+
+def main(repeat=20):
+    print(f'{"schema":52} {"uncached":>12} {"cached":>12}')
+    for schema in ('ogckml22.xsd', 'kml22gx.xsd', OGCKML_SCHEMA):
+        uncached = min(timeit.repeat(lambda: construct_uncached(schema),
+                                     number=1, repeat=repeat))
+        Schema(schema)
+        cached = min(timeit.repeat(lambda: construct_cached(schema),
+                                   number=1, repeat=repeat))
+        print(f'{schema:52} {uncached * 1e3:10.3f}ms {cached * 1e3:10.3f}ms')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_simplify.py
+#
+"""
+Measures the simplification of a random walk GPS trace with pykml.simplify,
+with NumPy and with the pure Python fallback, and reports the number of
+vertices kept and the size of the written document.
+
+Usage: python benchmarks/bench_simplify.py [VERTICES]
+"""
+import random
+import sys
+import time
+from unittest import mock
+
+from lxml import etree
+
+import pykml.simplify
+from pykml.factory import KML_ElementMaker as KML
+from pykml.simplify import DOUGLAS_PEUCKER
+from pykml.simplify import VISVALINGAM
+from pykml.simplify import simplify
+
+
+def make_document(vertices):
+    rng = random.Random(0)
+    x, y = 0.0, 0.0
+    tuples = []
+    for _ in range(vertices):
+        # about 10 m steps with GPS noise
+        x += 0.0001 + rng.gauss(0, 0.00002)
+        y += rng.gauss(0, 0.00005)
+        tuples.append(f'{x:.7f},{y:.7f},0')
+    return KML.kml(KML.Document(KML.Placemark(
+        KML.LineString(KML.coordinates(' '.join(tuples))))))
+
+
+def main(vertices=200000):
+    data = etree.tostring(make_document(vertices))
+    print(f'{vertices} vertices, {len(data) / 1e6:.1f} MB')
+    print(f'{"method":16} {"tolerance":>10} {"numpy":>10} {"python":>10} {"kept":>8} {"size":>8}')
+    for method in (DOUGLAS_PEUCKER, VISVALINGAM):
+        for tolerance in (0.00001, 0.0001):
+            times = []
+            for use_numpy in (True, False):
+                doc = etree.fromstring(data)
+                with mock.patch.object(pykml.simplify, 'numpy',
+                                       pykml.simplify.numpy if use_numpy else None):
+                    start = time.perf_counter()
+                    removed = simplify(doc, tolerance, method)
+                    times.append(time.perf_counter() - start)
+            size = len(etree.tostring(doc))
+            print(f'{method:16} {tolerance:10g} {times[0] * 1e3:8.0f}ms '
+                  f'{times[1] * 1e3:8.0f}ms {vertices - removed:8} '
+                  f'{size / 1e6:6.2f}MB')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,87 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_wkt.py
+#
+"""
+Measures the throughput, in vertices per second, of the WKT and WKB export
+of pykml.util, on a parsed document and when streaming a file, and compares
+it with the previous polygon-only to_wkt_list implementation.
+
+Usage: python benchmarks/bench_wkt.py [POLYGONS] [VERTICES]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.parser import parse
+from pykml.util import iter_wkb
+from pykml.util import iter_wkt
+
+
+def to_wkt_list_replace(doc):
+    """The previous implementation, which only converted Polygons"""
+
+    def ring_coords_to_wkt(ring):
+        return ((ring.coordinates.text.strip())
+                .replace(' ', '@@')
+                .replace(',', ' ')
+                .replace('@@', ', '))
+
+    ring_wkt_list = []
+    for action, elem in etree.iterwalk(doc, events=('start',)):
+        if elem.tag == '{http://www.opengis.net/kml/2.2}Polygon':
+            outer_text = ring_coords_to_wkt(elem.outerBoundaryIs.LinearRing)
+            ringlist = [f'({outer_text})']
+            for obj in elem.findall('{http://www.opengis.net/kml/2.2}innerBoundaryIs'):
+                ringlist.append(f'({ring_coords_to_wkt(obj.LinearRing)})')
+            ring_wkt_list.append(f'POLYGON ({", ".join(ringlist)})')
+    return ring_wkt_list
+
+
+def make_document(polygons, vertices):
+    random.seed(0)
+    placemarks = []
+    for i in range(polygons):
+        ring = [f'{random.uniform(-180, 180):.6f},{random.uniform(-90, 90):.6f},0'
+                for _ in range(vertices - 1)]
+        ring.append(ring[0])
+        placemarks.append(KML.Placemark(
+            KML.name(f'polygon {i}'),
+            KML.Polygon(KML.outerBoundaryIs(KML.LinearRing(
+                KML.coordinates(' '.join(ring))))),
+        ))
+    return KML.kml(KML.Document(*placemarks))
+
+
+def report(label, vertices, func):
+    start = time.perf_counter()
+    for _ in func():
+        pass
+    seconds = time.perf_counter() - start
+    print(f'{label:36} {seconds:8.3f}s {vertices / seconds / 1e6:8.2f}M vertices/s')
+
+
+def main(polygons=20000, vertices=100):
+    total = polygons * vertices
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'bench.kml')
+        etree.ElementTree(make_document(polygons, vertices)).write(path)
+        with open(path, 'rb') as f:
+            doc = parse(f)
+
+        print(f'{polygons} polygons, {total} vertices')
+        report('previous to_wkt_list', total, lambda: to_wkt_list_replace(doc))
+        report('iter_wkt, parsed document', total, lambda: iter_wkt(doc))
+        report('iter_wkb, parsed document', total, lambda: iter_wkb(doc))
+        report('iter_wkt, streamed file', total, lambda: iter_wkt(path))
+        report('iter_wkb, streamed file', total, lambda: iter_wkb(path))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,66 @@
+#
+# coding: utf-8
+#
+# benchmarks/bench_writer.py
+#
+"""
+Compares writing Placemarks with pykml.writer.KmlWriter against building
+them with KML_ElementMaker and serializing the tree with etree.tostring.
+
+Usage: python benchmarks/bench_writer.py [FEATURES]
+"""
+import sys
+import time
+from io import BytesIO
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.util import format_xml_with_cdata
+from pykml.writer import KmlWriter
+
+
+def rows(features):
+    for i in range(features):
+        yield (f'feature {i}', f'<b>{i}</b>', {'index': i},
+               (i % 360 - 180, i % 180 - 90))
+
+
+def write_tree(features):
+    doc = KML.kml(KML.Document(KML.name('Export'), *[
+        KML.Placemark(
+            KML.name(name),
+            KML.description(description),
+            KML.ExtendedData(*[KML.Data(KML.value(v), name=k)
+                               for k, v in data.items()]),
+            KML.Point(KML.coordinates('%s,%s' % coords)),
+        )
+        for name, description, data, coords in rows(features)
+    ]))
+    return etree.tostring(format_xml_with_cdata(doc), encoding='utf-8',
+                          xml_declaration=True)
+
+
+def write_writer(features):
+    output = BytesIO()
+    with KmlWriter(output) as writer:
+        with writer.document(name='Export'):
+            for name, description, data, coords in rows(features):
+                with writer.placemark(name=name, description=description,
+                                      extended_data=data):
+                    writer.point(coords)
+    return output.getvalue()
+
+
+def main(features=200000):
+    print(f'{features} features')
+    for label, func in (('KML_ElementMaker + tostring', write_tree),
+                        ('KmlWriter', write_writer)):
+        start = time.perf_counter()
+        func(features)
+        seconds = time.perf_counter() - start
+        print(f'{label:32} {seconds:8.3f}s {features / seconds:12.0f} features/s')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,331 @@
+#
+# coding: utf-8
+#
+# pykml.columnar
+#
+"""
+The pykml.columnar module extracts the Placemarks of a KML document into
+columns, for analysis with NumPy or Apache Arrow.
+
+The Placemarks are read in batches, each of which is returned as a
+dictionary of NumPy arrays with one row per Placemark, or as a
+`pyarrow.RecordBatch` if pyarrow is installed.  The columns are:
+
+- 'id', 'name' and 'styleUrl': strings, or None where missing
+- 'geometry_type': the local name of the first geometry of the Placemark
+  (e.g. 'Point', 'Polygon', 'MultiGeometry' or 'Track'), or None
+- 'longitude', 'latitude' and 'altitude': the coordinates of all the
+  geometries of the Placemarks, in document order.  With NumPy these are flat
+  float64 arrays, and 'coordinate_offsets' holds the index of the first
+  coordinate of each Placemark followed by the number of coordinates, so
+  that the coordinates of row i are at [offsets[i]:offsets[i + 1]].  With
+  pyarrow they are list columns.
+- 'when', 'begin' and 'end': the <TimeStamp> and <TimeSpan> of the
+  Placemark as datetime64[ms] values in UTC, or NaT
+- one column per <Data> or <SimpleData> name of the <ExtendedData> of the
+  Placemarks in the batch.  Values of SimpleFields declared with a numeric
+  type in a <Schema> are float64, with NaN where missing or invalid; other
+  values are strings, or None where missing.  A name that is also the name
+  of one of the columns above is prefixed with 'data_'.
+
+NumPy is required.
+"""
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+from lxml import etree
+
+from .geometry import GEOMETRY_TAGS
+from .geometry import GX_COORD
+from .geometry import GX_TRACK
+from .geometry import KML_COORDINATES
+from .geometry import _as_numpy
+from .geometry import numpy
+from .geometry import parse_coordinates
+from .kmz import KmzFile
+from .kmz import is_kmz
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+KML_PLACEMARK = '{http://www.opengis.net/kml/2.2}Placemark'
+KML_NAME = '{http://www.opengis.net/kml/2.2}name'
+KML_STYLEURL = '{http://www.opengis.net/kml/2.2}styleUrl'
+KML_TIMESTAMP = '{http://www.opengis.net/kml/2.2}TimeStamp'
+KML_TIMESPAN = '{http://www.opengis.net/kml/2.2}TimeSpan'
+KML_WHEN = '{http://www.opengis.net/kml/2.2}when'
+KML_BEGIN = '{http://www.opengis.net/kml/2.2}begin'
+KML_END = '{http://www.opengis.net/kml/2.2}end'
+KML_EXTENDEDDATA = '{http://www.opengis.net/kml/2.2}ExtendedData'
+KML_DATA = '{http://www.opengis.net/kml/2.2}Data'
+KML_VALUE = '{http://www.opengis.net/kml/2.2}value'
+KML_SCHEMA = '{http://www.opengis.net/kml/2.2}Schema'
+KML_SCHEMADATA = '{http://www.opengis.net/kml/2.2}SchemaData'
+KML_SIMPLEFIELD = '{http://www.opengis.net/kml/2.2}SimpleField'
+KML_SIMPLEDATA = '{http://www.opengis.net/kml/2.2}SimpleData'
+
+DEFAULT_BATCH_SIZE = 65536
+
+COLUMNS = (
+    'id', 'name', 'styleUrl', 'geometry_type', 'coordinate_offsets',
+    'longitude', 'latitude', 'altitude', 'when', 'begin', 'end',
+)
+
+# SimpleField types whose values are extracted as float64
+_NUMERIC_TYPES = frozenset(('int', 'uint', 'short', 'ushort', 'float', 'double'))
+
+_NOT_A_TIME = None if numpy is None else numpy.datetime64('NaT', 'ms')
+
+# the children of Placemarks read into the columns
+_NAME_TAGS = {KML_NAME: 'name', KML_STYLEURL: 'styleUrl'}
+_TIME_CHILD_TAGS = {
+    KML_WHEN: (KML_TIMESTAMP, 'when'),
+    KML_BEGIN: (KML_TIMESPAN, 'begin'),
+    KML_END: (KML_TIMESPAN, 'end'),
+}
+_READ_TAGS = frozenset(
+    tuple(_NAME_TAGS) + tuple(_TIME_CHILD_TAGS) + GEOMETRY_TAGS +
+    (KML_COORDINATES, KML_VALUE, KML_SCHEMADATA, KML_SIMPLEDATA)
+)
+
+
+def _parse_time(text):
+    """Parses a KML time (a dateTime, date, gYearMonth or gYear) as a
+    datetime64[ms] in UTC
+
+    Returns NaT if `text` is None or not a valid time.
+    """
+    if text is None:
+        return _NOT_A_TIME
+    try:
+        if 'T' not in text:
+            # date, gYearMonth or gYear
+            return numpy.datetime64(text, 'ms')
+        value = datetime.fromisoformat(text)
+    except ValueError:
+        return _NOT_A_TIME
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return numpy.datetime64(value, 'ms')
+
+
+def _parse_times(texts):
+    """Parses a list of KML times, see `_parse_time`"""
+    try:
+        with warnings.catch_warnings():
+            # NumPy converts times with a time zone to UTC, with a warning
+            warnings.simplefilter('ignore')
+            return numpy.array(texts, dtype='datetime64[ms]')
+    except ValueError:
+        return numpy.array([_parse_time(text) for text in texts],
+                           dtype='datetime64[ms]')
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _track_coordinates(track):
+    """Returns the coordinates of a <gx:Track> as the text of a <coordinates>
+    element"""
+    return ' '.join(','.join((coord.text or '').split())
+                    for coord in track.iterchildren(GX_COORD))
+
+
+class _Batch:
+    """The columns of the Placemarks read so far
+
+    Coordinates and times are kept as text, and parsed for the whole batch at
+    once.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {
+            'id': [], 'name': [], 'styleUrl': [], 'geometry_type': [],
+            'when': [], 'begin': [], 'end': [],
+        }
+        self.offsets = [0]
+        self.coordinates = []
+        # row values and SimpleField type of each ExtendedData name
+        self.data = {}
+        self.types = {}
+
+    def append(self, placemark, schemas):
+        values = {'id': placemark.get('id')}
+        count = self.offsets[-1]
+        schema_fields = {}
+        # a single walk over the elements, in document order: the first name,
+        # styleUrl, time and geometry are the Placemark's.  Filtering by tag
+        # in lxml is slower than skipping the elements here.
+        for el in placemark.iter():
+            tag = el.tag
+            if tag not in _READ_TAGS:
+                continue
+            if tag == KML_COORDINATES:
+                text = el.text or ''
+                self.coordinates.append(text)
+                count += len(text.split())
+            elif tag in _NAME_TAGS:
+                values.setdefault(_NAME_TAGS[tag], (el.text or '').strip())
+            elif tag == KML_VALUE:
+                parent = el.getparent()
+                if parent.tag == KML_DATA:
+                    self._set_data(parent.get('name'), el.text, None)
+            elif tag == KML_SIMPLEDATA:
+                name = el.get('name')
+                self._set_data(name, el.text, schema_fields.get(name))
+            elif tag == KML_SCHEMADATA:
+                url = el.get('schemaUrl') or ''
+                schema_fields = schemas.get(url.rpartition('#')[2], {})
+            elif tag in _TIME_CHILD_TAGS:
+                parent_tag, name = _TIME_CHILD_TAGS[tag]
+                if el.getparent().tag == parent_tag:
+                    values.setdefault(name, (el.text or '').strip())
+            else:
+                values.setdefault('geometry_type', tag.rpartition('}')[2])
+                if tag == GX_TRACK:
+                    text = _track_coordinates(el)
+                    self.coordinates.append(text)
+                    count += len(text.split())
+        for name, column in self.columns.items():
+            column.append(values.get(name))
+        self.offsets.append(count)
+        self.rows += 1
+
+    def _set_data(self, name, value, field_type):
+        if name is None:
+            return
+        if name in COLUMNS:
+            name = 'data_' + name
+        values = self.data.get(name)
+        if values is None:
+            values = self.data[name] = []
+            self.types[name] = field_type
+        elif len(values) > self.rows:
+            # the first value of a repeated name is kept
+            return
+        values.extend([None] * (self.rows - len(values)))
+        values.append(value)
+
+    def to_numpy(self):
+        columns = {
+            name: numpy.array(values, dtype=object)
+            for name, values in self.columns.items()
+            if name not in ('when', 'begin', 'end')
+        }
+        coords = _as_numpy(parse_coordinates(' '.join(self.coordinates)))
+        columns.update({
+            'coordinate_offsets': numpy.array(self.offsets, dtype=numpy.int64),
+            'longitude': coords[:, 0],
+            'latitude': coords[:, 1],
+            'altitude': coords[:, 2],
+        })
+        for name in ('when', 'begin', 'end'):
+            columns[name] = _parse_times(self.columns[name])
+        columns = {name: columns[name] for name in COLUMNS}
+
+        for name, values in self.data.items():
+            values.extend([None] * (self.rows - len(values)))
+            if self.types[name] in _NUMERIC_TYPES:
+                columns[name] = numpy.array([_to_float(value) for value in values],
+                                            dtype=numpy.float64)
+            else:
+                columns[name] = numpy.array(values, dtype=object)
+        return columns
+
+
+def _to_arrow(columns):
+    """Converts NumPy columns to a pyarrow.RecordBatch"""
+    offsets = pyarrow.array(columns['coordinate_offsets'].astype(numpy.int32))
+    arrays = {}
+    for name, values in columns.items():
+        if name == 'coordinate_offsets':
+            continue
+        if name in ('longitude', 'latitude', 'altitude'):
+            arrays[name] = pyarrow.ListArray.from_arrays(
+                offsets, pyarrow.array(numpy.ascontiguousarray(values)))
+        elif values.dtype == object:
+            arrays[name] = pyarrow.array(values.tolist(), type=pyarrow.string())
+        else:
+            arrays[name] = pyarrow.array(values)
+    return pyarrow.RecordBatch.from_arrays(list(arrays.values()),
+                                          names=list(arrays))
+
+
+def _iter_elements(source):
+    """Yields the Placemark and Schema elements of a KML or KMZ file
+
+    The file is parsed incrementally without objectify, whose element
+    classes are slow to look up, and each element is released once the next
+    one is requested.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, 'rb') as f:
+            yield from _iter_elements(f)
+        return
+    if is_kmz(source):
+        with KmzFile(source) as kmz, kmz.open(kmz.kml_name) as f:
+            yield from _iter_elements(f)
+        return
+
+    for _, el in etree.iterparse(source, tag=(KML_PLACEMARK, KML_SCHEMA),
+                                 huge_tree=True):
+        yield el
+        el.clear()
+        parent = el.getparent()
+        if parent is not None:
+            while el.getprevious() is not None:
+                del parent[0]
+
+
+def iter_record_batches(source, batch_size=DEFAULT_BATCH_SIZE, as_arrow=False):
+    """Yields the Placemarks of a KML document in batches of columns
+
+    `source` is a KML or KMZ file name or binary file object, which is read
+    incrementally, or a parsed document or element, which is serialized and
+    parsed again without objectify, as that is faster than reading objectify
+    elements.
+    Each batch holds up to `batch_size`
+    Placemarks, as a dictionary of NumPy arrays, or as a pyarrow.RecordBatch
+    if `as_arrow` is True; see the module documentation for the columns.
+    The ExtendedData columns of a batch are those found in its Placemarks.
+    """
+    if numpy is None:
+        raise ImportError('NumPy is required for columnar extraction')
+    if as_arrow and pyarrow is None:
+        raise ImportError('pyarrow is required for as_arrow=True')
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+
+    if hasattr(source, 'iter') or hasattr(source, 'getroot'):
+        root = etree.fromstring(etree.tostring(source),
+                                etree.XMLParser(huge_tree=True))
+        elements = root.iter(KML_PLACEMARK, KML_SCHEMA)
+    else:
+        elements = _iter_elements(source)
+
+    # SimpleField types of the Schemas read so far, by Schema id
+    schemas = {}
+    batch = _Batch()
+    for el in elements:
+        if el.tag == KML_SCHEMA:
+            schemas[el.get('id')] = {
+                field.get('name'): field.get('type')
+                for field in el.iterchildren(KML_SIMPLEFIELD)
+            }
+            continue
+        batch.append(el, schemas)
+        if batch.rows == batch_size:
+            columns = batch.to_numpy()
+            yield _to_arrow(columns) if as_arrow else columns
+            batch = _Batch()
+    if batch.rows:
+        columns = batch.to_numpy()
+        yield _to_arrow(columns) if as_arrow else columns
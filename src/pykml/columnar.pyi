@@ -0,0 +1,86 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.columnar
+#
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterator, List, Optional, \
+    Tuple, Union
+
+from lxml import etree
+
+KML_PLACEMARK: str = ...
+KML_NAME: str = ...
+KML_STYLEURL: str = ...
+KML_TIMESTAMP: str = ...
+KML_TIMESPAN: str = ...
+KML_WHEN: str = ...
+KML_BEGIN: str = ...
+KML_END: str = ...
+KML_EXTENDEDDATA: str = ...
+KML_DATA: str = ...
+KML_VALUE: str = ...
+KML_SCHEMA: str = ...
+KML_SCHEMADATA: str = ...
+KML_SIMPLEFIELD: str = ...
+KML_SIMPLEDATA: str = ...
+DEFAULT_BATCH_SIZE: int = ...
+COLUMNS: Tuple[str, ...] = ...
+_NUMERIC_TYPES: FrozenSet[str] = ...
+_NAME_TAGS: Dict[str, str] = ...
+_TIME_CHILD_TAGS: Dict[str, Tuple[str, str]] = ...
+_READ_TAGS: FrozenSet[str] = ...
+
+
+def _parse_time(text: Optional[str]) -> Any:
+    ...
+
+
+def _parse_times(texts: List[Optional[str]]) -> Any:
+    ...
+
+
+def _to_float(text: Optional[str]) -> float:
+    ...
+
+
+def _track_coordinates(track: etree.ElementBase) -> str:
+    ...
+
+
+class _Batch:
+    rows: int = ...
+    columns: Dict[str, List[Any]] = ...
+    offsets: List[int] = ...
+    coordinates: List[str] = ...
+    data: Dict[str, List[Optional[str]]] = ...
+    types: Dict[str, Optional[str]] = ...
+
+    def __init__(self) -> None:
+        ...
+
+    def append(self, placemark: etree.ElementBase,
+               schemas: Dict[str, Dict[str, Optional[str]]]) -> None:
+        ...
+
+    def _set_data(self, name: Optional[str], value: Optional[str],
+                  field_type: Optional[str]) -> None:
+        ...
+
+    def to_numpy(self) -> Dict[str, Any]:
+        ...
+
+
+def _to_arrow(columns: Dict[str, Any]) -> Any:
+    ...
+
+
+def _iter_elements(source: Union[str, Path, BinaryIO]) -> Iterator[etree.ElementBase]:
+    ...
+
+
+def iter_record_batches(source: Union[etree.ElementBase, etree._ElementTree,
+                                      str, Path, BinaryIO],
+                        batch_size: int = ...,
+                        as_arrow: bool = ...) -> Iterator[Any]:
+    ...
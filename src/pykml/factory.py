@@ -13,8 +13,10 @@ KML objects with the appropriate namespace prefixes.
 .. _lxml's ElementMaker factory: http://lxml.de/objectify.html#tree-generation-with-the-e-factory
 """
 import os
+import re
 from collections import OrderedDict
 from io import StringIO, BytesIO
+from itertools import repeat
 from optparse import OptionParser
 from os import sys
 from typing import Dict, Optional
@@ -22,6 +24,7 @@ from typing import Dict, Optional
 from lxml import etree, objectify
 
 from . import version as pykml_version
+from .parser import fromstring
 from .parser import parse
 
 nsmap = OrderedDict([
@@ -30,6 +33,16 @@ nsmap = OrderedDict([
     ('gx', 'http://www.google.com/kml/ext/2.2'),
 ])
 
+# the namespace declarations of a kml root element, as XML markup
+_ROOT_NAMESPACES = ''.join(
+    f' xmlns="{uri}"' if prefix is None else f' xmlns:{prefix}="{uri}"'
+    for prefix, uri in nsmap.items()
+)
+
+# characters that cannot occur in XML 1.0 documents
+_INVALID_XML_CHARACTERS = re.compile(
+    '[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
 # create a factory object for creating objects in the KML namespace
 KML_ElementMaker = objectify.ElementMaker(
     annotate=False,
@@ -72,6 +85,162 @@ def get_factory_object_name(namespace):
     return factory_object_name
 
 
+def _check_xml_characters(text):
+    """Rejects, like lxml, text with characters that XML cannot represent,
+    such as control characters, with a ValueError"""
+    # printable text, the common case, is told apart faster than by a search
+    if text.isprintable():
+        return
+    match = _INVALID_XML_CHARACTERS.search(text)
+    if match is not None:
+        raise ValueError('All strings must be XML compatible: '
+                         f'{match.group()!r} at position {match.start()}')
+
+
+def _escape_xml(value):
+    """Escapes a text or attribute value for inclusion in XML markup
+
+    Values with characters that XML cannot represent raise ValueError.
+    """
+    text = _escape_markup(value)
+    _check_xml_characters(text)
+    return text
+
+
+def _escape_markup(value):
+    """Escapes a text or attribute value, without checking its characters"""
+    text = '' if value is None else str(value)
+    if '&' in text or '<' in text or '>' in text or '"' in text:
+        text = (text.replace('&', '&amp;').replace('<', '&lt;')
+                .replace('>', '&gt;').replace('"', '&quot;'))
+    return text
+
+
+def _format_coordinate_column(coordinates, geometry):
+    """Returns the <coordinates> text of each entry of a coordinate column
+
+    Entries are (longitude, latitude[, altitude]) tuples for Points, and
+    sequences of such tuples for LineStrings and LinearRings.  Entries that
+    are strings are used as they are, and None entries, of Placemarks
+    without a geometry, are kept.
+    """
+    if hasattr(coordinates, 'tolist'):
+        coordinates = coordinates.tolist()
+    if geometry == 'Point':
+        if not any(c is None or isinstance(c, str) for c in coordinates):
+            sizes = set(map(len, coordinates))
+            if len(sizes) == 1:
+                # all points have the same size: a single formatting operation
+                size = sizes.pop()
+                values = [v for point in coordinates for v in point]
+                return (('%s,' * (size - 1) + '%s\n') * len(coordinates)
+                        % tuple(values)).split('\n')[:-1]
+        return [c if c is None or isinstance(c, str) else ','.join(map(str, c))
+                for c in coordinates]
+    return [c if c is None or isinstance(c, str) else
+            ' '.join([','.join(map(str, t)) for t in c])
+            for c in coordinates]
+
+
+def iter_placemark_xml(names=None, coordinates=None, style_urls=None,
+                       extended_data=None, ids=None, geometry='Point'):
+    """Yields the serialized XML of Placemarks built from columns of values
+
+    Each argument is a sequence with one entry per Placemark (or None to
+    omit the element): the name, the coordinates of the geometry, the
+    styleUrl, a dict of ExtendedData names and values, and the id
+    attribute.  `geometry` is 'Point', 'LineString' or 'LinearRing'; see
+    `_format_coordinate_column` for the accepted coordinates.  NumPy arrays
+    are accepted for all columns.
+
+    The Placemarks are written with the default KML namespace, without
+    namespace declarations, for inclusion in a KML document.  Values with
+    characters that XML cannot represent raise ValueError.
+    """
+    for placemark in _iter_placemark_markup(
+            names, coordinates, style_urls, extended_data, ids, geometry):
+        _check_xml_characters(placemark)
+        yield placemark
+
+
+def _iter_placemark_markup(names, coordinates, style_urls, extended_data, ids,
+                           geometry):
+    """Yields the serialized XML of Placemarks, like `iter_placemark_xml`,
+    without checking their characters"""
+    if geometry not in ('Point', 'LineString', 'LinearRing'):
+        raise ValueError(f'unsupported geometry: {geometry}')
+    columns = [names, coordinates, style_urls, extended_data, ids]
+    lengths = {len(column) for column in columns if column is not None}
+    if len(lengths) > 1:
+        raise ValueError('all columns must have the same length')
+    count = lengths.pop() if lengths else 0
+    if coordinates is not None:
+        columns[1] = _format_coordinate_column(coordinates, geometry)
+    names, coordinates, style_urls, extended_data, ids = [
+        repeat(None, count) if column is None else column
+        for column in columns
+    ]
+
+    geometry_start = f'<{geometry}><coordinates>'
+    geometry_end = f'</coordinates></{geometry}>'
+    for name, coords, style_url, data, id_ in zip(
+            names, coordinates, style_urls, extended_data, ids):
+        parts = ['<Placemark>' if id_ is None else
+                 f'<Placemark id="{_escape_markup(id_)}">']
+        if name is not None:
+            parts.append(f'<name>{_escape_markup(name)}</name>')
+        if style_url is not None:
+            parts.append(f'<styleUrl>{_escape_markup(style_url)}</styleUrl>')
+        if data:
+            parts.append('<ExtendedData>')
+            parts.extend([
+                f'<Data name="{_escape_markup(key)}">'
+                f'<value>{_escape_markup(value)}</value></Data>'
+                for key, value in data.items()
+            ])
+            parts.append('</ExtendedData>')
+        if coords is not None:
+            parts.append(geometry_start)
+            parts.append(_escape_markup(coords))
+            parts.append(geometry_end)
+        parts.append('</Placemark>')
+        yield ''.join(parts)
+
+
+def placemarks_to_bytes(names=None, coordinates=None, style_urls=None,
+                        extended_data=None, ids=None, geometry='Point',
+                        encoding='utf-8'):
+    """Returns the serialized XML of Placemarks built from columns of values
+
+    See `iter_placemark_xml`.  Characters that `encoding` cannot represent
+    are written as character references, as by `pykml.writer.KmlWriter`.
+    """
+    # one check of the whole text is cheaper than one per Placemark
+    text = ''.join(_iter_placemark_markup(
+        names, coordinates, style_urls, extended_data, ids, geometry,
+    ))
+    _check_xml_characters(text)
+    return text.encode(encoding, 'xmlcharrefreplace')
+
+
+def build_placemarks(names=None, coordinates=None, style_urls=None,
+                     extended_data=None, ids=None, geometry='Point'):
+    """Builds Placemark elements from columns of values
+
+    See `iter_placemark_xml`.  The Placemarks are serialized and parsed in a
+    single operation, which is much faster than creating each element with
+    KML_ElementMaker.  Returns a list of objectify elements; they are
+    children of a temporary Document element until they are added to
+    another element.
+    """
+    data = placemarks_to_bytes(names, coordinates, style_urls,
+                               extended_data, ids, geometry)
+    document = fromstring(
+        f'<Document{_ROOT_NAMESPACES}>'.encode() + data + b'</Document>',
+        parser_options={'huge_tree': True})
+    return list(document.iterchildren())
+
+
 def write_python_script_for_kml_document(doc):
     """Generates a python script that will construct a given KML document"""
     from .helpers import separate_namespace
@@ -3,12 +3,16 @@
 #
 # Stub file for pyxml.factory
 #
-from typing import Optional, Dict
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Pattern, Sequence
 
 from lxml import objectify, etree
 
 nsmap: Dict[Optional[str], str] = ...
 
+_ROOT_NAMESPACES: str = ...
+
+_INVALID_XML_CHARACTERS: Pattern[str] = ...
+
 KML_ElementMaker: objectify.ElementMaker = ...
 
 ATOM_ElementMaker: objectify.ElementMaker = ...
@@ -20,6 +24,63 @@ def get_factory_object_name(namespace: Optional[str]) -> Optional[str]:
     ...
 
 
+def _check_xml_characters(text: str) -> None:
+    ...
+
+
+def _escape_xml(value: Any) -> str:
+    ...
+
+
+def _escape_markup(value: Any) -> str:
+    ...
+
+
+def _format_coordinate_column(coordinates: Sequence[Any], geometry: str) \
+        -> List[Optional[str]]:
+    ...
+
+
+def iter_placemark_xml(names: Optional[Sequence[Any]] = ...,
+                       coordinates: Optional[Sequence[Any]] = ...,
+                       style_urls: Optional[Sequence[Any]] = ...,
+                       extended_data: Optional[Sequence[Mapping[str, Any]]] = ...,
+                       ids: Optional[Sequence[Any]] = ...,
+                       geometry: str = ...) \
+        -> Iterator[str]:
+    ...
+
+
+def _iter_placemark_markup(names: Optional[Sequence[Any]],
+                           coordinates: Optional[Sequence[Any]],
+                           style_urls: Optional[Sequence[Any]],
+                           extended_data: Optional[Sequence[Mapping[str, Any]]],
+                           ids: Optional[Sequence[Any]],
+                           geometry: str) -> Iterator[str]:
+    ...
+
+
+def placemarks_to_bytes(names: Optional[Sequence[Any]] = ...,
+                        coordinates: Optional[Sequence[Any]] = ...,
+                        style_urls: Optional[Sequence[Any]] = ...,
+                        extended_data: Optional[Sequence[Mapping[str, Any]]] = ...,
+                        ids: Optional[Sequence[Any]] = ...,
+                        geometry: str = ...,
+                        encoding: str = ...) \
+        -> bytes:
+    ...
+
+
+def build_placemarks(names: Optional[Sequence[Any]] = ...,
+                     coordinates: Optional[Sequence[Any]] = ...,
+                     style_urls: Optional[Sequence[Any]] = ...,
+                     extended_data: Optional[Sequence[Mapping[str, Any]]] = ...,
+                     ids: Optional[Sequence[Any]] = ...,
+                     geometry: str = ...) \
+        -> List[objectify.ObjectifiedElement]:
+    ...
+
+
 def write_python_script_for_kml_document(doc: etree.XMLParser) \
         -> str:
     ...
@@ -0,0 +1,536 @@
+#
+# coding: utf-8
+#
+# pykml.geometry
+#
+"""
+The pykml.geometry module provides functions that convert the coordinates of
+KML geometry elements to and from packed numeric arrays.
+
+Coordinates are stored as a flat `array.array('d')` of longitude, latitude,
+altitude triples; a missing altitude is stored as 0.0.  If NumPy is
+installed the same buffer can be viewed as a (N, 3) array without copying.
+
+Geometry elements can also be converted to Well Known Text (WKT) and Well
+Known Binary (WKB).
+"""
+import struct
+import sys
+import warnings
+from array import array
+from io import BytesIO
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+KML_COORDINATES = '{http://www.opengis.net/kml/2.2}coordinates'
+GX_COORD = '{http://www.google.com/kml/ext/2.2}coord'
+GX_TRACK = '{http://www.google.com/kml/ext/2.2}Track'
+GX_MULTITRACK = '{http://www.google.com/kml/ext/2.2}MultiTrack'
+KML_POINT = '{http://www.opengis.net/kml/2.2}Point'
+KML_LINESTRING = '{http://www.opengis.net/kml/2.2}LineString'
+KML_LINEARRING = '{http://www.opengis.net/kml/2.2}LinearRing'
+KML_POLYGON = '{http://www.opengis.net/kml/2.2}Polygon'
+KML_MULTIGEOMETRY = '{http://www.opengis.net/kml/2.2}MultiGeometry'
+KML_OUTER_BOUNDARY = '{http://www.opengis.net/kml/2.2}outerBoundaryIs'
+KML_INNER_BOUNDARY = '{http://www.opengis.net/kml/2.2}innerBoundaryIs'
+
+# geometry elements that can be converted to WKT and WKB
+GEOMETRY_TAGS = (
+    KML_POINT,
+    KML_LINESTRING,
+    KML_LINEARRING,
+    KML_POLYGON,
+    KML_MULTIGEOMETRY,
+    GX_TRACK,
+    GX_MULTITRACK,
+)
+# geometry elements that are parts of other geometries
+GEOMETRY_CONTAINER_TAGS = (KML_POLYGON, KML_MULTIGEOMETRY, GX_MULTITRACK)
+
+# WKB geometry type codes; 1000 is added for geometries with altitude
+_WKB_TYPES = {
+    'POINT': 1,
+    'LINESTRING': 2,
+    'POLYGON': 3,
+    'MULTIPOINT': 4,
+    'MULTILINESTRING': 5,
+    'MULTIPOLYGON': 6,
+    'GEOMETRYCOLLECTION': 7,
+}
+_WKB_HEADER = struct.Struct('<BI')
+_WKB_COUNT = struct.Struct('<I')
+_WKB_EMPTY_POINT = array('d', [float('nan')] * 3)
+
+# the characters of decimal numbers, which are deleted to compare the
+# separators of a coordinate text with those of well-formed tuples
+_NUMBER_CHARACTERS = b'0123456789.-+eE'
+_TUPLE_SEPARATORS = {2: b', ', 3: b',, '}
+# the text length from which NumPy parses numbers faster than float()
+_NUMPY_MIN_LENGTH = 1000
+
+
+class CoordinatesSyntaxError(ValueError):
+    """A malformed tuple in the text of a <coordinates> element
+
+    `index` is the position of the tuple in the text, and `token` the tuple
+    as written.
+    """
+
+    def __init__(self, message, index, token):
+        super().__init__(f'{message} (tuple {index}): {token!r}')
+        self.index = index
+        self.token = token
+
+
+class CoordinatesRangeError(ValueError):
+    """A longitude or latitude out of range
+
+    `index` is the position of the tuple in the coordinates, and `value` the
+    longitude or latitude.
+    """
+
+    def __init__(self, message, index, value):
+        super().__init__(f'{message} (tuple {index}): {value!r}')
+        self.index = index
+        self.value = value
+
+
+def _split_coordinates(text):
+    """Returns the text of a <coordinates> element with its tuples separated
+    by single spaces, the number of tuples and their number of values (None
+    if tuples with and without an altitude are mixed)"""
+    text = ' '.join(text.split())
+    if not text:
+        return text, 0, None
+    count = text.count(' ') + 1
+
+    # well-formed numbers leave only the separators of the tuples
+    try:
+        separators = text.encode('ascii').translate(None, _NUMBER_CHARACTERS)
+    except UnicodeEncodeError:
+        separators = None
+    if separators is not None and ',,' not in text and ' ,' not in text and \
+            ', ' not in text and text[0] != ',' and text[-1] != ',':
+        for size, separator in _TUPLE_SEPARATORS.items():
+            if len(separators) == len(separator) * count - 1 and \
+                    separators == (separator * count)[:-1]:
+                return text, count, size
+
+    # tuples of mixed size, values that are not plain decimal numbers, or
+    # malformed tuples
+    sizes = set()
+    for index, token in enumerate(text.split(' ')):
+        values = token.split(',')
+        if not 2 <= len(values) <= 3:
+            raise CoordinatesSyntaxError(
+                'a coordinate tuple must hold 2 or 3 values', index, token)
+        if '' in values:
+            raise CoordinatesSyntaxError(
+                'empty value in coordinate tuple', index, token)
+        sizes.add(len(values))
+    return text, count, sizes.pop() if len(sizes) == 1 else None
+
+
+def tokenize_coordinates(text):
+    """Splits the text of a <coordinates> element into its tuples
+
+    Tuples are separated by any whitespace and their values by commas.
+    Returns the list of tuples, as written, and their number of values: 2 or
+    3, or None if tuples with and without an altitude are mixed.  Tuples
+    with fewer than two or more than three values, or with an empty value,
+    raise CoordinatesSyntaxError; numbers are only checked when parsed, by
+    `parse_coordinates`.
+    """
+    text, _, size = _split_coordinates(text)
+    return text.split(), size
+
+
+def _parse_values(text, count):
+    """Parses `count` whitespace separated numbers into an array('d'), or
+    returns None if the text does not hold exactly that many numbers"""
+    if numpy is not None and len(text) >= _NUMPY_MIN_LENGTH:
+        with warnings.catch_warnings():
+            # numpy warns about, and stops at, the first malformed number
+            warnings.simplefilter('ignore', DeprecationWarning)
+            try:
+                values = numpy.fromstring(text, dtype=numpy.float64, sep=' ')
+            except ValueError:
+                return None
+        if len(values) != count:
+            return None
+        coords = array('d')
+        coords.frombytes(values.tobytes())
+        return coords
+    try:
+        values = array('d', map(float, text.split()))
+    except ValueError:
+        return None
+    return values if len(values) == count else None
+
+
+def _parse_tuples(tuples):
+    """Parses coordinate tuples one by one, locating malformed values"""
+    coords = array('d', bytes(24 * len(tuples)))
+    for index, token in enumerate(tuples):
+        values = token.split(',')
+        try:
+            coords[3 * index:3 * index + len(values)] = array('d', map(float, values))
+        except ValueError:
+            raise CoordinatesSyntaxError(
+                'invalid number in coordinate tuple', index, token) from None
+    return coords
+
+
+def parse_coordinates(text):
+    """Parses the text of a <coordinates> element
+
+    Tuples are separated by any whitespace and their values by commas.  The
+    altitude is optional; tuples without one get an altitude of 0.0.
+    Returns a flat array('d') of (longitude, latitude, altitude) triples.
+    Malformed tuples raise CoordinatesSyntaxError, a ValueError.
+    """
+    text, count, size = _split_coordinates(text)
+    values = None
+    if size is not None:
+        values = _parse_values(text.replace(',', ' '), size * count)
+    if values is None:
+        # tuples of mixed size, or malformed numbers
+        return _parse_tuples(text.split())
+    if size == 3:
+        return values
+    coords = array('d', bytes(24 * count))
+    coords[0::3] = values[0::2]
+    coords[1::3] = values[1::2]
+    return coords
+
+
+def parse_gx_coords(texts):
+    """Parses the texts of a sequence of <gx:coord> elements
+
+    Returns a flat array('d') of (longitude, latitude, altitude) triples.
+    Texts without exactly three numbers, including empty elements whose
+    text is None, raise CoordinatesSyntaxError.
+    """
+    texts = [text or '' for text in texts]
+    text = '\n'.join(texts)
+    try:
+        separators = text.encode('ascii').translate(None, _NUMBER_CHARACTERS)
+    except UnicodeEncodeError:
+        separators = None
+    if separators == (b'  \n' * len(texts))[:-1]:
+        coords = _parse_values(text, 3 * len(texts))
+        if coords is not None:
+            return coords
+
+    # other whitespace, or malformed texts
+    coords = array('d')
+    for index, text in enumerate(texts):
+        values = text.split()
+        if len(values) != 3:
+            raise CoordinatesSyntaxError(
+                'a gx:coord element must hold three values', index, text)
+        try:
+            coords.extend(map(float, values))
+        except ValueError:
+            raise CoordinatesSyntaxError(
+                'invalid number in gx:coord element', index, text) from None
+    return coords
+
+
+def check_ranges(coords):
+    """Checks the longitudes and latitudes of coordinates
+
+    `coords` is a flat array of (longitude, latitude, altitude) triples, as
+    returned by `parse_coordinates`.  A longitude outside [-180, 180] or a
+    latitude outside [-90, 90], including NaN, raises CoordinatesRangeError,
+    a ValueError.
+    """
+    for offset, limit, name in ((0, 180, 'longitude'), (1, 90, 'latitude')):
+        values = coords[offset::3]
+        # a NaN among the values makes their sum NaN
+        if not values or (-limit <= min(values) and max(values) <= limit and
+                          sum(values) == sum(values)):
+            continue
+        for index, value in enumerate(values):
+            if not -limit <= value <= limit:
+                raise CoordinatesRangeError(f'{name} out of range', index, value)
+
+
+def format_coordinates(coords, precision=None, altitude=True):
+    """Formats coordinates as the text of a <coordinates> element
+
+    `coords` is a flat sequence of (longitude, latitude, altitude) triples,
+    such as returned by `coords_array`, or a (N, 3) NumPy array.  Values are
+    written with the shortest representation that round-trips, or with
+    `precision` decimal places.  If `altitude` is False only longitude and
+    latitude are written.
+    """
+    return _format_tuples(coords, precision, altitude, ',', ' ')
+
+
+def format_gx_coords(coords, precision=None):
+    """Formats coordinates as the texts of <gx:coord> elements
+
+    Returns a list with one text per (longitude, latitude, altitude) triple.
+    """
+    if not len(coords):
+        return []
+    return _format_tuples(coords, precision, True, ' ', '\n').split('\n')
+
+
+def _format_tuples(coords, precision, altitude, separator, tuple_separator):
+    """Formats all coordinate tuples with a single printf-style operation"""
+    if getattr(coords, 'ndim', 1) > 1:
+        coords = coords.reshape(-1)
+    values = coords.tolist() if hasattr(coords, 'tolist') else list(coords)
+    if len(values) % 3:
+        raise ValueError('coordinates must hold (longitude, latitude, altitude) triples')
+
+    value_format = '%r' if precision is None else f'%.{precision}f'
+    size = 3
+    if not altitude:
+        del values[2::3]
+        size = 2
+    tuple_format = separator.join([value_format] * size)
+    return tuple_separator.join([tuple_format] * (len(values) // size)) % tuple(values)
+
+
+def _as_numpy(coords):
+    """Returns a (N, 3) NumPy view of a flat array('d') of coordinates"""
+    if numpy is None:
+        raise ImportError('NumPy is required for as_numpy=True')
+    return numpy.frombuffer(coords, dtype=numpy.float64).reshape(-1, 3)
+
+
+def _coordinates_element(el):
+    """Returns the <coordinates> element of a geometry element"""
+    if el.tag == KML_COORDINATES:
+        return el
+    coordinates = el.find(KML_COORDINATES)
+    if coordinates is None:
+        raise ValueError(f'{el.tag} has no coordinates')
+    return coordinates
+
+
+def coords_array(el, as_numpy=False):
+    """Returns the coordinates of a KML geometry element as a packed array
+
+    `el` is a <coordinates> element, a geometry element that contains one
+    (Point, LineString or LinearRing), a <gx:Track> or a <gx:coord> element.
+    Returns a flat array('d') of (longitude, latitude, altitude) triples, or
+    a (N, 3) NumPy array sharing its memory if `as_numpy` is True.
+    """
+    if el.tag == GX_TRACK:
+        coords = parse_gx_coords(coord.text for coord in el.iterchildren(GX_COORD))
+    elif el.tag == GX_COORD:
+        coords = parse_gx_coords([el.text])
+    else:
+        coords = parse_coordinates(_coordinates_element(el).text or '')
+
+    if as_numpy:
+        return _as_numpy(coords)
+    return coords
+
+
+def set_coords_array(el, coords, precision=None, altitude=True):
+    """Sets the coordinates of a KML geometry element from a packed array
+
+    `el` is any element accepted by `coords_array`.  The coordinates of a
+    <gx:Track> are written to its existing <gx:coord> elements, so `coords`
+    must hold one triple for each of them.
+    """
+    if el.tag == GX_TRACK:
+        elements = list(el.iterchildren(GX_COORD))
+        texts = format_gx_coords(coords, precision)
+        if len(texts) != len(elements):
+            raise ValueError(
+                f'{len(texts)} coordinates given for {len(elements)} gx:coord elements'
+            )
+    elif el.tag == GX_COORD:
+        elements = [el]
+        texts = format_gx_coords(coords, precision)
+        if len(texts) != 1:
+            raise ValueError('a gx:coord element holds a single coordinate')
+    else:
+        elements = [_coordinates_element(el)]
+        texts = [format_coordinates(coords, precision, altitude)]
+
+    for element, text in zip(elements, texts):
+        _set_text(element, text)
+
+
+def _set_text(el, text):
+    """Sets the text of an objectify or etree element"""
+    try:
+        el._setText(text)
+    except AttributeError:
+        el.text = text
+
+
+def _wkt_coordinates(text):
+    """Converts the text of a <coordinates> element to WKT coordinates
+
+    Values are copied as written; tuples of mixed size are completed with a
+    zero altitude.
+    """
+    text, count, size = _split_coordinates(text)
+    if size is None and count:
+        text = format_coordinates(parse_coordinates(text))
+    return text.replace(' ', '\t').replace(',', ' ').replace('\t', ', ')
+
+
+def _ring_texts(polygon):
+    """Returns the coordinate texts of the outer and inner rings of a
+    Polygon, or an empty list if it has no outer ring"""
+    texts = []
+    for boundary_tag in (KML_OUTER_BOUNDARY, KML_INNER_BOUNDARY):
+        for boundary in polygon.iterchildren(boundary_tag):
+            for ring in boundary.iterchildren(KML_LINEARRING):
+                for coordinates in ring.iterchildren(KML_COORDINATES):
+                    texts.append(coordinates.text or '')
+        if not texts:
+            break
+    return texts
+
+
+def _wkt_parts(el):
+    """Returns the WKT type name and body of a geometry element"""
+    tag = el.tag
+    if tag in (KML_POINT, KML_LINESTRING, KML_LINEARRING):
+        coordinates = el.find(KML_COORDINATES)
+        text = _wkt_coordinates(coordinates.text or '') if coordinates is not None else ''
+        name = 'POINT' if tag == KML_POINT else 'LINESTRING'
+    elif tag == KML_POLYGON:
+        rings = [_wkt_coordinates(text) for text in _ring_texts(el)]
+        if not rings:
+            return 'POLYGON', 'EMPTY'
+        return 'POLYGON', '(' + ', '.join(f'({r})' for r in rings) + ')'
+    elif tag == GX_TRACK:
+        tuples = []
+        for index, coord in enumerate(el.iterchildren(GX_COORD)):
+            values = (coord.text or '').split()
+            if len(values) != 3:
+                raise CoordinatesSyntaxError(
+                    'a gx:coord element must hold three values', index, coord.text or '')
+            tuples.append(' '.join(values))
+        text = ', '.join(tuples)
+        name = 'LINESTRING'
+    elif tag in (KML_MULTIGEOMETRY, GX_MULTITRACK):
+        parts = [_wkt_parts(c) for c in el.iterchildren(*GEOMETRY_TAGS)]
+        if not parts:
+            return 'GEOMETRYCOLLECTION', 'EMPTY'
+        names = {name for name, _ in parts}
+        if len(names) == 1 and names < {'POINT', 'LINESTRING', 'POLYGON'}:
+            return (f'MULTI{names.pop()}',
+                    '(' + ', '.join(body for _, body in parts) + ')')
+        return ('GEOMETRYCOLLECTION',
+                '(' + ', '.join(f'{n} {body}' for n, body in parts) + ')')
+    else:
+        raise ValueError(f'{tag} is not a supported geometry element')
+    return name, f'({text})' if text else 'EMPTY'
+
+
+def to_wkt(el):
+    """Returns the Well Known Text of a KML geometry element
+
+    `el` is a Point, LineString, LinearRing, Polygon, MultiGeometry,
+    gx:Track or gx:MultiTrack element.  LinearRing and gx:Track elements are
+    written as LINESTRING, and a MultiGeometry as a MULTIPOINT,
+    MULTILINESTRING or MULTIPOLYGON if all its geometries have the same
+    type, or as a GEOMETRYCOLLECTION otherwise.  Coordinate values are
+    copied as written in the document.
+    """
+    name, body = _wkt_parts(el)
+    return f'{name} {body}'
+
+
+def _wkb_coords(text):
+    """Returns the coordinates of a <coordinates> text and whether any of
+    its tuples has an altitude"""
+    coords = parse_coordinates(text)
+    return coords, text.count(',') > len(coords) // 3
+
+
+def _wkb_parts(el):
+    """Returns the WKB type name, content and altitude flag of a geometry
+
+    The content is an array of coordinates, a list of rings for polygons
+    and a list of parts for collections.
+    """
+    tag = el.tag
+    if tag in (KML_POINT, KML_LINESTRING, KML_LINEARRING):
+        coordinates = el.find(KML_COORDINATES)
+        coords, has_altitude = _wkb_coords(
+            coordinates.text or '' if coordinates is not None else '')
+        return ('POINT' if tag == KML_POINT else 'LINESTRING',
+                coords, has_altitude)
+    if tag == KML_POLYGON:
+        rings = [_wkb_coords(text) for text in _ring_texts(el)]
+        return ('POLYGON', [coords for coords, _ in rings],
+                any(has_altitude for _, has_altitude in rings))
+    if tag == GX_TRACK:
+        return ('LINESTRING',
+                parse_gx_coords(c.text for c in el.iterchildren(GX_COORD)),
+                True)
+    if tag in (KML_MULTIGEOMETRY, GX_MULTITRACK):
+        parts = [_wkb_parts(c) for c in el.iterchildren(*GEOMETRY_TAGS)]
+        names = {name for name, _, _ in parts}
+        if len(names) == 1 and names < {'POINT', 'LINESTRING', 'POLYGON'}:
+            name = f'MULTI{names.pop()}'
+        else:
+            name = 'GEOMETRYCOLLECTION'
+        return name, parts, any(has_altitude for _, _, has_altitude in parts)
+    raise ValueError(f'{tag} is not a supported geometry element')
+
+
+def _write_wkb_coords(write, coords, altitude):
+    if not altitude:
+        coords = coords[:]
+        del coords[2::3]
+    if sys.byteorder == 'big':
+        coords = coords[:]
+        coords.byteswap()
+    write(coords)
+
+
+def _write_wkb(write, name, content, altitude):
+    """Writes a geometry returned by `_wkb_parts` as little endian WKB"""
+    write(_WKB_HEADER.pack(1, _WKB_TYPES[name] + (1000 if altitude else 0)))
+    if name == 'POINT':
+        # an empty point is written with NaN coordinates
+        _write_wkb_coords(write, content or _WKB_EMPTY_POINT, altitude)
+    elif name == 'LINESTRING':
+        write(_WKB_COUNT.pack(len(content) // 3))
+        _write_wkb_coords(write, content, altitude)
+    elif name == 'POLYGON':
+        write(_WKB_COUNT.pack(len(content)))
+        for ring in content:
+            write(_WKB_COUNT.pack(len(ring) // 3))
+            _write_wkb_coords(write, ring, altitude)
+    else:
+        write(_WKB_COUNT.pack(len(content)))
+        for part_name, part_content, _ in content:
+            _write_wkb(write, part_name, part_content, altitude)
+
+
+def to_wkb(el, output=None, altitude=None):
+    """Returns the Well Known Binary of a KML geometry element
+
+    The geometry types are those of `to_wkt`, encoded as little endian ISO
+    WKB.  If `altitude` is None, the geometry is written with Z coordinates
+    if any of its coordinate tuples has an altitude; True or False force
+    three or two dimensions.  If `output` is a binary file object the WKB is
+    written to it and None is returned.
+    """
+    name, content, has_altitude = _wkb_parts(el)
+    if altitude is None:
+        altitude = has_altitude
+    if output is not None:
+        _write_wkb(output.write, name, content, altitude)
+        return None
+    buffer = BytesIO()
+    _write_wkb(buffer.write, name, content, altitude)
+    return buffer.getvalue()
@@ -0,0 +1,134 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.geometry
+#
+from array import array
+from typing import Any, BinaryIO, Callable, Iterable, List, Optional, \
+    Sequence, Tuple, Union
+
+from lxml import etree
+
+KML_COORDINATES: str = ...
+GX_COORD: str = ...
+GX_TRACK: str = ...
+GX_MULTITRACK: str = ...
+KML_POINT: str = ...
+KML_LINESTRING: str = ...
+KML_LINEARRING: str = ...
+KML_POLYGON: str = ...
+KML_MULTIGEOMETRY: str = ...
+KML_OUTER_BOUNDARY: str = ...
+KML_INNER_BOUNDARY: str = ...
+GEOMETRY_TAGS: Tuple[str, ...] = ...
+GEOMETRY_CONTAINER_TAGS: Tuple[str, ...] = ...
+
+Coordinates = Union[array, Sequence[float], Any]
+
+
+class CoordinatesSyntaxError(ValueError):
+    index: int
+    token: str
+
+    def __init__(self, message: str, index: int, token: str) -> None: ...
+
+
+class CoordinatesRangeError(ValueError):
+    index: int
+    value: float
+
+    def __init__(self, message: str, index: int, value: float) -> None: ...
+
+
+def _split_coordinates(text: str) -> Tuple[str, int, Optional[int]]:
+    ...
+
+
+def tokenize_coordinates(text: str) -> Tuple[List[str], Optional[int]]:
+    ...
+
+
+def _parse_values(text: str, count: int) -> Optional[array]:
+    ...
+
+
+def _parse_tuples(tuples: List[str]) -> array:
+    ...
+
+
+def parse_coordinates(text: str) -> array:
+    ...
+
+
+def parse_gx_coords(texts: Iterable[str]) -> array:
+    ...
+
+
+def check_ranges(coords: array) -> None:
+    ...
+
+
+def format_coordinates(coords: Coordinates,
+                       precision: Optional[int] = ...,
+                       altitude: bool = ...) \
+        -> str:
+    ...
+
+
+def format_gx_coords(coords: Coordinates,
+                     precision: Optional[int] = ...) \
+        -> List[str]:
+    ...
+
+
+def coords_array(el: etree._Element,
+                 as_numpy: bool = ...) \
+        -> Union[array, Any]:
+    ...
+
+
+def set_coords_array(el: etree._Element,
+                     coords: Coordinates,
+                     precision: Optional[int] = ...,
+                     altitude: bool = ...) \
+        -> None:
+    ...
+
+
+def _wkt_coordinates(text: str) -> str:
+    ...
+
+
+def _ring_texts(polygon: etree._Element) -> List[str]:
+    ...
+
+
+def _wkt_parts(el: etree._Element) -> Tuple[str, str]:
+    ...
+
+
+def to_wkt(el: etree._Element) -> str:
+    ...
+
+
+def _wkb_coords(text: str) -> Tuple[array, bool]:
+    ...
+
+
+def _wkb_parts(el: etree._Element) -> Tuple[str, Any, bool]:
+    ...
+
+
+def _write_wkb_coords(write: Callable[[Any], Any], coords: array,
+                      altitude: bool) -> None:
+    ...
+
+
+def _write_wkb(write: Callable[[Any], Any], name: str, content: Any,
+               altitude: bool) -> None:
+    ...
+
+
+def to_wkb(el: etree._Element, output: Optional[BinaryIO] = ...,
+           altitude: Optional[bool] = ...) -> Optional[bytes]:
+    ...
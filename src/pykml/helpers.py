@@ -8,9 +8,8 @@ The pykml.helpers module contains 'helper' functions that operate on pyKML
 document objects for accomplishing common tasks.
 """
 import re
-from decimal import Decimal
 
-from .factory import KML_ElementMaker as KML
+from .geometry import _split_coordinates
 
 
 def separate_namespace(qname):
@@ -24,139 +23,89 @@ def separate_namespace(qname):
     return namespace, element_name
 
 
+# order of the values in a coordinate tuple
+_COORDINATE_COLUMNS = ('longitude', 'latitude', 'altitude')
+
+# data types of the KML elements that hold a single value
+_VALUE_ELEMENTS = ('longitude', 'latitude', 'altitude', 'heading', 'tilt', 'range')
+
+_KML_COORDINATES = '{http://www.opengis.net/kml/2.2}coordinates'
+_GX_COORD = '{http://www.google.com/kml/ext/2.2}coord'
+
+
+def _format_tuple_values(values, size, column_formats, separator,
+                         tuple_separator=' '):
+    """Formats a flat list of coordinate tuple values in a single operation
+
+    `values` holds the string values of one or more tuples with `size` values
+    each; `column_formats` holds a printf-style format for each position in
+    a tuple, where '%s' leaves the value unchanged.
+    """
+    row_formats = column_formats[:size]
+    row_formats += ('%s',) * (size - len(row_formats))
+    for index, column_format in enumerate(row_formats):
+        if column_format != '%s':
+            values[index::size] = map(float, values[index::size])
+    row_format = separator.join(row_formats)
+    return tuple_separator.join([row_format] * (len(values) // size)) % tuple(values)
+
+
+def _format_coordinates(text, column_formats):
+    """Formats the tuples of a <coordinates> element"""
+    text, _, size = _split_coordinates(text)
+    if size is not None:
+        # all tuples have the same number of values, format them at once
+        values = text.replace(' ', ',').split(',')
+        return _format_tuple_values(values, size, column_formats, ',')
+    return ' '.join([
+        _format_tuple_values(t.split(','), t.count(',') + 1, column_formats, ',')
+        for t in text.split()
+    ])
+
+
 def set_max_decimal_places(doc, max_decimals):
     """Sets the maximum number of decimal places used by KML elements.
 
     - Elements of a vertex are delimited by single commas.
-    - Vertices are delimited by one or more space characters.
-
-    This method facilitates reducing the file size of a KML document.
+    - Vertices are delimited by any whitespace, and written separated by
+      single spaces.
+
+    This method facilitates reducing the file size of a KML document.  The
+    document is modified in place in a single pass; all values of a
+    coordinate string are parsed and formatted together, as binary floating
+    point numbers.  Malformed coordinate tuples raise
+    `pykml.geometry.CoordinatesSyntaxError`.
+
+    Since values are rounded as floats, a decimal halfway value is rounded
+    to the side of its nearest binary value: 2.675 is written as 2.67 with
+    two decimal places, where versions that rounded the decimal text with
+    `decimal.Decimal` wrote 2.68.
     """
-
-    def replace_delimited_string_member(
-            delimited_str,
-            separator,
-            index_no_,
-            q):
-        """Modify the number of decimal places for a delimited string member"""
-        values = delimited_str.split(separator)
-        values[index_no_] = str(Decimal(values[index_no_]).quantize(q))
-
-        return separator.join(values)
-
-    # Create Decimal quantization here for later lookup.
-    q_lookup = {}
-    for data_type, decimal_places in max_decimals.items():
-        # 2 places --> '0.01'
-        q_lookup[data_type] = Decimal(10) ** -decimal_places
-
-    del max_decimals
-
-    if 'longitude' in q_lookup:
-        data_type = 'longitude'
-        index_no = 0  # longitude is in the first position
-        # modify <longitude> elements
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}longitude'):
-            new_val = Decimal(el.text).quantize(q_lookup[data_type])
-            el.getparent().longitude = KML.longitude(new_val)
-        # modify <coordinates> elements
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}coordinates'):
-            vertex_str_list = []
-            for vertex in el.text.strip().split(' '):
-                vertex_str_list.append(
-                    replace_delimited_string_member(
-                        delimited_str=vertex,
-                        separator=',',
-                        index_no_=index_no,
-                        q=q_lookup[data_type]
-                    )
-                )
-            el_new = KML.coordinates(' '.join(vertex_str_list).strip())
-            el.getparent().replace(el, el_new)
-        # modify <gx:coords> elements
-        for el in doc.findall('.//{http://www.google.com/kml/ext/2.2}coord'):
-            el._setText(
-                replace_delimited_string_member(
-                    delimited_str=el.text,
-                    separator=' ',
-                    index_no_=index_no,
-                    q=q_lookup[data_type]
-                )
-            )
-
-    if 'latitude' in q_lookup:
-        data_type = 'latitude'
-        index_no = 1  # latitude is in the second position
-        # modify <latitude> elements
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}latitude'):
-            new_val = Decimal(el.text).quantize(q_lookup[data_type])
-            el.getparent().latitude = KML.latitude(new_val)
-        # modify <coordinates> elements
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}coordinates'):
-            vertex_str_list = []
-            for vertex in el.text.strip().split(' '):
-                vertex_str_list.append(
-                    replace_delimited_string_member(
-                        delimited_str=vertex,
-                        separator=',',
-                        index_no_=index_no,
-                        q=q_lookup[data_type]
-                    )
-                )
-            el_new = KML.coordinates(' '.join(vertex_str_list).strip())
-            el.getparent().replace(el, el_new)
-        # modify <gx:coords> elements
-        for el in doc.findall('.//{http://www.google.com/kml/ext/2.2}coord'):
-            el._setText(
-                replace_delimited_string_member(
-                    delimited_str=el.text,
-                    separator=' ',
-                    index_no_=index_no,
-                    q=q_lookup[data_type]
-                )
-            )
-
-    if 'altitude' in q_lookup:
-        data_type = 'altitude'
-        index_no = 2  # altitude is in the third position
-        # modify <altitude> elements
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}altitude'):
-            new_val = Decimal(el.text).quantize(q_lookup[data_type])
-            el.getparent().altitude = KML.altitude(new_val)
-        # modify <coordinates> elements
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}coordinates'):
-            vertex_str_list = []
-            for vertex in el.text.strip().split(' '):
-                vertex_str_list.append(
-                    replace_delimited_string_member(
-                        delimited_str=vertex,
-                        separator=',',
-                        index_no_=index_no,
-                        q=q_lookup[data_type]
-                    )
-                )
-            el_new = KML.coordinates(' '.join(vertex_str_list).strip())
-            el.getparent().replace(el, el_new)
-        # modify <gx:coords> elements
-        for el in doc.findall('.//{http://www.google.com/kml/ext/2.2}coord'):
-            el._setText(
-                replace_delimited_string_member(
-                    delimited_str=el.text,
-                    separator=' ',
-                    index_no_=index_no,
-                    q=q_lookup[data_type]
-                )
-            )
-
-    if 'heading' in q_lookup:
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}heading'):
-            new_val = Decimal(el.text).quantize(q_lookup['heading'])
-            el.getparent().heading = KML.heading(new_val)
-    if 'tilt' in q_lookup:
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}tilt'):
-            new_val = Decimal(el.text).quantize(q_lookup['tilt'])
-            el.getparent().tilt = KML.tilt(new_val)
-    if 'range' in q_lookup:
-        for el in doc.findall('.//{http://www.opengis.net/kml/2.2}range'):
-            new_val = Decimal(el.text).quantize(q_lookup['range'])
-            el.getparent().range = KML.range(new_val)
+    # 2 places --> '%.2f'
+    formats = {data_type: f'%.{decimal_places}f'
+               for data_type, decimal_places in max_decimals.items()}
+
+    value_formats = {
+        f'{{http://www.opengis.net/kml/2.2}}{data_type}': formats[data_type]
+        for data_type in _VALUE_ELEMENTS if data_type in formats
+    }
+    column_formats = tuple(formats.get(data_type, '%s')
+                           for data_type in _COORDINATE_COLUMNS)
+
+    tags = list(value_formats)
+    if any(column_format != '%s' for column_format in column_formats):
+        tags += [_KML_COORDINATES, _GX_COORD]
+    if not tags:
+        return
+
+    for el in doc.iter(*tags):
+        if not el.text:
+            continue
+        if el.tag == _KML_COORDINATES:
+            text = _format_coordinates(el.text, column_formats)
+        elif el.tag == _GX_COORD:
+            values = el.text.split()
+            text = _format_tuple_values(values, len(values), column_formats, ' ')
+        else:
+            text = value_formats[el.tag] % float(el.text)
+        el._setText(text)
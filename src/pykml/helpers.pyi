@@ -3,8 +3,7 @@
 #
 # Stub file for pyxml.helpers
 #
-from decimal import Decimal
-from typing import Optional, Tuple, Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from lxml import etree
 
@@ -14,10 +13,17 @@ def separate_namespace(qname: str) \
     ...
 
 
-def _replace_delimited_string_member(delimited_str: str,
-                                     separator: str,
-                                     index_no_: int,
-                                     q: Decimal) \
+def _format_tuple_values(values: List[str],
+                         size: int,
+                         column_formats: Sequence[str],
+                         separator: str,
+                         tuple_separator: str = ...) \
+        -> str:
+    ...
+
+
+def _format_coordinates(text: str,
+                        column_formats: Sequence[str]) \
         -> str:
     ...
 
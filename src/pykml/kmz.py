@@ -0,0 +1,156 @@
+#
+# coding: utf-8
+#
+# pykml.kmz
+#
+"""
+The pykml.kmz module provides access to KMZ files, the zip archives that
+package a KML document together with the files it references (icons,
+overlays, models).
+
+The KML document of an archive is parsed directly from the compressed
+member, without extracting it, and the other members are only read when
+they are opened.
+"""
+import io
+import shutil
+import zipfile
+from os import PathLike
+
+from lxml import etree
+
+from . import parser
+
+ZIP_MAGIC = b'PK\x03\x04'
+
+
+def is_kmz(source):
+    """Tests whether a file name or binary file object is a KMZ archive
+
+    Only the first bytes are compared with the zip signature.  File objects
+    are left at their current position.
+    """
+    if isinstance(source, (str, bytes, PathLike)):
+        try:
+            with open(source, 'rb') as f:
+                return f.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+        except OSError:
+            return False
+
+    peek = getattr(source, 'peek', None)
+    if peek is not None:
+        return peek(len(ZIP_MAGIC))[:len(ZIP_MAGIC)] == ZIP_MAGIC
+    try:
+        if not source.seekable():
+            return False
+        position = source.tell()
+        head = source.read(len(ZIP_MAGIC))
+        source.seek(position)
+    except (AttributeError, OSError):
+        return False
+    return head == ZIP_MAGIC
+
+
+class KmzFile:
+    """A KMZ archive
+
+    `file` is a file name or binary file object; `mode` is 'r' to read an
+    existing archive, or 'w' or 'a' to write one.  Members are written with
+    the deflate method at the given `compresslevel` (0 to 9, None for the
+    zlib default).  File objects that cannot seek, such as HTTP responses,
+    are read into memory first.
+    """
+
+    def __init__(self, file, mode='r', compresslevel=None):
+        if mode == 'r' and hasattr(file, 'read') and not _seekable(file):
+            file = io.BytesIO(file.read())
+        self._zip = zipfile.ZipFile(file, mode,
+                                    compression=zipfile.ZIP_DEFLATED,
+                                    compresslevel=compresslevel)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    def namelist(self):
+        """Returns the names of the members of the archive"""
+        return self._zip.namelist()
+
+    @property
+    def kml_name(self):
+        """The name of the KML document of the archive
+
+        This is 'doc.kml' if the archive contains it, or else the first
+        .kml file at the root of the archive.
+        """
+        names = self._zip.namelist()
+        if 'doc.kml' in names:
+            return 'doc.kml'
+        for name in names:
+            if name.lower().endswith('.kml') and '/' not in name:
+                return name
+        raise KeyError('the archive does not contain a KML document')
+
+    def open(self, name, mode='r'):
+        """Opens a member of the archive as a binary file object
+
+        With `mode` 'w' a new member is written through the file object.
+        """
+        return self._zip.open(name, mode)
+
+    def read(self, name):
+        """Returns the contents of a member of the archive"""
+        return self._zip.read(name)
+
+    def parse(self, schema=None, parser_options=None):
+        """Parses the KML document of the archive
+
+        See `pykml.parser.parse`.
+        """
+        with self._zip.open(self.kml_name) as f:
+            return parser.parse(f, schema=schema, parser_options=parser_options)
+
+    def iterparse(self, tag='Placemark', schema=None, parser_options=None):
+        """Incrementally parses the KML document of the archive
+
+        See `pykml.parser.iterparse`.
+        """
+        with self._zip.open(self.kml_name) as f:
+            yield from parser.iterparse(f, tag=tag, schema=schema,
+                                        parser_options=parser_options)
+
+    def write_kml(self, doc, name='doc.kml', pretty_print=False):
+        """Writes a KML document to the archive
+
+        The document is serialized straight into the compressed member.  It
+        should be the first member written, so that it is found by clients
+        that use the first .kml file of an archive.
+        """
+        if not hasattr(doc, 'getroot'):
+            doc = etree.ElementTree(doc)
+        with self._zip.open(name, 'w') as f:
+            doc.write(f, encoding='utf-8', xml_declaration=True,
+                      pretty_print=pretty_print)
+
+    def write(self, name, data):
+        """Writes a member to the archive
+
+        `data` is a bytes object or a binary file object.
+        """
+        if isinstance(data, bytes):
+            self._zip.writestr(name, data)
+        else:
+            with self._zip.open(name, 'w') as f:
+                shutil.copyfileobj(data, f)
+
+
+def _seekable(fileobject):
+    try:
+        return fileobject.seekable()
+    except AttributeError:
+        return False
@@ -0,0 +1,63 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.kmz
+#
+from typing import IO, Any, BinaryIO, Dict, Iterator, List, Optional, Sequence, Union
+
+from lxml import etree
+
+ZIP_MAGIC: bytes = ...
+
+
+def is_kmz(source: Union[str, bytes, Any, BinaryIO]) -> bool:
+    ...
+
+
+class KmzFile:
+    def __init__(self, file: Union[str, Any, BinaryIO], mode: str = ...,
+                 compresslevel: Optional[int] = ...) -> None:
+        ...
+
+    def __enter__(self) -> 'KmzFile':
+        ...
+
+    def __exit__(self, *exc_info: Any) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+    def namelist(self) -> List[str]:
+        ...
+
+    @property
+    def kml_name(self) -> str:
+        ...
+
+    def open(self, name: str, mode: str = ...) -> IO[bytes]:
+        ...
+
+    def read(self, name: str) -> bytes:
+        ...
+
+    def parse(self, schema: Optional[Any] = ...,
+              parser_options: Optional[Dict[str, Any]] = ...) -> etree._ElementTree:
+        ...
+
+    def iterparse(self, tag: Union[str, Sequence[str]] = ...,
+                  schema: Optional[Any] = ...,
+                  parser_options: Optional[Dict[str, Any]] = ...) \
+            -> Iterator[etree._Element]:
+        ...
+
+    def write_kml(self, doc: Union[etree._Element, etree._ElementTree],
+                  name: str = ..., pretty_print: bool = ...) -> None:
+        ...
+
+    def write(self, name: str, data: Union[bytes, BinaryIO]) -> None:
+        ...
+
+
+def _seekable(fileobject: Any) -> bool:
+    ...
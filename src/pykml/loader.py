@@ -0,0 +1,461 @@
+#
+# coding: utf-8
+#
+# pykml.loader
+#
+"""
+The pykml.loader module loads many KML and KMZ documents concurrently with
+asyncio.
+
+HTTP connections are kept alive and reused, the number of simultaneous
+requests is bounded, and the body of each response is fed to an incremental
+parser as it arrives, so that parsing overlaps network I/O.  Local files are
+parsed in a thread, and so are requests to hosts that are reached through a
+proxy (configured with the `http_proxy` and `https_proxy` environment
+variables), which are sent with urllib.  Only the standard library is used.
+"""
+import asyncio
+import ssl
+import zlib
+from http.client import parse_headers
+from io import BytesIO
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+from urllib.request import HTTPSHandler
+from urllib.request import ProxyHandler
+from urllib.request import Request
+from urllib.request import build_opener
+from urllib.request import getproxies
+from urllib.request import proxy_bypass
+from urllib.request import url2pathname
+
+from lxml import objectify
+
+from . import version as pykml_version
+from .kmz import ZIP_MAGIC, KmzFile
+from .parser import _make_parser_options, parse
+
+READ_SIZE = 64 * 1024
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+class Response:
+    """The final URL, status and headers of an HTTP response
+
+    `headers` is an `http.client.HTTPMessage`.  Local files are reported
+    with a status of 200 and no headers.
+    """
+
+    def __init__(self, url, status, reason, headers):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+
+    def __repr__(self):
+        return f'<Response {self.status} {self.url}>'
+
+
+class _Connection:
+    """An open HTTP connection"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class _DocumentFeeder:
+    """Feeds response bodies to an incremental parser
+
+    KMZ archives, recognized by their first bytes, cannot be parsed
+    incrementally and are collected until the response is complete.
+    """
+
+    def __init__(self, schema, parser_options):
+        self._schema = schema
+        self._parser_options = parser_options
+        self._parser = None
+        self._head = b''
+        self._archive = None
+
+    def feed(self, data):
+        if self._parser is None and self._archive is None:
+            self._head += data
+            if len(self._head) < len(ZIP_MAGIC):
+                return
+            data, self._head = self._head, b''
+            if data.startswith(ZIP_MAGIC):
+                self._archive = []
+            else:
+                self._parser = objectify.makeparser(
+                    **_make_parser_options(self._schema, self._parser_options))
+        if self._archive is not None:
+            self._archive.append(data)
+        else:
+            self._parser.feed(data)
+
+    def close(self):
+        """Returns the parsed document, like `pykml.parser.parse`"""
+        if self._head or (self._parser is None and self._archive is None):
+            # bodies shorter than the zip signature
+            self._parser = objectify.makeparser(
+                **_make_parser_options(self._schema, self._parser_options))
+            self._parser.feed(self._head)
+        if self._archive is not None:
+            with KmzFile(BytesIO(b''.join(self._archive))) as kmz:
+                return kmz.parse(self._schema, self._parser_options)
+        return self._parser.close().getroottree()
+
+
+def _local_path(uri):
+    """Returns the file name of a local URI, or None for remote URIs"""
+    parts = urlsplit(uri)
+    if parts.scheme == 'file':
+        return url2pathname(parts.path)
+    if parts.scheme in DEFAULT_PORTS:
+        return None
+    if len(parts.scheme) > 1:
+        raise URLError(f'unsupported URL scheme: {parts.scheme}')
+    # no scheme, or a Windows drive letter
+    return uri
+
+
+def _decoder(headers, consume):
+    """Wraps `consume` to decompress a gzip encoded body
+
+    Returns the wrapper and a function to call at the end of the body.
+    """
+    if headers.get('content-encoding', '').lower() != 'gzip':
+        return consume, lambda: None
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decode(data):
+        data = decompressor.decompress(data)
+        if data:
+            consume(data)
+
+    def flush():
+        data = decompressor.flush()
+        if data:
+            consume(data)
+
+    return decode, flush
+
+
+class AsyncLoader:
+    """Loads KML and KMZ documents concurrently
+
+    At most `max_connections` requests are in progress at any time, and
+    idle connections are kept open for reuse until the loader is closed.
+    `timeout` limits, in seconds, each connection attempt and each read.
+    Documents are parsed with the given `schema` and `parser_options`, as
+    with `pykml.parser.parse`.  Requests to hosts for which a proxy is
+    configured are sent with urllib in a thread.  Use the loader as an asynchronous context
+    manager, or call `close` when done::
+
+        async with AsyncLoader(max_connections=8) as loader:
+            docs = await loader.parse_all(uris)
+    """
+
+    def __init__(self, max_connections=10, timeout=30.0, schema=None,
+                 parser_options=None, ssl_context=None, max_redirects=5,
+                 headers=None):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.schema = schema
+        self.parser_options = parser_options
+        self.ssl_context = ssl_context
+        self.max_redirects = max_redirects
+        self.headers = {
+            'User-Agent': f'pykml/{pykml_version}',
+            'Accept-Encoding': 'gzip',
+        }
+        self.headers.update(headers or {})
+        self._semaphore = None
+        self._idle = {}
+        self._proxies = getproxies()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Closes the idle connections"""
+        idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+                try:
+                    await connection.writer.wait_closed()
+                except OSError:
+                    pass
+
+    async def fetch(self, uri, headers=None):
+        """Returns the Response and the body of a URI
+
+        `headers` are added to the request, e.g. for conditional requests.
+        Responses with an error status raise `urllib.error.HTTPError`.
+        """
+        path = _local_path(uri)
+        if path is not None:
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(None, _read_file, path)
+            return Response(uri, 200, 'OK', parse_headers(BytesIO(b'\r\n'))), body
+
+        chunks = []
+        response = await self._request(uri, headers, chunks.append)
+        return response, b''.join(chunks)
+
+    async def parse(self, uri):
+        """Parses a KML or KMZ document
+
+        Returns an ElementTree, as `pykml.parser.parse` does.
+        """
+        path = _local_path(uri)
+        if path is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None, lambda: parse(path, self.schema, self.parser_options))
+
+        feeder = _DocumentFeeder(self.schema, self.parser_options)
+        await self._request(uri, None, feeder.feed)
+        return feeder.close()
+
+    async def parse_all(self, uris, return_exceptions=False):
+        """Parses several documents concurrently
+
+        Returns the documents in the order of `uris`.  If
+        `return_exceptions` is True, the exception raised for a document is
+        returned in its place instead of being raised.
+        """
+        return await asyncio.gather(*[self.parse(uri) for uri in uris],
+                                    return_exceptions=return_exceptions)
+
+    # HTTP
+
+    async def _request(self, uri, headers, consume):
+        """Sends a GET request and passes the body of the final response,
+        after any redirects, to `consume`"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        parts = urlsplit(uri)
+        if parts.scheme in self._proxies and not proxy_bypass(parts.hostname):
+            async with self._semaphore:
+                return await self._request_with_proxy(uri, headers, consume)
+        for _ in range(self.max_redirects + 1):
+            async with self._semaphore:
+                response, location = await self._request_once(uri, headers, consume)
+            if location is None:
+                return response
+            uri = urljoin(uri, location)
+        raise URLError(f'too many redirects: {uri}')
+
+    async def _request_once(self, uri, headers, consume):
+        """Sends a single request; returns the response and the location of
+        a redirect"""
+        parts = urlsplit(uri)
+        key = (parts.scheme, parts.hostname, parts.port or DEFAULT_PORTS[parts.scheme])
+        request = self._format_request(parts, headers)
+
+        idle = self._idle.get(key)
+        while True:
+            reused = bool(idle)
+            connection = idle.pop() if reused else await self._connect(key)
+            try:
+                head = await self._send(connection, request)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                connection.close()
+                # the server may have closed an idle connection
+                if not reused:
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+
+        try:
+            status, reason, response_headers, keep_alive = head
+            response = Response(uri, status, reason, response_headers)
+            location = response_headers.get('location')
+            if status in REDIRECT_STATUSES and location:
+                keep_alive &= await self._read_body(connection, response, None)
+                return response, location
+            if status >= 400:
+                keep_alive = False
+                raise HTTPError(uri, status, reason, response_headers, None)
+            keep_alive &= await self._read_body(connection, response, consume)
+        except BaseException:
+            connection.close()
+            raise
+
+        if keep_alive:
+            self._idle.setdefault(key, []).append(connection)
+        else:
+            connection.close()
+        return response, None
+
+    async def _request_with_proxy(self, uri, headers, consume):
+        """Sends a GET request through a proxy with urllib, which follows
+        the redirects"""
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        opener = build_opener(ProxyHandler(self._proxies),
+                              HTTPSHandler(context=self.ssl_context))
+        loop = asyncio.get_running_loop()
+        try:
+            f = await loop.run_in_executor(None, lambda: opener.open(
+                Request(uri, headers=request_headers), timeout=self.timeout))
+        except HTTPError as e:
+            if e.code != 304:
+                raise
+            e.close()
+            return Response(uri, e.code, e.reason, e.headers)
+
+        with f:
+            response = Response(f.url, f.status, f.reason, f.headers)
+            consume, flush = _decoder(f.headers, consume)
+            while True:
+                data = await loop.run_in_executor(None, f.read, READ_SIZE)
+                if not data:
+                    break
+                consume(data)
+            flush()
+        return response
+
+    def _format_request(self, parts, headers):
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        host = parts.hostname
+        if ':' in host:
+            host = f'[{host}]'
+        if parts.port:
+            host += f':{parts.port}'
+        lines = [f'GET {target} HTTP/1.1', f'Host: {host}']
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        lines.extend(f'{name}: {value}' for name, value in request_headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        context = None
+        if scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context), self.timeout)
+        return _Connection(reader, writer)
+
+    async def _send(self, connection, request):
+        """Sends a request and reads the status line and headers"""
+        connection.writer.write(request)
+        await asyncio.wait_for(connection.writer.drain(), self.timeout)
+        status_line = await self._read_line(connection)
+        if not status_line:
+            raise ConnectionResetError('connection closed by the server')
+        version, status, reason = (status_line.decode('latin-1').rstrip('\r\n')
+                                   .split(' ', 2) + [''])[:3]
+
+        header_lines = []
+        while True:
+            line = await self._read_line(connection)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            header_lines.append(line)
+        headers = parse_headers(BytesIO(b''.join(header_lines) + b'\r\n'))
+
+        keep_alive = (version == 'HTTP/1.1' and
+                      headers.get('connection', '').lower() != 'close')
+        return int(status), reason, headers, keep_alive
+
+    async def _read_line(self, connection):
+        return await asyncio.wait_for(connection.reader.readline(), self.timeout)
+
+    async def _read(self, connection, size):
+        return await asyncio.wait_for(connection.reader.read(size), self.timeout)
+
+    async def _read_exactly(self, connection, size):
+        return await asyncio.wait_for(connection.reader.readexactly(size),
+                                      self.timeout)
+
+    async def _read_body(self, connection, response, consume):
+        """Reads the body of a response, passing it to `consume` (or
+        discarding it if None); returns whether the connection can be
+        reused"""
+        if response.status in (204, 304) or 100 <= response.status < 200:
+            return True
+        if consume is None:
+            return await self._read_content(connection, response.headers, None)
+        consume, flush = _decoder(response.headers, consume)
+        keep_alive = await self._read_content(connection, response.headers, consume)
+        flush()
+        return keep_alive
+
+    async def _read_content(self, connection, headers, consume):
+        """Reads the body of a response as it is framed on the connection"""
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            while True:
+                size_line = await self._read_line(connection)
+                if not size_line:
+                    raise asyncio.IncompleteReadError(b'', None)
+                try:
+                    size = int(size_line.split(b';', 1)[0], 16)
+                except ValueError:
+                    raise ValueError(f'invalid chunk size line: {size_line!r}') from None
+                if size == 0:
+                    # trailer headers, up to an empty line
+                    while await self._read_line(connection) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return True
+                data = await self._read_exactly(connection, size)
+                await self._read_exactly(connection, 2)
+                if consume is not None:
+                    consume(data)
+
+        length = headers.get('content-length')
+        if length is not None:
+            remaining = int(length)
+            while remaining:
+                data = await self._read(connection, min(remaining, READ_SIZE))
+                if not data:
+                    raise asyncio.IncompleteReadError(b'', remaining)
+                remaining -= len(data)
+                if consume is not None:
+                    consume(data)
+            return True
+
+        # the body ends when the server closes the connection
+        while True:
+            data = await self._read(connection, READ_SIZE)
+            if not data:
+                return False
+            if consume is not None:
+                consume(data)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_kml_uris(uris, max_connections=10, timeout=30.0, schema=None,
+                  parser_options=None, return_exceptions=False):
+    """Parses several KML or KMZ documents concurrently
+
+    This is a synchronous wrapper around `AsyncLoader.parse_all`, which
+    runs its own event loop.
+    """
+
+    async def load():
+        async with AsyncLoader(max_connections=max_connections,
+                               timeout=timeout, schema=schema,
+                               parser_options=parser_options) as loader:
+            return await loader.parse_all(uris, return_exceptions)
+
+    return asyncio.run(load())
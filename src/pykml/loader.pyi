@@ -0,0 +1,115 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.loader
+#
+import asyncio
+import ssl
+from http.client import HTTPMessage
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from lxml import etree
+
+READ_SIZE: int = ...
+REDIRECT_STATUSES: Tuple[int, ...] = ...
+DEFAULT_PORTS: Dict[str, int] = ...
+
+
+class Response:
+    url: str
+    status: int
+    reason: str
+    headers: HTTPMessage
+
+    def __init__(self, url: str, status: int, reason: str, headers: HTTPMessage) -> None:
+        ...
+
+
+class _Connection:
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class _DocumentFeeder:
+    def __init__(self, schema: Optional[Any],
+                 parser_options: Optional[Dict[str, Any]]) -> None:
+        ...
+
+    def feed(self, data: bytes) -> None:
+        ...
+
+    def close(self) -> etree._ElementTree:
+        ...
+
+
+def _local_path(uri: str) -> Optional[str]:
+    ...
+
+
+def _decoder(headers: HTTPMessage, consume: Callable[[bytes], None]) \
+        -> Tuple[Callable[[bytes], None], Callable[[], None]]:
+    ...
+
+
+class AsyncLoader:
+    max_connections: int
+    timeout: Optional[float]
+    schema: Optional[Any]
+    parser_options: Optional[Dict[str, Any]]
+    ssl_context: Optional[ssl.SSLContext]
+    max_redirects: int
+    headers: Dict[str, str]
+
+    def __init__(self, max_connections: int = ..., timeout: Optional[float] = ...,
+                 schema: Optional[Any] = ...,
+                 parser_options: Optional[Dict[str, Any]] = ...,
+                 ssl_context: Optional[ssl.SSLContext] = ...,
+                 max_redirects: int = ...,
+                 headers: Optional[Dict[str, str]] = ...) -> None:
+        ...
+
+    async def __aenter__(self) -> 'AsyncLoader':
+        ...
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+    async def fetch(self, uri: str,
+                    headers: Optional[Dict[str, str]] = ...) -> Tuple[Response, bytes]:
+        ...
+
+    async def parse(self, uri: str) -> etree._ElementTree:
+        ...
+
+    async def parse_all(self, uris: Iterable[str], return_exceptions: bool = ...) \
+            -> List[Union[etree._ElementTree, BaseException]]:
+        ...
+
+    async def _request(self, uri: str, headers: Optional[Dict[str, str]],
+                       consume: Callable[[bytes], None]) -> Response:
+        ...
+
+    async def _request_with_proxy(self, uri: str, headers: Optional[Dict[str, str]],
+                                  consume: Callable[[bytes], None]) -> Response:
+        ...
+
+
+def _read_file(path: str) -> bytes:
+    ...
+
+
+def load_kml_uris(uris: Iterable[str], max_connections: int = ...,
+                  timeout: Optional[float] = ..., schema: Optional[Any] = ...,
+                  parser_options: Optional[Dict[str, Any]] = ...,
+                  return_exceptions: bool = ...) \
+        -> List[Union[etree._ElementTree, BaseException]]:
+    ...
@@ -0,0 +1,444 @@
+#
+# coding: utf-8
+#
+# pykml.network
+#
+"""
+The pykml.network module resolves trees of NetworkLink references.
+
+Starting from one document, the NetworkLink/Link/href references are
+followed recursively and the linked documents are fetched concurrently.
+Responses are kept in a persistent on-disk cache, which honours the refresh
+interval of the link, the NetworkLinkControl expiry of the document and the
+HTTP caching headers, and revalidates stale entries with their ETag and
+Last-Modified headers.  The result is a graph of lazily parsed documents,
+or a single document in which each NetworkLink is replaced by the contents
+of the document it links to.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from urllib.parse import urldefrag, urljoin
+
+from lxml import etree
+
+from .factory import KML_ElementMaker as KML
+from .kmz import ZIP_MAGIC, KmzFile
+from .loader import AsyncLoader, _DocumentFeeder, _local_path
+
+KML_NETWORKLINK = '{http://www.opengis.net/kml/2.2}NetworkLink'
+KML_NETWORKLINKCONTROL = '{http://www.opengis.net/kml/2.2}NetworkLinkControl'
+KML_LINK = '{http://www.opengis.net/kml/2.2}Link'
+KML_URL = '{http://www.opengis.net/kml/2.2}Url'
+KML_HREF = '{http://www.opengis.net/kml/2.2}href'
+KML_REFRESHMODE = '{http://www.opengis.net/kml/2.2}refreshMode'
+KML_REFRESHINTERVAL = '{http://www.opengis.net/kml/2.2}refreshInterval'
+KML_EXPIRES = '{http://www.opengis.net/kml/2.2}expires'
+
+# children of a NetworkLink that do not carry over to the merged Folder
+_NETWORKLINK_ONLY = frozenset((
+    KML_LINK, KML_URL,
+    '{http://www.opengis.net/kml/2.2}refreshVisibility',
+    '{http://www.opengis.net/kml/2.2}flyToView',
+))
+
+DEFAULT_CACHE_SIZE = 256 * 2 ** 20
+
+
+class HttpCache:
+    """A persistent cache of HTTP responses
+
+    Each response is stored in `directory` as a body file and a JSON
+    metadata file, named by a hash of the URL.  When the bodies exceed
+    `max_size` bytes, the least recently used entries are removed.
+    Entries are written atomically, so a cache directory can be shared by
+    several processes, and the cache can be used from several threads.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in os.scandir(directory)
+                        if entry.name.endswith('.body'))
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, url):
+        """Returns the metadata of a cached response, or None"""
+        try:
+            with open(self._path(url, '.json'), encoding='utf-8') as f:
+                metadata = json.load(f)
+            # the modification time of the body records its last use
+            os.utime(self._path(url, '.body'))
+        except (OSError, ValueError):
+            return None
+        return metadata if metadata.get('url') == url else None
+
+    def read(self, url):
+        """Returns the body of a cached response"""
+        with open(self._path(url, '.body'), 'rb') as f:
+            return f.read()
+
+    def put(self, url, body, metadata):
+        """Stores a response
+
+        `metadata` is a JSON serializable dict; if `body` is None, only the
+        metadata of an existing entry is replaced.
+        """
+        metadata = dict(metadata, url=url)
+        with self._lock:
+            if body is not None:
+                path = self._path(url, '.body')
+                try:
+                    self.size -= os.stat(path).st_size
+                except OSError:
+                    pass
+                self._write(path, body)
+                self.size += len(body)
+            self._write(self._path(url, '.json'),
+                        json.dumps(metadata).encode('utf-8'))
+            if self.size > self.max_size:
+                self._evict(keep=self._path(url, '.body'))
+
+    def remove(self, url):
+        """Removes a response from the cache"""
+        with self._lock:
+            self._remove(self._path(url, '.body'))
+
+    def clear(self):
+        """Removes all responses from the cache"""
+        with self._lock:
+            for entry in list(os.scandir(self.directory)):
+                if entry.name.endswith('.body'):
+                    self._remove(entry.path)
+
+    def _write(self, path, data):
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+
+    def _remove(self, body_path):
+        try:
+            self.size -= os.stat(body_path).st_size
+            os.remove(body_path)
+        except OSError:
+            pass
+        try:
+            os.remove(body_path[:-len('.body')] + '.json')
+        except OSError:
+            pass
+
+    def _evict(self, keep):
+        entries = sorted((entry.stat().st_mtime, entry.path)
+                         for entry in os.scandir(self.directory)
+                         if entry.name.endswith('.body'))
+        for _, path in entries:
+            if self.size <= self.max_size:
+                break
+            if path != keep:
+                self._remove(path)
+
+
+class NetworkLinkNode:
+    """A document of a NetworkLink graph
+
+    `links` are the nodes of the documents referenced by the NetworkLinks
+    of this document, in document order; a node is shared by all the links
+    to its URI, so the graph may contain cycles.  `error` is the exception
+    raised when loading the document, if any.  The document itself is only
+    parsed when `document` is first accessed.
+    """
+
+    def __init__(self, resolver, uri, refresh_interval=None):
+        self.resolver = resolver
+        self.uri = uri
+        self.refresh_interval = refresh_interval
+        self.links = []
+        self.hrefs = []
+        self.error = None
+        self.from_cache = False
+        self.expires = None
+        self._body = None
+        self._document = None
+
+    def __repr__(self):
+        return f'<NetworkLinkNode {self.uri}>'
+
+    @property
+    def body(self):
+        """The raw KML or KMZ document"""
+        if self.error is not None:
+            raise self.error
+        return self._body
+
+    @property
+    def document(self):
+        """The parsed document, as returned by `pykml.parser.parse`"""
+        if self._document is None:
+            feeder = _DocumentFeeder(self.resolver.schema,
+                                     self.resolver.parser_options)
+            feeder.feed(self.body)
+            self._document = feeder.close()
+        return self._document
+
+    def walk(self):
+        """Yields the nodes reachable from this node, each once"""
+        seen = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.uri in seen:
+                continue
+            seen.add(node.uri)
+            yield node
+            stack.extend(reversed(node.links))
+
+
+class NetworkLinkResolver:
+    """Resolves NetworkLink references recursively
+
+    Responses are cached in `cache_dir`, if given, up to `max_cache_size`
+    bytes.  A cached response is used without a request while it is fresh:
+    for the `refreshInterval` of an onInterval link, until the `expires`
+    time of the NetworkLinkControl of the document, or else as the HTTP
+    Cache-Control and Expires headers allow, defaulting to `default_ttl`
+    seconds.  Stale responses are revalidated with a conditional request.
+    Links are followed up to `max_depth` levels (None for no limit).  The
+    other arguments are passed to `pykml.loader.AsyncLoader`.
+    """
+
+    def __init__(self, cache_dir=None, max_cache_size=DEFAULT_CACHE_SIZE,
+                 max_depth=None, default_ttl=0.0, max_connections=10,
+                 timeout=30.0, schema=None, parser_options=None):
+        self.cache = HttpCache(cache_dir, max_cache_size) if cache_dir else None
+        self.max_depth = max_depth
+        self.default_ttl = default_ttl
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.schema = schema
+        self.parser_options = parser_options
+
+    async def resolve(self, uri):
+        """Returns the root NetworkLinkNode of the graph of `uri`
+
+        Documents that fail to load are reported by the `error` of their
+        node, except for the root document, whose error is raised.
+        """
+        nodes = {}
+        root = nodes[uri] = NetworkLinkNode(self, uri)
+
+        async with AsyncLoader(max_connections=self.max_connections,
+                               timeout=self.timeout) as loader:
+
+            async def visit(node, depth):
+                await self._load(loader, node)
+                if self.max_depth is not None and depth >= self.max_depth:
+                    return
+                pending = []
+                for href, refresh_interval in node.hrefs:
+                    child = nodes.get(href)
+                    if child is None:
+                        child = nodes[href] = NetworkLinkNode(self, href,
+                                                              refresh_interval)
+                        pending.append(visit(child, depth + 1))
+                    node.links.append(child)
+                await asyncio.gather(*pending)
+
+            await visit(root, 0)
+
+        if root.error is not None:
+            raise root.error
+        return root
+
+    async def _load(self, loader, node):
+        """Fetches a document, from the cache if possible, and finds its
+        links
+
+        The cache files are read and written in a thread, so as not to
+        block the event loop.  The body of a cached response is read at once,
+        since caching the other documents may evict it.
+        """
+        try:
+            if _local_path(node.uri) is not None or self.cache is None:
+                response, node._body = await loader.fetch(node.uri)
+                node.hrefs, node.expires = await _scan(node.uri, node._body)
+                return
+
+            loop = asyncio.get_running_loop()
+            metadata = await loop.run_in_executor(None, self.cache.get, node.uri)
+            if metadata is not None:
+                try:
+                    cached_body = await loop.run_in_executor(None, self.cache.read,
+                                                             node.uri)
+                except OSError:
+                    # removed by another process
+                    metadata = None
+            now = time.time()
+            if metadata is not None and (metadata['expires'] or 0) > now:
+                node.from_cache = True
+                node._body = cached_body
+            else:
+                headers = {}
+                if metadata is not None and metadata.get('etag'):
+                    headers['If-None-Match'] = metadata['etag']
+                if metadata is not None and metadata.get('last_modified'):
+                    headers['If-Modified-Since'] = metadata['last_modified']
+                response, body = await loader.fetch(node.uri, headers)
+                if response.status == 304 and metadata is not None:
+                    node.from_cache = True
+                    node._body = cached_body
+                    body = None
+                else:
+                    node._body = body
+                    hrefs, kml_expires = await _scan(node.uri, body)
+                    metadata = {
+                        'etag': response.headers.get('etag'),
+                        'last_modified': response.headers.get('last-modified'),
+                        'hrefs': hrefs,
+                        'kml_expires': kml_expires,
+                    }
+                metadata['expires'] = self._expires(node, metadata,
+                                                    response.headers, now)
+                if 'no-store' in response.headers.get('cache-control', ''):
+                    await loop.run_in_executor(None, self.cache.remove, node.uri)
+                else:
+                    await loop.run_in_executor(None, self.cache.put, node.uri,
+                                               body, metadata)
+            node.hrefs = [tuple(href) for href in metadata['hrefs']]
+            node.expires = metadata['expires']
+        except Exception as e:
+            node.error = e
+
+    def _expires(self, node, metadata, headers, now):
+        """Returns the time until which a response is fresh"""
+        if node.refresh_interval is not None:
+            return now + node.refresh_interval
+        if metadata.get('kml_expires') is not None:
+            return metadata['kml_expires']
+        for directive in headers.get('cache-control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            if name.lower() in ('no-cache', 'no-store'):
+                return now
+            if name.lower() == 'max-age':
+                try:
+                    return now + int(value)
+                except ValueError:
+                    pass
+        if headers.get('expires'):
+            try:
+                return parsedate_to_datetime(headers['expires']).timestamp()
+            except (TypeError, ValueError):
+                return now
+        return now + self.default_ttl
+
+    def merge(self, node):
+        """Returns a copy of the document of `node` in which every resolved
+        NetworkLink is replaced by a Folder with the features of the linked
+        document
+
+        The Folder keeps the name, visibility and other Feature elements of
+        the NetworkLink.  Links that failed to load, were not followed or
+        lead back to an enclosing document are left in place.
+        """
+        return self._merge(node, (node.uri,))
+
+    def _merge(self, node, ancestors):
+        doc = copy.deepcopy(node.document)
+        children = {child.uri: child for child in node.links}
+        for networklink in list(doc.getroot().iter(KML_NETWORKLINK)):
+            href = _link_href(networklink)
+            child = children.get(_resolve_href(node.uri, href)) if href else None
+            if child is None or child.error is not None or child.uri in ancestors:
+                continue
+            folder = KML.Folder(*[copy.deepcopy(element) for element in networklink.iterchildren()
+                                  if element.tag not in _NETWORKLINK_ONLY])
+            linked = self._merge(child, ancestors + (child.uri,)).getroot()
+            for feature in list(linked.iterchildren()):
+                if feature.tag != KML_NETWORKLINKCONTROL:
+                    folder.append(feature)
+            networklink.getparent().replace(networklink, folder)
+        return doc
+
+
+def _link_href(networklink):
+    link = networklink.find(KML_LINK)
+    if link is None:
+        link = networklink.find(KML_URL)
+    href = link.findtext(KML_HREF) if link is not None else None
+    return href.strip() if href else None
+
+
+def _resolve_href(base, href):
+    return urldefrag(urljoin(base, href))[0]
+
+
+def _parse_kml_datetime(text):
+    """Returns a timestamp for a KML dateTime, or None"""
+    text = text.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        return None
+
+
+def _scan_links(uri, body):
+    """Returns the links of a KML or KMZ document, as (href, refresh
+    interval) pairs, and the expiry time of its NetworkLinkControl"""
+    if body.startswith(ZIP_MAGIC):
+        with KmzFile(BytesIO(body)) as kmz:
+            body = kmz.read(kmz.kml_name)
+
+    hrefs = []
+    expires = None
+    for _, element in etree.iterparse(BytesIO(body), huge_tree=True,
+                                      tag=(KML_NETWORKLINK, KML_NETWORKLINKCONTROL)):
+        if element.tag == KML_NETWORKLINK:
+            href = _link_href(element)
+            if href:
+                link = element.find(KML_LINK)
+                if link is None:
+                    link = element.find(KML_URL)
+                refresh_interval = None
+                if link.findtext(KML_REFRESHMODE, '').strip() == 'onInterval':
+                    try:
+                        refresh_interval = float(link.findtext(KML_REFRESHINTERVAL))
+                    except (TypeError, ValueError):
+                        pass
+                hrefs.append((_resolve_href(uri, href), refresh_interval))
+        else:
+            text = element.findtext(KML_EXPIRES)
+            if text:
+                expires = _parse_kml_datetime(text)
+        element.clear()
+    return hrefs, expires
+
+
+async def _scan(uri, body):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _scan_links, uri, body)
+
+
+def resolve_network_links(uri, merge=False, **options):
+    """Resolves the NetworkLinks of a document recursively
+
+    Returns the root NetworkLinkNode of the graph, or with `merge` a single
+    document as returned by `NetworkLinkResolver.merge`.  `options` are
+    passed to NetworkLinkResolver.
+    """
+    resolver = NetworkLinkResolver(**options)
+    root = asyncio.run(resolver.resolve(uri))
+    return resolver.merge(root) if merge else root
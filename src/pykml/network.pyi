@@ -0,0 +1,127 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.network
+#
+from http.client import HTTPMessage
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple, Union
+
+from lxml import etree
+
+from .loader import AsyncLoader
+
+KML_NETWORKLINK: str = ...
+KML_NETWORKLINKCONTROL: str = ...
+KML_LINK: str = ...
+KML_URL: str = ...
+KML_HREF: str = ...
+KML_REFRESHMODE: str = ...
+KML_REFRESHINTERVAL: str = ...
+KML_EXPIRES: str = ...
+_NETWORKLINK_ONLY: FrozenSet[str] = ...
+DEFAULT_CACHE_SIZE: int = ...
+
+
+class HttpCache:
+    directory: str
+    max_size: int
+    size: int
+
+    def __init__(self, directory: str, max_size: int = ...) -> None:
+        ...
+
+    def _path(self, url: str, suffix: str) -> str:
+        ...
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def read(self, url: str) -> bytes:
+        ...
+
+    def put(self, url: str, body: Optional[bytes], metadata: Dict[str, Any]) -> None:
+        ...
+
+    def remove(self, url: str) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+
+class NetworkLinkNode:
+    resolver: 'NetworkLinkResolver'
+    uri: str
+    refresh_interval: Optional[float]
+    links: List['NetworkLinkNode']
+    hrefs: List[Tuple[str, Optional[float]]]
+    error: Optional[Exception]
+    from_cache: bool
+    expires: Optional[float]
+
+    def __init__(self, resolver: 'NetworkLinkResolver', uri: str,
+                 refresh_interval: Optional[float] = ...) -> None:
+        ...
+
+    @property
+    def body(self) -> bytes:
+        ...
+
+    @property
+    def document(self) -> etree._ElementTree:
+        ...
+
+    def walk(self) -> Iterator['NetworkLinkNode']:
+        ...
+
+
+class NetworkLinkResolver:
+    cache: Optional[HttpCache]
+    max_depth: Optional[int]
+    default_ttl: float
+    max_connections: int
+    timeout: Optional[float]
+    schema: Optional[Any]
+    parser_options: Optional[Dict[str, Any]]
+
+    def __init__(self, cache_dir: Optional[str] = ..., max_cache_size: int = ...,
+                 max_depth: Optional[int] = ..., default_ttl: float = ...,
+                 max_connections: int = ..., timeout: Optional[float] = ...,
+                 schema: Optional[Any] = ...,
+                 parser_options: Optional[Dict[str, Any]] = ...) -> None:
+        ...
+
+    async def resolve(self, uri: str) -> NetworkLinkNode:
+        ...
+
+    async def _load(self, loader: AsyncLoader, node: NetworkLinkNode) -> None:
+        ...
+
+    def _expires(self, node: NetworkLinkNode, metadata: Dict[str, Any],
+                 headers: HTTPMessage, now: float) -> float:
+        ...
+
+    def merge(self, node: NetworkLinkNode) -> etree._ElementTree:
+        ...
+
+
+def _link_href(networklink: etree._Element) -> Optional[str]:
+    ...
+
+
+def _resolve_href(base: str, href: str) -> str:
+    ...
+
+
+def _parse_kml_datetime(text: str) -> Optional[float]:
+    ...
+
+
+def _scan_links(uri: str, body: bytes) \
+        -> Tuple[List[Tuple[str, Optional[float]]], Optional[float]]:
+    ...
+
+
+def resolve_network_links(uri: str, merge: bool = ..., **options: Any) \
+        -> Union[NetworkLinkNode, etree._ElementTree]:
+    ...
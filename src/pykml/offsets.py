@@ -0,0 +1,379 @@
+#
+# coding: utf-8
+#
+# pykml.offsets
+#
+"""
+The pykml.offsets module indexes the byte offsets of the features of a large
+KML file, so that single features can be parsed without reading the rest of
+the file.
+
+The index is kept in a sidecar file next to the KML file.  It records the
+byte offset and length of every feature with the given tag names (by
+default all Placemarks, including those inside Folders), with its id, name
+and bounding box.  A feature is parsed inside the root element of the file,
+so the namespaces declared on the root element apply to it, but not those
+declared on other enclosing elements.
+
+When the size or modification time of the KML file changes, the index is
+updated: the features that lie in the unchanged beginning of the file,
+verified with CRC-32 checksums, are kept and only the rest of the file is
+scanned again.  Appending features at the end of a document thus only
+scans the new features.
+"""
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import accumulate
+
+from lxml import etree
+
+from .geometry import GX_COORD
+from .geometry import GX_TRACK
+from .geometry import KML_COORDINATES
+from .geometry import parse_coordinates
+from .geometry import parse_gx_coords
+from .parser import _document_head
+from .parser import _element_ranges
+from .parser import _qualify_tag
+from .parser import fromstring
+
+# file name suffix of the index of a KML file
+INDEX_SUFFIX = '.pykmlidx'
+
+# number of bytes of features parsed at a time while indexing
+INDEX_CHUNK_SIZE = 1024 * 1024
+
+_FILE_MAGIC = b'PYKMLOI1'
+# byte order, KML file size and modification time, entries, checkpoints
+_FILE_HEADER = struct.Struct('<8s?QqQQ')
+
+_NO_BBOX = (float('nan'),) * 4
+
+IndexEntry = namedtuple('IndexEntry', 'offset length id name bbox')
+IndexEntry.__doc__ = """A feature of an indexed KML file
+
+`offset` and `length` are in bytes; `id` and `name` are None if the feature
+has none.  `bbox` is the (west, south, east, north) bounding box of its
+coordinates, or NaNs if it has none.
+"""
+
+
+def _coordinates(el):
+    """Returns the coordinates of a <coordinates> or <gx:Track> element"""
+    if el.tag == GX_TRACK:
+        return parse_gx_coords(c.text for c in el.iterchildren(GX_COORD))
+    return parse_coordinates(el.text or '')
+
+
+def _bboxes(root, positions):
+    """Returns the bounding boxes of the coordinates of elements of a tree
+
+    `positions` maps the elements to their positions in the returned list.
+    The coordinates of nested elements count for all enclosing ones.
+    """
+    bboxes = [_NO_BBOX] * len(positions)
+    for el in root.iter(KML_COORDINATES, GX_TRACK):
+        coords = _coordinates(el)
+        if not coords:
+            continue
+        longitudes = coords[0::3]
+        latitudes = coords[1::3]
+        bbox = (min(longitudes), min(latitudes), max(longitudes), max(latitudes))
+        for ancestor in el.iterancestors():
+            i = positions.get(ancestor)
+            if i is None:
+                continue
+            if bboxes[i] is not _NO_BBOX:
+                previous = bboxes[i]
+                bboxes[i] = (min(previous[0], bbox[0]), min(previous[1], bbox[1]),
+                             max(previous[2], bbox[2]), max(previous[3], bbox[3]))
+            else:
+                bboxes[i] = bbox
+    return bboxes
+
+
+def _pack_strings(strings):
+    """Returns the UTF-8 encoding of strings, with None as an empty string,
+    and the offsets of each string in it"""
+    data = [(s or '').encode() for s in strings]
+    return b''.join(data), array('q', accumulate(map(len, data), initial=0))
+
+
+def _unpack_strings(data, offsets):
+    return [data[start:end].decode() or None
+            for start, end in zip(offsets, offsets[1:])]
+
+
+class OffsetIndex:
+    """A byte offset index of the features of a KML file
+
+    `path` is the name of an uncompressed KML file and `tag` the feature tag
+    name or names (in the KML namespace unless qualified), as for
+    `pykml.parser.iterparse`.  The index is read from `index_path` (by
+    default the file name with INDEX_SUFFIX appended), and is created or
+    updated as needed, see `update`.
+    """
+
+    def __init__(self, path, tag='Placemark', index_path=None):
+        if isinstance(tag, str):
+            tag = (tag,)
+        self.path = os.fspath(path)
+        self.index_path = os.fspath(index_path or self.path + INDEX_SUFFIX)
+        self.tags = tuple(_qualify_tag(t) for t in tag)
+        self._names = sorted({t.rpartition('}')[2] for t in self.tags})
+        self._clear()
+        try:
+            self._load()
+        except (OSError, ValueError, EOFError, struct.error):
+            self._clear()
+        self.update()
+
+    def _clear(self):
+        self._size = -1
+        self._mtime = 0
+        self._head = self._tail = b''
+        self._offsets = array('q')
+        self._lengths = array('q')
+        self._bboxes = array('d')
+        self._ids = []
+        self._feature_names = []
+        # (end offset, CRC-32 of the file up to it) after each outermost feature
+        self._checkpoints = array('q')
+        self._id_positions = None
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, i):
+        i = range(len(self))[i]
+        return IndexEntry(self._offsets[i], self._lengths[i], self._ids[i],
+                          self._feature_names[i],
+                          tuple(self._bboxes[4 * i:4 * i + 4]))
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+    def find(self, feature_id):
+        """Returns the positions in the index of the features with an id"""
+        if self._id_positions is None:
+            self._id_positions = {}
+            for i, value in enumerate(self._ids):
+                if value is not None:
+                    self._id_positions.setdefault(value, []).append(i)
+        return list(self._id_positions.get(feature_id, ()))
+
+    def _check_current(self):
+        stat = os.stat(self.path)
+        if (stat.st_size, stat.st_mtime_ns) != (self._size, self._mtime):
+            raise ValueError(f'{self.path} has changed since it was indexed; '
+                             'call update()')
+
+    def read(self, i):
+        """Returns the bytes of the feature at a position in the index"""
+        self._check_current()
+        with open(self.path, 'rb') as f:
+            f.seek(self._offsets[i])
+            return f.read(self._lengths[i])
+
+    def parse_many(self, positions, parser_options=None):
+        """Parses the features at positions in the index
+
+        The features are parsed together, with the parser options of
+        `pykml.parser.parse`, and returned as a list of objectify elements.
+        """
+        positions = list(positions)
+        if not positions:
+            return []
+        self._check_current()
+        with open(self.path, 'rb') as f:
+            fragments = []
+            for i in positions:
+                f.seek(self._offsets[i])
+                fragments.append(f.read(self._lengths[i]))
+        root = fromstring(b''.join([self._head] + fragments + [self._tail]),
+                          parser_options=parser_options)
+        return list(root.iterchildren())
+
+    def parse(self, i, parser_options=None):
+        """Parses the feature at a position in the index"""
+        return self.parse_many([i], parser_options)[0]
+
+    def get(self, feature_id, parser_options=None):
+        """Parses the first feature with an id
+
+        Raises KeyError if no feature has the id.
+        """
+        positions = self.find(feature_id)
+        if not positions:
+            raise KeyError(feature_id)
+        return self.parse(positions[0], parser_options)
+
+    def update(self):
+        """Updates the index after the KML file has changed
+
+        The index is unchanged if the size and modification time of the file
+        are those it was built for.  Otherwise the features in the unchanged
+        beginning of the file are kept, the rest of the file is scanned, and
+        the index file is written, unless it cannot be, in which case the
+        index is only kept in memory.  Returns the number of features
+        scanned.
+        """
+        stat = os.stat(self.path)
+        if (stat.st_size, stat.st_mtime_ns) == (self._size, self._mtime):
+            return 0
+
+        with open(self.path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            head, tail = _document_head(data)
+            position, crc = self._verified_prefix(data, head)
+            kept = bisect_left(self._offsets, position)
+            del self._offsets[kept:]
+            del self._lengths[kept:]
+            del self._bboxes[4 * kept:]
+            del self._ids[kept:]
+            del self._feature_names[kept:]
+            self._head, self._tail = head, tail
+            self._id_positions = None
+            self._scan(data, position, crc)
+
+        self._size, self._mtime = stat.st_size, stat.st_mtime_ns
+        try:
+            self._save()
+        except OSError:
+            # e.g. a read-only directory: the index is only kept in memory
+            pass
+        return len(self) - kept
+
+    def _verified_prefix(self, data, head):
+        """Returns the end of the unchanged features at the beginning of the
+        file, and the CRC-32 of the file up to it, dropping the checkpoints
+        after it"""
+        position = crc = 0
+        kept = 0
+        if head == self._head:
+            checkpoints = self._checkpoints
+            for end, expected in zip(checkpoints[0::2], checkpoints[1::2]):
+                if end > len(data):
+                    break
+                value = zlib.crc32(data[position:end], crc)
+                if value != expected:
+                    break
+                position, crc = end, value
+                kept += 1
+        del self._checkpoints[2 * kept:]
+        return position, crc
+
+    def _scan(self, data, position, crc):
+        """Indexes the features after byte `position`, `crc` being the CRC-32
+        of the file before it"""
+        wildcard_tags = ['{*}' + name for name in self._names]
+        # outermost features and the ranges of all features, parsed together
+        ends = []
+        ranges = []
+        size = 0
+
+        def index_ranges():
+            fragments = [data[start:end] for start, end, depth in ranges if depth == 0]
+            root = etree.fromstring(b''.join([self._head] + fragments + [self._tail]),
+                                    etree.XMLParser(huge_tree=True, strip_cdata=False))
+            elements = [el for el in root.iter(*wildcard_tags) if el is not root]
+            if len(elements) != len(ranges):
+                raise ValueError('the features could not be located in '
+                                 f'bytes {ranges[0][0]} to {ranges[-1][1]}')
+            positions = {el: i for i, el in enumerate(elements)}
+            # a lookup by parent is much faster than findtext on each feature
+            names = [None] * len(elements)
+            for el in root.iter('{*}name'):
+                i = positions.get(el.getparent())
+                if i is not None and names[i] is None:
+                    names[i] = (el.text or '').strip()
+            for (start, end, _), el in zip(sorted(ranges), elements):
+                self._offsets.append(start)
+                self._lengths.append(end - start)
+                self._ids.append(el.get('id'))
+            for bbox in _bboxes(root, positions):
+                self._bboxes.extend(bbox)
+            self._feature_names.extend(names)
+
+        for start, end, depth in _element_ranges(data, self._names, position):
+            ranges.append((start, end, depth))
+            if depth:
+                continue
+            ends.append(end)
+            size += end - start
+            if size >= INDEX_CHUNK_SIZE:
+                index_ranges()
+                ranges = []
+                size = 0
+        if ranges:
+            index_ranges()
+
+        for end in ends:
+            crc = zlib.crc32(data[position:end], crc)
+            self._checkpoints.extend((end, crc))
+            position = end
+
+    def _save(self):
+        """Writes the index file"""
+        ids, id_offsets = _pack_strings(self._ids)
+        names, name_offsets = _pack_strings(self._feature_names)
+        sections = [','.join(self.tags).encode(), self._head, self._tail, ids, names]
+        # the index is replaced at once, so that it is never read half written
+        temporary_path = self.index_path + '.tmp'
+        try:
+            with open(temporary_path, 'wb') as f:
+                f.write(_FILE_HEADER.pack(
+                    _FILE_MAGIC, sys.byteorder == 'little', self._size, self._mtime,
+                    len(self), len(self._checkpoints) // 2,
+                ))
+                for section in sections:
+                    f.write(struct.pack('<Q', len(section)))
+                    f.write(section)
+                for values in (self._offsets, self._lengths, self._bboxes, id_offsets,
+                               name_offsets, self._checkpoints):
+                    values.tofile(f)
+            os.replace(temporary_path, self.index_path)
+        except OSError:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+    def _load(self):
+        """Reads the index file"""
+        with open(self.index_path, 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+            if len(header) != _FILE_HEADER.size or not header.startswith(_FILE_MAGIC):
+                raise ValueError('not a pyKML offset index file')
+            _, little_endian, size, mtime, count, checkpoints = \
+                _FILE_HEADER.unpack(header)
+            swap = little_endian != (sys.byteorder == 'little')
+
+            sections = []
+            for _ in range(5):
+                length, = struct.unpack('<Q', f.read(8))
+                sections.append(f.read(length))
+            tags, head, tail, ids, names = sections
+            if tags.decode().split(',') != list(self.tags):
+                raise ValueError('the offset index was built for other tags')
+
+            def read_array(typecode, count):
+                values = array(typecode)
+                values.fromfile(f, count)
+                if swap:
+                    values.byteswap()
+                return values
+
+            self._offsets = read_array('q', count)
+            self._lengths = read_array('q', count)
+            self._bboxes = read_array('d', 4 * count)
+            self._ids = _unpack_strings(ids, read_array('q', count + 1))
+            self._feature_names = _unpack_strings(names, read_array('q', count + 1))
+            self._checkpoints = read_array('q', 2 * checkpoints)
+        self._size, self._mtime = size, mtime
+        self._head, self._tail = head, tail
@@ -0,0 +1,101 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.offsets
+#
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, \
+    Sequence, Tuple, Union
+
+from lxml import etree, objectify
+
+INDEX_SUFFIX: str = ...
+INDEX_CHUNK_SIZE: int = ...
+_FILE_MAGIC: bytes = ...
+_NO_BBOX: Tuple[float, float, float, float] = ...
+
+
+class IndexEntry(NamedTuple):
+    offset: int
+    length: int
+    id: Optional[str]
+    name: Optional[str]
+    bbox: Tuple[float, float, float, float]
+
+
+def _coordinates(el: etree.ElementBase) -> List[float]:
+    ...
+
+
+def _bboxes(root: etree.ElementBase, positions: Dict[etree.ElementBase, int]) \
+        -> List[Tuple[float, float, float, float]]:
+    ...
+
+
+def _pack_strings(strings: Iterable[Optional[str]]) -> Tuple[bytes, array]:
+    ...
+
+
+def _unpack_strings(data: bytes, offsets: array) -> List[Optional[str]]:
+    ...
+
+
+class OffsetIndex:
+    path: str = ...
+    index_path: str = ...
+    tags: Tuple[str, ...] = ...
+
+    def __init__(self, path: Union[str, Path],
+                 tag: Union[str, Sequence[str]] = ...,
+                 index_path: Optional[Union[str, Path]] = ...) -> None:
+        ...
+
+    def _clear(self) -> None:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+    def __getitem__(self, i: int) -> IndexEntry:
+        ...
+
+    def __iter__(self) -> Iterator[IndexEntry]:
+        ...
+
+    def find(self, feature_id: str) -> List[int]:
+        ...
+
+    def _check_current(self) -> None:
+        ...
+
+    def read(self, i: int) -> bytes:
+        ...
+
+    def parse_many(self, positions: Iterable[int],
+                   parser_options: Optional[Dict[str, Any]] = ...) \
+            -> List[objectify.ObjectifiedElement]:
+        ...
+
+    def parse(self, i: int, parser_options: Optional[Dict[str, Any]] = ...) \
+            -> objectify.ObjectifiedElement:
+        ...
+
+    def get(self, feature_id: str, parser_options: Optional[Dict[str, Any]] = ...) \
+            -> objectify.ObjectifiedElement:
+        ...
+
+    def update(self) -> int:
+        ...
+
+    def _verified_prefix(self, data: bytes, head: bytes) -> Tuple[int, int]:
+        ...
+
+    def _scan(self, data: bytes, position: int, crc: int) -> None:
+        ...
+
+    def _save(self) -> None:
+        ...
+
+    def _load(self) -> None:
+        ...
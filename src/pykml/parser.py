@@ -7,34 +7,140 @@
 The pykml.parser module provides functions that can be used to parse KML 
 from a file or remote URL.
 """
+import copy
+import glob
+import hashlib
+import json
+import mmap
+import os
+import re
 import ssl
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from contextlib import closing
+from io import BytesIO
+from itertools import islice
 from optparse import OptionParser
 from pathlib import Path
 from urllib.request import urlopen
 
 from lxml import etree, objectify
 
+from . import kmz
 from . import version as pykml_version
+from .geometry import check_ranges
+from .geometry import parse_coordinates
+from .geometry import parse_gx_coords
 
 OGCKML_SCHEMA = 'http://schemas.opengis.net/kml/2.2.0/ogckml22.xsd'
 
+KML_NAMESPACE = 'http://www.opengis.net/kml/2.2'
+
+# number of bytes read from the source per iterparse() step
+ITERPARSE_CHUNK_SIZE = 64 * 1024
+
+# number of bytes of features parsed per task by iterparse_parallel()
+PARALLEL_CHUNK_SIZE = 4 * 1024 * 1024
+
+# default memory budget of a DocumentCache, in bytes of KML and KMZ files
+DOCUMENT_CACHE_SIZE = 64 * 1024 * 1024
+
+
+# remote XML Schema documents for which a copy is bundled with pyKML
+BUNDLED_SCHEMAS = {
+    OGCKML_SCHEMA: 'ogckml22.xsd',
+    'https://schemas.opengis.net/kml/2.2.0/ogckml22.xsd': 'ogckml22.xsd',
+    'http://developers.google.com/kml/schema/kml22gx.xsd': 'kml22gx.xsd',
+    'https://developers.google.com/kml/schema/kml22gx.xsd': 'kml22gx.xsd',
+}
+
+# maximum number of parsers reused by each thread, see _parse_internal()
+PARSER_POOL_SIZE = 16
+
+# parsers of each thread, keyed by their options
+_parser_pool = threading.local()
+
+# compiled XML Schema objects, keyed by bundled file path or URL
+_schema_cache = {}
+# locks held while a schema is compiled, so that it is compiled only once
+# without blocking threads asking for other schemas
+_schema_locks = {}
+_schema_cache_lock = threading.Lock()
+
+
+def _schema_key(schema):
+    """Returns the bundled file path or URL of a XML Schema document"""
+    schema = BUNDLED_SCHEMAS.get(schema, schema)
+    schema_file = Path(__file__).parent / 'schemas' / schema
+    if schema_file.is_file():
+        return str(schema_file)
+    if Path(schema).is_file():
+        return str(Path(schema).resolve())
+    return schema
+
+
+def _load_xml_schema(key):
+    """Reads and compiles a XML Schema document from a local file or URL"""
+    # TODO: use requests
+    try:
+        # try to open a local file
+        with open(key, 'rb') as f:
+            return etree.XMLSchema(file=f)
+    except OSError:
+        # try to open a remote URL
+        context = ssl._create_unverified_context()
+        with closing(urlopen(key, context=context)) as f:
+            return etree.XMLSchema(file=f)
+
+
+def get_xml_schema(schema):
+    """Returns a compiled XML Schema
+
+    The schema is given as the name of a schema file bundled with pyKML, or as
+    a path or URL.  URLs of bundled schemas (e.g. `OGCKML_SCHEMA`) are
+    resolved to the bundled copy.  Compiled schemas are cached for the
+    lifetime of the process, see `clear_schema_cache`.
+    """
+    key = _schema_key(schema)
+    with _schema_cache_lock:
+        try:
+            return _schema_cache[key]
+        except KeyError:
+            key_lock = _schema_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        with _schema_cache_lock:
+            xml_schema = _schema_cache.get(key)
+        if xml_schema is None:
+            xml_schema = _load_xml_schema(key)
+            with _schema_cache_lock:
+                _schema_cache[key] = xml_schema
+        return xml_schema
+
+
+def clear_schema_cache(schema=None):
+    """Removes a compiled XML Schema from the cache
+
+    If `schema` is None all compiled schemas are removed, so that they are
+    read again from disk or the network when next used.
+    """
+    with _schema_cache_lock:
+        if schema is None:
+            _schema_cache.clear()
+        else:
+            _schema_cache.pop(_schema_key(schema), None)
+
 
 class Schema:
-    """A class representing an XML Schema used to validate KML documents"""
+    """A class representing an XML Schema used to validate KML documents
+
+    The compiled XML Schema is shared by all Schema instances created for the
+    same schema document.
+    """
 
     def __init__(self, schema):
-        # TODO: use requests, open local file, open module dir file
-        try:
-            schema_file = Path(__file__).parent / 'schemas' / schema
-            # try to open a local file
-            with schema_file.open('rb') as f:
-                self.schema = etree.XMLSchema(file=f)
-        except:
-            # try to open a remote URL
-            context = ssl._create_unverified_context()
-            with closing(urlopen(schema, context=context)) as f:
-                self.schema = etree.XMLSchema(file=f)
+        self.schema = get_xml_schema(schema)
 
     def validate(self, doc):
         """Validates a KML document
@@ -52,7 +158,7 @@ class Schema:
         return self.schema.assertValid(doc)
 
 
-def _parse_internal(source, parse_func, schema=None, parser_options=None):
+def _make_parser_options(schema=None, parser_options=None):
     _parser_options = {
         'strip_cdata': False,
     }
@@ -62,8 +168,55 @@ def _parse_internal(source, parse_func, schema=None, parser_options=None):
     if schema:
         _parser_options['schema'] = schema.schema
 
-    parser = objectify.makeparser(**_parser_options)
-    return parse_func(source, parser=parser)
+    return _parser_options
+
+
+def _parser_key(parser_options):
+    """Returns a hashable key for parser options, or None if an option value
+    is not hashable"""
+    key = tuple(sorted(parser_options.items()))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _parser_pool_of_thread():
+    try:
+        return _parser_pool.parsers
+    except AttributeError:
+        pool = _parser_pool.parsers = {}
+        return pool
+
+
+def clear_parser_pool():
+    """Removes the parsers of the current thread from the parser pool"""
+    _parser_pool.__dict__.pop('parsers', None)
+
+
+def _parse_internal(source, parse_func, schema=None, parser_options=None):
+    _parser_options = _make_parser_options(schema, parser_options)
+
+    # lxml parsers can be reused for any number of documents, but not by
+    # several threads at a time, so each thread keeps its own parsers.  A
+    # parser is taken out of the pool while it is in use, in case parsing
+    # the source parses another document.
+    key = _parser_key(_parser_options)
+    if key is None:
+        return parse_func(source, parser=objectify.makeparser(**_parser_options))
+    pool = _parser_pool_of_thread()
+    parser = pool.pop(key, None)
+    if parser is None:
+        parser = objectify.makeparser(**_parser_options)
+    try:
+        return parse_func(source, parser=parser)
+    finally:
+        # the least recently used parser is dropped first
+        pool.pop(key, None)
+        if len(pool) >= PARSER_POOL_SIZE:
+            del pool[next(iter(pool))]
+        pool[key] = parser
 
 
 def fromstring(text, schema=None, parser_options=None):
@@ -79,29 +232,734 @@ def parse(fileobject, schema=None, parser_options=None):
     """Parses a file object
 
     This function parses a KML file object, and optionally validates it against
-    a provided schema.
+    a provided schema.  KMZ archives are recognized, and their KML document is
+    parsed directly from the archive.
     """
+    if kmz.is_kmz(fileobject):
+        with kmz.KmzFile(fileobject) as archive:
+            return archive.parse(schema=schema, parser_options=parser_options)
     return _parse_internal(fileobject, objectify.parse, schema, parser_options)
 
 
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions documents size max_size')
+CacheInfo.__doc__ = """Statistics of a DocumentCache
+
+`size` and `max_size` are in bytes of the cached files.
+"""
+
+
+class DocumentCache:
+    """A least recently used cache of parsed KML documents
+
+    `parse` parses a KML or KMZ file like `pykml.parser.parse`, but keeps the
+    parsed document, so that parsing the same file again only copies it.
+    Each call returns a new deep copy, which the caller is free to modify.
+
+    With `key='mtime'` a document is cached for a file path, and parsed
+    again when the size or modification time of the file changes.  With
+    `key='hash'` it is cached for the SHA-256 hash of the file contents,
+    which are read on each call, so that files with the same contents share
+    a document.  Documents are also cached for the schema and parser options
+    they were parsed with.
+
+    The documents are charged the size of their file against `max_size`,
+    and the least recently used ones are evicted when the total exceeds it;
+    in memory, a parsed document takes several times that size.  A file
+    that changes while it is parsed is not cached.
+    """
+
+    def __init__(self, max_size=DOCUMENT_CACHE_SIZE, key='mtime'):
+        if key not in ('mtime', 'hash'):
+            raise ValueError(f"key must be 'mtime' or 'hash', not {key!r}")
+        self.max_size = max_size
+        self.key = key
+        # (source, schema, parser options) -> (file stamp, document, size)
+        self._documents = {}
+        self._size = 0
+        self._hits = self._misses = self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def cache_info(self):
+        """Returns the hit, miss and eviction counts and the size of the
+        cache as a CacheInfo"""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions,
+                             len(self._documents), self._size, self.max_size)
+
+    def clear(self):
+        """Removes all documents from the cache and resets its statistics"""
+        with self._lock:
+            self._documents.clear()
+            self._size = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def parse(self, fileobject, schema=None, parser_options=None):
+        """Parses a file, or returns a copy of the cached document
+
+        `fileobject` is a file path, or with `key='hash'` also a binary file
+        object, which is read to its end.  Other sources, such as URLs, are
+        parsed without the cache.
+        """
+        options_key = _parser_key(_make_parser_options(None, parser_options))
+        is_path = isinstance(fileobject, (str, bytes, os.PathLike))
+        if options_key is None or (is_path and not os.path.isfile(fileobject)):
+            return parse(fileobject, schema, parser_options)
+
+        stamp = None
+        if self.key == 'hash':
+            if is_path:
+                with open(fileobject, 'rb') as f:
+                    data = f.read()
+            else:
+                data = fileobject.read()
+            source_key = hashlib.sha256(data).digest()
+        elif is_path:
+            source_key = os.path.abspath(os.fsdecode(fileobject))
+            stamp = _file_stamp(os.stat(fileobject))
+        else:
+            return parse(fileobject, schema, parser_options)
+        key = (source_key, None if schema is None else schema.schema, options_key)
+
+        with self._lock:
+            entry = self._documents.pop(key, None)
+            if entry is not None and entry[0] == stamp:
+                # the most recently used document is moved last
+                self._documents[key] = entry
+                self._hits += 1
+            else:
+                if entry is not None:
+                    self._size -= entry[2]
+                    entry = None
+                self._misses += 1
+        if entry is not None:
+            doc = entry[1]
+        elif self.key == 'hash':
+            doc = parse(BytesIO(data), schema, parser_options)
+            self._add(key, None, len(data), doc)
+        else:
+            with open(fileobject, 'rb') as f:
+                # the stamp of the file that is parsed, which may have been
+                # replaced since it was looked up
+                stamp = _file_stamp(os.fstat(f.fileno()))
+                doc = parse(f, schema, parser_options)
+                if _file_stamp(os.fstat(f.fileno())) == stamp:
+                    self._add(key, stamp, stamp[0], doc)
+        doc = copy.deepcopy(doc)
+        if self.key == 'hash':
+            # the cached document may have been read from another file
+            doc.docinfo.URL = os.fsdecode(fileobject) if is_path else None
+        return doc
+
+    def _add(self, key, stamp, size, doc):
+        """Adds a document to the cache, evicting others as needed"""
+        with self._lock:
+            if size <= self.max_size:
+                previous = self._documents.pop(key, None)
+                if previous is not None:
+                    self._size -= previous[2]
+                self._documents[key] = (stamp, doc, size)
+                self._size += size
+                while self._size > self.max_size:
+                    _, _, evicted_size = self._documents.pop(next(iter(self._documents)))
+                    self._size -= evicted_size
+                    self._evictions += 1
+
+
+def _file_stamp(stat):
+    """Returns the size and modification time of a file, from its stat"""
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _qualify_tag(tag):
+    """Adds the KML namespace to a tag name that has no namespace"""
+    if tag.startswith('{'):
+        return tag
+    return f'{{{KML_NAMESPACE}}}{tag}'
+
+
+def _locate(elem):
+    """Returns the parent and child index of an element, or the root itself"""
+    parent = elem.getparent()
+    if parent is None:
+        return None, 0, elem
+    return parent, parent.index(elem), None
+
+
+def iterparse(source, tag='Placemark', schema=None, parser_options=None):
+    """Incrementally parses a KML file, yielding one feature at a time
+
+    This function parses a KML file name or file object and yields each
+    element matching `tag` (a tag name, or a sequence of tag names, in the
+    KML namespace unless qualified as '{namespace}name') as soon as it has
+    been completely parsed.  The yielded elements are objectify elements, as
+    returned by `parse`, and are optionally validated against a provided
+    schema.
+
+    Once the consumer requests the next element, the previous one is cleared
+    and removed from the tree together with the siblings parsed before it,
+    so memory use does not grow with the size of the document.  Copy an
+    element (e.g. with `copy.deepcopy`) to keep it beyond that point.
+
+    The KML document of a KMZ archive is parsed directly from the archive.
+    """
+    if isinstance(tag, str):
+        tag = (tag,)
+    tags = tuple(_qualify_tag(t) for t in tag)
+
+    _parser_options = _make_parser_options(schema, parser_options)
+    # objectify.makeparser() removes blank text by default
+    _parser_options.setdefault('remove_blank_text', True)
+
+    parser = etree.XMLPullParser(events=('end',), tag=tags, **_parser_options)
+    parser.set_element_class_lookup(objectify.ObjectifyElementClassLookup())
+
+    if isinstance(source, (str, Path)):
+        fileobject = open(source, 'rb')
+    else:
+        fileobject = source
+
+    try:
+        if kmz.is_kmz(fileobject):
+            with kmz.KmzFile(fileobject) as archive:
+                yield from archive.iterparse(tag, schema, parser_options)
+            return
+
+        done = False
+        while not done:
+            data = fileobject.read(ITERPARSE_CHUNK_SIZE)
+            if data:
+                parser.feed(data)
+            else:
+                parser.close()
+                done = True
+
+            # The parser creates the proxy of an element before its children
+            # are known, so objectify selects a data element class for it.
+            # Only remember where each element is, and look it up again once
+            # the parser has released the proxy.
+            locations = deque(_locate(elem)
+                              for _, elem in parser.read_events())
+            removed = {}
+
+            while locations:
+                parent, index, elem = locations.popleft()
+                if elem is None:
+                    index -= removed.get(parent, 0)
+                    elem = next(islice(parent.iterchildren(), index, None))
+
+                yield elem
+
+                # an enclosing element that also matches is yielded later
+                if next(elem.iterancestors(*tags), None) is None:
+                    elem.clear()
+                    if parent is not None:
+                        while elem.getprevious() is not None:
+                            parent.remove(elem.getprevious())
+                            removed[parent] = removed.get(parent, 0) + 1
+    finally:
+        if fileobject is not source:
+            fileobject.close()
+
+
+# elements whose children validate_stream() validates and releases one by one
+_CONTAINER_TAGS = frozenset(_qualify_tag(tag) for tag in ('kml', 'Document', 'Folder'))
+
+# the children of containers that validate_stream() releases: features, style
+# selectors and schemas; the few other children are kept until the end
+_STREAMED_TAGS = tuple(_qualify_tag(tag) for tag in (
+    'Placemark', 'NetworkLink', 'GroundOverlay', 'ScreenOverlay',
+    'PhotoOverlay', 'Style', 'StyleMap', 'Schema', 'NetworkLinkControl',
+    '{http://www.google.com/kml/ext/2.2}Tour',
+))
+
+
+def validate_stream(source, schema, max_errors=10, parser_options=None):
+    """Validates a KML file against a schema while it is parsed
+
+    This function reads a KML file name or file object in chunks and
+    validates it against a Schema without holding the whole document in
+    memory: each feature, style or schema in the kml root, a Document or a
+    Folder is validated as soon as it has been parsed, and is then reduced
+    to an empty placeholder, which still lets the order of the children be checked once
+    the document is complete.  Validation carries on after an error until
+    `max_errors` errors (None for no limit) have been found.
+
+    Returns a list of errors, as dictionaries with the keys 'line' and
+    'message', ordered by line; the document is valid if the list is empty.
+    An XML syntax error ends the validation.  The KML document of a KMZ
+    archive is validated directly from the archive.
+    """
+    xml_schema = schema.schema
+    parser = etree.XMLPullParser(events=('end',), tag=_STREAMED_TAGS,
+                                 **_make_parser_options(None, parser_options))
+    # whether an empty element of a tag is valid, i.e. can be a placeholder
+    placeholder_valid = {}
+    errors = []
+
+    def add_errors(error_log):
+        errors.extend({'line': error.line, 'message': error.message}
+                      for error in error_log)
+
+    if isinstance(source, (str, Path)):
+        fileobject = open(source, 'rb')
+    else:
+        fileobject = source
+
+    try:
+        if kmz.is_kmz(fileobject):
+            with kmz.KmzFile(fileobject) as archive, \
+                    archive.open(archive.kml_name) as f:
+                return validate_stream(f, schema, max_errors, parser_options)
+
+        while max_errors is None or len(errors) < max_errors:
+            data = fileobject.read(ITERPARSE_CHUNK_SIZE)
+            if not data:
+                root = parser.close()
+                if not xml_schema.validate(root.getroottree()):
+                    add_errors(xml_schema.error_log)
+                break
+            parser.feed(data)
+
+            for _, elem in parser.read_events():
+                parent = elem.getparent()
+                if len(elem) == 0 or parent.tag not in _CONTAINER_TAGS:
+                    continue
+                if elem.tag not in placeholder_valid:
+                    placeholder_valid[elem.tag] = xml_schema.validate(
+                        etree.Element(elem.tag))
+                if not placeholder_valid[elem.tag]:
+                    # left for the validation of the complete document
+                    continue
+
+                if not xml_schema.validate(elem):
+                    add_errors(xml_schema.error_log)
+                # a run of siblings is represented by a single placeholder
+                previous = elem.getprevious()
+                if previous is not None and previous.tag == elem.tag:
+                    parent.remove(elem)
+                else:
+                    elem.clear()
+    except etree.XMLSyntaxError as e:
+        errors.append({'line': e.lineno, 'message': f'Invalid XML: {e.msg}'})
+    finally:
+        if fileobject is not source:
+            fileobject.close()
+
+    unique = {(error['line'], error['message']): error for error in errors}
+    errors = sorted(unique.values(), key=lambda error: error['line'] or 0)
+    return errors[:max_errors]
+
+
+# elements whose text check_coordinates() checks, and the number of them that
+# are checked at once
+_COORDINATE_TAGS = (_qualify_tag('coordinates'),
+                    '{http://www.google.com/kml/ext/2.2}coord')
+_COORDINATE_BATCH_SIZE = 1000
+
+
+def _check_coordinate_texts(elements):
+    """Checks the coordinates of a batch of elements
+
+    The texts are joined and checked at once; only if they fail are the
+    elements checked one by one, to raise the error of the first one.
+    """
+    coordinates = [elem.text or '' for elem in elements
+                   if elem.tag == _COORDINATE_TAGS[0]]
+    coords = [elem.text for elem in elements if elem.tag != _COORDINATE_TAGS[0]]
+    try:
+        check_ranges(parse_coordinates(' '.join(coordinates)))
+        check_ranges(parse_gx_coords(coords))
+        return
+    except ValueError:
+        pass
+    for elem in elements:
+        try:
+            if elem.tag == _COORDINATE_TAGS[0]:
+                check_ranges(parse_coordinates(elem.text or ''))
+            else:
+                check_ranges(parse_gx_coords([elem.text]))
+        except ValueError as e:
+            e.lineno = elem.sourceline
+            raise
+
+
+def check_coordinates(source, parser_options=None):
+    """Checks the coordinates of a KML file in a single streaming pass
+
+    The KML schemas accept any text as the coordinates of a geometry, so
+    validation does not find malformed or out of range coordinates.  This
+    function reads a KML file name or file object and parses the text of
+    each <coordinates> and <gx:coord> element as soon as it has been read,
+    stopping at the first one that does not hold well-formed tuples
+    (CoordinatesSyntaxError) or has a longitude outside [-180, 180] or a
+    latitude outside [-90, 90] (CoordinatesRangeError).  Both are
+    ValueErrors, and the line of the element is set as their `lineno`.  The
+    parsed part of the document is released as it goes.  Run in front of
+    parsing and validating with a Schema, the check rejects bad coordinates
+    without reading the rest of the document; it takes about as long as
+    parsing and validating a document that passes.  An XML syntax error
+    raises `lxml.etree.XMLSyntaxError`.  The KML document of a KMZ archive is
+    checked directly from the archive.
+    """
+    if isinstance(source, (str, Path)):
+        fileobject = open(source, 'rb')
+    else:
+        fileobject = source
+
+    try:
+        if kmz.is_kmz(fileobject):
+            with kmz.KmzFile(fileobject) as archive, \
+                    archive.open(archive.kml_name) as f:
+                return check_coordinates(f, parser_options)
+
+        elements = []
+        for _, elem in etree.iterparse(fileobject, tag=_COORDINATE_TAGS,
+                                       **_make_parser_options(None, parser_options)):
+            elements.append(elem)
+            if len(elements) < _COORDINATE_BATCH_SIZE:
+                continue
+            _check_coordinate_texts(elements)
+            elements = []
+            # release everything parsed before the last element
+            for node in (elem, *elem.iterancestors()):
+                parent = node.getparent()
+                while node.getprevious() is not None:
+                    del parent[0]
+        _check_coordinate_texts(elements)
+    finally:
+        if fileobject is not source:
+            fileobject.close()
+
+
+# Schema used by the processes that validate KML files
+_worker_schema = None
+# whether the worker validates with validate_stream() rather than parsed
+# documents, and the maximum number of errors that validate_stream() reports
+_worker_streaming = False
+_worker_max_errors = 10
+
+
+def _init_validation_worker(schema_uri, streaming=False, max_errors=10):
+    """Compiles the validation schema once per worker process"""
+    global _worker_schema, _worker_streaming, _worker_max_errors
+    _worker_schema = Schema(schema_uri)
+    _worker_streaming = streaming
+    _worker_max_errors = max_errors
+
+
+def _validate_uri(uri):
+    """Validates a KML file or URL against the worker's schema"""
+    from .util import open_pykml_uri
+
+    start = time.perf_counter()
+    errors = []
+    try:
+        with open_pykml_uri(uri, mode='rb') as f:
+            if _worker_streaming:
+                errors = validate_stream(f, _worker_schema,
+                                         max_errors=_worker_max_errors)
+            else:
+                doc = parse(f, schema=None)
+        if not _worker_streaming:
+            _worker_schema.assertValid(doc)
+    except etree.XMLSyntaxError as e:
+        errors.append({'line': e.lineno, 'message': f'Invalid XML: {e.msg}'})
+    except etree.DocumentInvalid as e:
+        errors.extend({'line': error.line, 'message': error.message}
+                      for error in e.error_log)
+    except (OSError, ValueError) as e:
+        errors.append({'line': None, 'message': str(e)})
+
+    return {
+        'uri': uri,
+        'valid': not errors,
+        'errors': errors,
+        'seconds': round(time.perf_counter() - start, 6),
+    }
+
+
+def _expand_uris(args):
+    """Expands the glob patterns among file names; URLs are kept as given"""
+    uris = []
+    for arg in args:
+        if '://' not in arg and any(c in arg for c in '*?['):
+            uris.extend(sorted(glob.glob(arg, recursive=True)) or [arg])
+        else:
+            uris.append(arg)
+    return uris
+
+
+def validate_kml_files(uris, schema_uri=OGCKML_SCHEMA, jobs=None,
+                       streaming=False, max_errors=10):
+    """Validates many KML files or URLs in parallel
+
+    The files are validated by a pool of `jobs` processes (by default one
+    per CPU), each of which compiles the schema once.  For each file, in the
+    order given, a dictionary is yielded with the keys 'uri', 'valid',
+    'errors' (a list of dictionaries with the keys 'line' and 'message') and
+    'seconds'.  With `streaming`, the files are validated while they are
+    parsed, reporting up to `max_errors` errors each (see `validate_stream`).
+    """
+    uris = list(uris)
+    streaming = bool(streaming)
+    if jobs == 1 or len(uris) <= 1:
+        _init_validation_worker(schema_uri, streaming, max_errors)
+        yield from map(_validate_uri, uris)
+        return
+
+    jobs = jobs or os.cpu_count()
+    chunksize = max(1, len(uris) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_init_validation_worker,
+                             initargs=(schema_uri, streaming, max_errors)) as executor:
+        yield from executor.map(_validate_uri, uris, chunksize=chunksize)
+
+
+# markup that may precede the root element, and the start tag of an element;
+# attribute values may contain '>'
+_START_TAG = rb"""<([^\s/>!?]+)(?:[^'">]|"[^"]*"|'[^']*')*>"""
+_PROLOG_MARKUP = re.compile(rb'<\?|<!--|<!|' + _START_TAG)
+_PROLOG_ENDS = {b'<?': b'?>', b'<!--': b'-->', b'<!': b'>'}
+
+
+def _document_head(data):
+    """Returns the bytes of a document up to the end of the start tag of its
+    root element, and the end tag of the root element"""
+    position = 0
+    while True:
+        match = _PROLOG_MARKUP.search(data, position)
+        if match is None:
+            raise ValueError('the document has no root element')
+        if match.group(1) is not None:
+            if data[match.end() - 2:match.end()] == b'/>':
+                raise ValueError('the root element of the document is empty')
+            return data[:match.end()], b'</' + match.group(1) + b'>'
+        end = data.find(_PROLOG_ENDS[match.group()], match.end())
+        if end < 0:
+            raise ValueError('unterminated markup before the root element')
+        position = end
+
+
+def _element_ranges(data, names, position=0):
+    """Yields the (start, end, depth) byte offsets and nesting depth of the
+    elements with the given local names, as each of them ends
+
+    The scan starts at byte `position`, outside of any such element.  Only
+    the tags of these elements, CDATA sections and comments are matched,
+    all by one regular expression.
+    """
+    names = b'|'.join(re.escape(name.encode()) for name in names)
+    markup = re.compile(
+        rb'<(?:!\[CDATA\[.*?\]\]>|!--.*?-->|(!\[CDATA\[|!--)'
+        rb'|(/?)(?:[\w.-]+:)?(?:' + names + rb')(?=[\s/>])'
+        rb"""(?:[^'">]|"[^"]*"|'[^']*')*>)""",
+        re.DOTALL,
+    )
+    starts = []
+    for match in markup.finditer(data, position):
+        closing = match.group(2)
+        if closing is None:
+            # CDATA section or comment
+            if match.group(1):
+                raise ValueError(f'unterminated markup at byte {match.start()}')
+            continue
+        if closing:
+            if not starts:
+                raise ValueError(f'unexpected end tag at byte {match.start()}')
+            start = starts.pop()
+        elif data[match.end() - 2] != 47:  # not an empty element tag '/>'
+            starts.append(match.start())
+            continue
+        else:
+            start = match.start()
+        yield start, match.end(), len(starts)
+
+
+def _feature_ranges(data, names, chunk_size):
+    """Yields lists of the (start, end) byte offsets of the outermost
+    elements with the given local names, each list spanning about
+    `chunk_size` bytes"""
+    ranges = []
+    size = 0
+    for start, end, depth in _element_ranges(data, names):
+        if depth:
+            continue
+        ranges.append((start, end))
+        size += end - start
+        if size >= chunk_size:
+            yield ranges
+            ranges = []
+            size = 0
+    if ranges:
+        yield ranges
+
+
+# path, document head and tail, tags, function and parser options used by
+# the processes of iterparse_parallel()
+_worker_parallel = None
+
+
+def _init_parallel_worker(path, head, tail, tags, func, parser_options):
+    global _worker_parallel
+    _worker_parallel = (path, head, tail, tags, func, parser_options)
+
+
+def _parse_ranges(ranges):
+    """Parses byte ranges of the worker's document inside its root element,
+    and returns the result of the worker's function for each feature"""
+    path, head, tail, tags, func, parser_options = _worker_parallel
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        text = b''.join([head] + [data[start:end] for start, end in ranges] + [tail])
+    root = fromstring(text, parser_options=parser_options)
+    if func is None:
+        return [etree.tostring(el) for el in root.iterchildren(*tags)]
+    return [func(el) for el in root.iterchildren(*tags)]
+
+
+def iterparse_parallel(source, func=None, tag=('Placemark', 'Folder'),
+                       ordered=True, jobs=None, parser_options=None,
+                       chunk_size=PARALLEL_CHUNK_SIZE):
+    """Parses the features of a large KML file in parallel
+
+    The file is scanned for the outermost elements matching `tag` (by
+    default Placemarks and Folders, at any depth but not inside another
+    matched element), which are parsed by a pool of `jobs` processes (by
+    default one per CPU), about `chunk_size` bytes per task.  Each task
+    parses its features inside the root element of the file, so the
+    namespaces declared on the root element apply to them, with the parser
+    options of `parse`; CDATA sections are kept.  Namespaces declared on
+    other enclosing elements are not known to the tasks.
+
+    `func`, a picklable function such as a module level function, is called
+    in the worker processes with each feature element, and its results are
+    yielded.  Without `func` the elements themselves are yielded, which are
+    sent back serialized and parsed again in this process.  The results are
+    yielded in document order, or as soon as they are ready if `ordered` is
+    false.
+
+    `source` is the name of an uncompressed KML file.
+    """
+    if isinstance(tag, str):
+        tag = (tag,)
+    tags = tuple(_qualify_tag(t) for t in tag)
+    names = {t.rpartition('}')[2] for t in tags}
+    path = os.fspath(source)
+
+    with open(path, 'rb') as f:
+        if kmz.is_kmz(f):
+            raise ValueError('iterparse_parallel() cannot read KMZ archives')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            head, tail = _document_head(data)
+            tasks = _feature_ranges(data, names, chunk_size)
+            initargs = (path, head, tail, tags, func, parser_options)
+
+            if func is None:
+                def results(values):
+                    return [fromstring(value, parser_options=parser_options)
+                            for value in values]
+            else:
+                def results(values):
+                    return values
+
+            if jobs == 1:
+                _init_parallel_worker(*initargs)
+                for ranges in tasks:
+                    yield from results(_parse_ranges(ranges))
+                return
+
+            jobs = jobs or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=jobs,
+                                     initializer=_init_parallel_worker,
+                                     initargs=initargs) as executor:
+                # a few tasks per process are queued ahead of the results
+                pending = deque()
+
+                def completed():
+                    if ordered:
+                        return [pending.popleft()]
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                    return done
+
+                for ranges in tasks:
+                    pending.append(executor.submit(_parse_ranges, ranges))
+                    while len(pending) >= 2 * jobs:
+                        for future in completed():
+                            yield from results(future.result())
+                while pending:
+                    for future in completed():
+                        yield from results(future.result())
+
+
 def validate_kml():
-    """Validate a KML file
+    """Validate KML files
 
     Example: validate_kml test.kml
+
+    When several files, URLs or glob patterns are given, or the --json
+    option is used, the files are validated in parallel and the result for
+    each file is printed as a line of JSON, followed by a summary line.
     """
     from .util import open_pykml_uri
 
     parser = OptionParser(
-        usage='usage: %prog FILENAME_or_URL',
+        usage='usage: %prog [options] FILENAME_or_URL ...',
         version=f'%prog {pykml_version}',
     )
     parser.add_option('--schema', dest='schema_uri',
                       help='URI of the XML Schema Document used for validation')
+    parser.add_option('--jobs', dest='jobs', type='int',
+                      help='number of parallel validation processes')
+    parser.add_option('--json', dest='json', action='store_true', default=False,
+                      help='print the results as JSON lines')
+    parser.add_option('--streaming', dest='streaming', action='store_true',
+                      default=False,
+                      help='validate while parsing, without loading the whole '
+                           'document into memory')
+    parser.add_option('--max-errors', dest='max_errors', type='int', default=10,
+                      help='number of errors reported with --streaming '
+                           '(default: %default)')
     (options, args) = parser.parse_args()
-    if len(args) != 1:
+    if len(args) < 1:
         parser.error('wrong number of arguments')
-    else:
-        uri = args[0]
+    uris = _expand_uris(args)
+
+    if len(uris) > 1 or options.json:
+        start = time.perf_counter()
+        invalid = 0
+        for result in validate_kml_files(uris,
+                                         options.schema_uri or OGCKML_SCHEMA,
+                                         options.jobs, options.streaming,
+                                         options.max_errors):
+            invalid += not result['valid']
+            print(json.dumps(result), flush=True)
+        print(json.dumps({'summary': {
+            'files': len(uris),
+            'valid': len(uris) - invalid,
+            'invalid': invalid,
+            'seconds': round(time.perf_counter() - start, 6),
+        }}))
+        exit(1 if invalid else 0)
+
+    uri = uris[0]
+
+    if options.streaming:
+        schema = Schema(options.schema_uri or OGCKML_SCHEMA)
+        print(f'Validating "{uri}" against {options.schema_uri or OGCKML_SCHEMA}')
+        with open_pykml_uri(uri, mode='rb') as f:
+            errors = validate_stream(f, schema, max_errors=options.max_errors)
+        if not errors:
+            print('Congratulations! The file is valid.')
+            exit(0)
+        print('Uh-oh! The KML file is invalid.')
+        for error in errors:
+            print(f'line {error["line"]}: {error["message"]}')
+        exit(1)
 
     with open_pykml_uri(uri, mode='rb') as f:
         try:
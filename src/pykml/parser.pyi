@@ -3,12 +3,43 @@
 #
 #  Stub file for pyxml.parser
 #
-from typing import Dict, Optional
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, FrozenSet, Iterable, Iterator, \
+    List, NamedTuple, Optional, Sequence, Tuple, Union
 
-from lxml import etree
+from lxml import etree, objectify
 
 OGCKML_SCHEMA: str = ...
 
+KML_NAMESPACE: str = ...
+
+ITERPARSE_CHUNK_SIZE: int = ...
+
+PARALLEL_CHUNK_SIZE: int = ...
+
+DOCUMENT_CACHE_SIZE: int = ...
+
+BUNDLED_SCHEMAS: Dict[str, str] = ...
+
+PARSER_POOL_SIZE: int = ...
+
+
+def _schema_key(schema: str) -> str:
+    ...
+
+
+def _load_xml_schema(key: str) -> etree.XMLSchema:
+    ...
+
+
+def get_xml_schema(schema: str) -> etree.XMLSchema:
+    ...
+
+
+def clear_schema_cache(schema: Optional[str] = ...) -> None:
+    ...
+
 
 class Schema:
     schema: etree.XMLSchema = ...
@@ -23,6 +54,24 @@ class Schema:
         ...
 
 
+def _make_parser_options(schema: Optional[Schema] = ...,
+                         parser_options: Optional[Dict[str, Any]] = ...) \
+        -> Dict[str, Any]:
+    ...
+
+
+def _parser_key(parser_options: Dict[str, Any]) -> Optional[Tuple[Tuple[str, Any], ...]]:
+    ...
+
+
+def _parser_pool_of_thread() -> Dict[Tuple[Tuple[str, Any], ...], etree.XMLParser]:
+    ...
+
+
+def clear_parser_pool() -> None:
+    ...
+
+
 # TODO: parse_func
 def _parse_internal(source: bytes,
                     parse_func,
@@ -47,5 +96,133 @@ def parse(fileobject,
     ...
 
 
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    documents: int
+    size: int
+    max_size: int
+
+
+class DocumentCache:
+    max_size: int = ...
+    key: str = ...
+
+    def __init__(self, max_size: int = ..., key: str = ...) -> None:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+    def cache_info(self) -> CacheInfo:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+    def parse(self, fileobject: Union[str, bytes, Path, BinaryIO],
+              schema: Optional[Schema] = ...,
+              parser_options: Optional[Dict[str, Any]] = ...) -> etree._ElementTree:
+        ...
+
+    def _add(self, key: Tuple[Any, ...], stamp: Optional[Tuple[int, int]],
+             size: int, doc: etree._ElementTree) -> None:
+        ...
+
+
+def _file_stamp(stat: os.stat_result) -> Tuple[int, int]:
+    ...
+
+
+def _qualify_tag(tag: str) -> str:
+    ...
+
+
+def iterparse(source,
+              tag: Union[str, Sequence[str]] = ...,
+              schema: Optional[Schema] = ...,
+              parser_options: Optional[Dict[str, Any]] = ...) \
+        -> Iterator[objectify.ObjectifiedElement]:
+    ...
+
+
+_CONTAINER_TAGS: FrozenSet[str] = ...
+_STREAMED_TAGS: Tuple[str, ...] = ...
+
+
+def validate_stream(source,
+                    schema: Schema,
+                    max_errors: Optional[int] = ...,
+                    parser_options: Optional[Dict[str, Any]] = ...) \
+        -> List[Dict[str, Any]]:
+    ...
+
+
+def check_coordinates(source: Union[str, Path, BinaryIO],
+                      parser_options: Optional[Dict[str, Any]] = ...) -> None:
+    ...
+
+
+def _init_validation_worker(schema_uri: str, streaming: bool = ...,
+                            max_errors: Optional[int] = ...) -> None:
+    ...
+
+
+def _validate_uri(uri: str) -> Dict[str, Any]:
+    ...
+
+
+def _expand_uris(args: Iterable[str]) -> List[str]:
+    ...
+
+
+def validate_kml_files(uris: Iterable[str],
+                       schema_uri: str = ...,
+                       jobs: Optional[int] = ...,
+                       streaming: bool = ...,
+                       max_errors: Optional[int] = ...) \
+        -> Iterator[Dict[str, Any]]:
+    ...
+
+
+def _document_head(data: bytes) -> Tuple[bytes, bytes]:
+    ...
+
+
+def _element_ranges(data: bytes,
+                    names: Iterable[str],
+                    position: int = ...) -> Iterator[Tuple[int, int, int]]:
+    ...
+
+
+def _feature_ranges(data: bytes,
+                    names: Iterable[str],
+                    chunk_size: int) -> Iterator[List[Tuple[int, int]]]:
+    ...
+
+
+def _init_parallel_worker(path: str,
+                          head: bytes,
+                          tail: bytes,
+                          tags: Tuple[str, ...],
+                          func: Optional[Callable[[objectify.ObjectifiedElement], Any]],
+                          parser_options: Optional[Dict[str, Any]]) -> None:
+    ...
+
+
+def _parse_ranges(ranges: List[Tuple[int, int]]) -> List[Any]:
+    ...
+
+
+def iterparse_parallel(source: Union[str, Path],
+                       func: Optional[Callable[[objectify.ObjectifiedElement], Any]] = ...,
+                       tag: Union[str, Sequence[str]] = ...,
+                       ordered: bool = ...,
+                       jobs: Optional[int] = ...,
+                       parser_options: Optional[Dict[str, Any]] = ...,
+                       chunk_size: int = ...) -> Iterator[Any]:
+    ...
+
 def validate_kml():
     ...
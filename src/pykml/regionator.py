@@ -0,0 +1,285 @@
+#
+# coding: utf-8
+#
+# pykml.regionator
+#
+"""
+The pykml.regionator module splits large KML documents into a quadtree of
+tiles, so that clients such as Google Earth only load the Placemarks of the
+area in view.
+
+Each tile is a KML file with a <Region> and <Lod>, the Placemarks assigned
+to it, and a <NetworkLink> to each of its child tiles, which is loaded when
+the child's region becomes visible.  A tile keeps at most `max_features`
+Placemarks, the largest ones first, and passes the others down to the
+quadrants of its region that contain the centers of their bounding boxes.
+Bounding boxes are computed as for `pykml.spatial.SpatialIndex`.
+
+Shared styles and schemas are written to a separate file that all tiles
+refer to.  Tiles are written in parallel by a pool of processes.
+"""
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+from .factory import KML_ElementMaker as KML
+from .parser import iterparse
+from .spatial import KML_PLACEMARK
+from .spatial import _feature_bboxes
+
+KML_STYLE = '{http://www.opengis.net/kml/2.2}Style'
+KML_STYLEMAP = '{http://www.opengis.net/kml/2.2}StyleMap'
+KML_SCHEMA = '{http://www.opengis.net/kml/2.2}Schema'
+KML_STYLEURL = '{http://www.opengis.net/kml/2.2}styleUrl'
+KML_SCHEMADATA = '{http://www.opengis.net/kml/2.2}SchemaData'
+KML_FOLDER = '{http://www.opengis.net/kml/2.2}Folder'
+
+# the file holding the styles and schemas shared by all tiles
+SHARED_NAME = 'shared.kml'
+
+_SHARED_TAGS = (KML_STYLE, KML_STYLEMAP, KML_SCHEMA)
+
+# features that are not tiled, but kept in the root tile
+_ROOT_TAGS = tuple(f'{{http://www.opengis.net/kml/2.2}}{name}' for name in (
+    'GroundOverlay', 'ScreenOverlay', 'PhotoOverlay', 'NetworkLink',
+))
+
+
+class _Tile:
+    """A node of the quadtree: its file name, region, the serialized
+    Placemarks it holds and its child tiles"""
+
+    __slots__ = ('name', 'bbox', 'features', 'children')
+
+    def __init__(self, name, bbox):
+        self.name = name
+        self.bbox = bbox
+        self.features = []
+        self.children = []
+
+
+def _collect(source):
+    """Returns the shared elements and the (bbox, feature) pairs of a
+    document, with elements serialized, and whether it has Folders
+
+    The features are the Placemarks, and the overlays and NetworkLinks,
+    which have a None bounding box like Placemarks without coordinates.
+    """
+    shared = []
+    features = []
+
+    def add_shared(el):
+        if next(el.iterancestors(KML_PLACEMARK), None) is None:
+            shared.append(etree.tostring(el))
+
+    if hasattr(source, 'iter'):
+        for el in source.iter(*_SHARED_TAGS):
+            add_shared(el)
+        elements, ordinals, bboxes = _feature_bboxes(source)
+        feature_bboxes = {id(elements[i]): bbox for i, bbox in zip(ordinals, bboxes)}
+        for el in source.iter(KML_PLACEMARK, *_ROOT_TAGS):
+            features.append((feature_bboxes.get(id(el)), etree.tostring(el)))
+        has_folders = next(source.iter(KML_FOLDER), None) is not None
+        return shared, features, has_folders
+
+    # Folders are not among the tags, since iterparse keeps the elements
+    # inside a matching element until it ends
+    has_folders = False
+    for el in iterparse(source, tag=(KML_PLACEMARK,) + _ROOT_TAGS + _SHARED_TAGS):
+        if not has_folders:
+            has_folders = next(el.iterancestors(KML_FOLDER), None) is not None
+        if el.tag in _ROOT_TAGS:
+            features.append((None, etree.tostring(el)))
+        elif el.tag != KML_PLACEMARK:
+            add_shared(el)
+        else:
+            _, _, bboxes = _feature_bboxes(el)
+            features.append((bboxes[0] if bboxes else None, etree.tostring(el)))
+    return shared, features, has_folders
+
+
+def _extent(features):
+    bboxes = [bbox for bbox, _ in features if bbox is not None]
+    if not bboxes:
+        return (-180.0, -90.0, 180.0, 90.0)
+    return (min(b[0] for b in bboxes), min(b[1] for b in bboxes),
+            max(b[2] for b in bboxes), max(b[3] for b in bboxes))
+
+
+def _build_quadtree(features, max_features, max_depth):
+    """Assigns the features to the tiles of a quadtree
+
+    `features` are (bbox, Placemark) pairs in document order.  Returns the
+    root tile and the list of all tiles.
+    """
+    # the largest features are kept nearest the root
+    def size(i):
+        bbox = features[i][0]
+        return (bbox[2] - bbox[0]) + (bbox[3] - bbox[1])
+
+    order = sorted((i for i, (bbox, _) in enumerate(features) if bbox is not None),
+                   key=lambda i: (-size(i), i))
+    # features without coordinates are always in the root tile
+    unlocated = [i for i, (bbox, _) in enumerate(features) if bbox is None]
+    root = _Tile('', _extent(features))
+    tiles = []
+    pending = [(root, order)]
+    while pending:
+        tile, indexes = pending.pop()
+        tiles.append(tile)
+        depth = len(tile.name)
+        if len(indexes) > max_features and depth < max_depth:
+            kept, indexes = indexes[:max_features], indexes[max_features:]
+        else:
+            kept, indexes = indexes, []
+        if tile is root:
+            kept = kept + unlocated
+        tile.features = [features[i][1] for i in sorted(kept)]
+        if not indexes:
+            continue
+
+        west, south, east, north = tile.bbox
+        middle_x, middle_y = (west + east) / 2, (south + north) / 2
+        quadrants = [[], [], [], []]
+        for i in indexes:
+            bbox = features[i][0]
+            center_x, center_y = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+            quadrants[(center_x >= middle_x) + 2 * (center_y < middle_y)].append(i)
+        # quadrants 0 to 3: north west, north east, south west, south east
+        bboxes = [
+            (west, middle_y, middle_x, north),
+            (middle_x, middle_y, east, north),
+            (west, south, middle_x, middle_y),
+            (middle_x, south, east, middle_y),
+        ]
+        for quadrant, (bbox, quadrant_indexes) in enumerate(zip(bboxes, quadrants)):
+            if quadrant_indexes:
+                child = _Tile(tile.name + str(quadrant), bbox)
+                tile.children.append(child)
+                pending.append((child, quadrant_indexes))
+    return root, tiles
+
+
+def tile_file_name(name):
+    """Returns the file name of the tile at a quadtree path
+
+    `name` is a string of quadrant digits from the root: 0 north west, 1
+    north east, 2 south west and 3 south east.
+    """
+    return f'tile_{name}.kml'
+
+
+def _region(bbox, min_lod_pixels, max_lod_pixels):
+    west, south, east, north = bbox
+    return KML.Region(
+        KML.LatLonAltBox(
+            KML.north(repr(north)),
+            KML.south(repr(south)),
+            KML.east(repr(east)),
+            KML.west(repr(west)),
+        ),
+        KML.Lod(
+            KML.minLodPixels(str(min_lod_pixels)),
+            KML.maxLodPixels(str(max_lod_pixels)),
+        ),
+    )
+
+
+def _write_tile(path, name, bbox, features, children, min_lod_pixels,
+                max_lod_pixels, shared_href):
+    """Writes a tile; `children` are (file name, bbox) pairs"""
+    document = KML.Document(
+        KML.name(name),
+        _region(bbox, min_lod_pixels, max_lod_pixels),
+    )
+    for data in features:
+        placemark = etree.fromstring(data)
+        if shared_href:
+            # local references are to the shared file
+            for el in placemark.iter(KML_STYLEURL):
+                if el.text and el.text.strip().startswith('#'):
+                    el.text = shared_href + el.text.strip()
+            for el in placemark.iter(KML_SCHEMADATA):
+                url = el.get('schemaUrl')
+                if url and url.startswith('#'):
+                    el.set('schemaUrl', shared_href + url)
+        document.append(placemark)
+    for href, child_bbox in children:
+        document.append(KML.NetworkLink(
+            KML.name(href),
+            _region(child_bbox, min_lod_pixels, max_lod_pixels),
+            KML.Link(
+                KML.href(href),
+                KML.viewRefreshMode('onRegion'),
+            ),
+        ))
+    with open(path, 'wb') as f:
+        f.write(etree.tostring(KML.kml(document), xml_declaration=True,
+                               encoding='UTF-8'))
+
+
+def _write_tile_task(args):
+    return _write_tile(*args)
+
+
+def regionate(source, directory, max_features=100, max_depth=16,
+              min_lod_pixels=128, max_lod_pixels=-1, root_name='doc.kml',
+              jobs=None):
+    """Splits the Placemarks of a KML document into a quadtree of tiles
+
+    `source` is a parsed KML document or element, or a KML or KMZ file name
+    or binary file object, which is then read incrementally.  The tiles are
+    written to `directory`, which is created if needed: the root tile as
+    `root_name`, the others as named by `tile_file_name`, and the shared
+    styles and schemas as SHARED_NAME.  References to shared styles and
+    schemas in the Placemarks are rewritten to that file.
+
+    A tile holds at most `max_features` Placemarks, unless it is
+    `max_depth` levels below the root.  The regions of all tiles have the
+    given Lod limits, in pixels.  Tiles are written by `jobs` processes (by
+    default one per CPU).  Returns the path of the root tile.
+
+    Only Placemarks are tiled.  GroundOverlays, ScreenOverlays,
+    PhotoOverlays and NetworkLinks are kept in the root tile.  The Folder
+    hierarchy is not kept: the features of Folders are tiled without them,
+    and the Folders' names, visibility and other elements, except for
+    shared styles, are lost, which is reported with a UserWarning.
+    """
+    if max_features < 1:
+        raise ValueError('max_features must be at least 1')
+    shared, features, has_folders = _collect(source)
+    if has_folders:
+        warnings.warn('the Folder hierarchy of the document is not kept in '
+                      'the tiles', UserWarning, stacklevel=2)
+    root, tiles = _build_quadtree(features, max_features, max_depth)
+
+    os.makedirs(directory, exist_ok=True)
+    shared_href = ''
+    if shared:
+        shared_href = SHARED_NAME
+        document = KML.Document(*[etree.fromstring(data) for data in shared])
+        with open(os.path.join(directory, SHARED_NAME), 'wb') as f:
+            f.write(etree.tostring(KML.kml(document), xml_declaration=True,
+                                   encoding='UTF-8'))
+
+    def file_name(tile):
+        return root_name if tile is root else tile_file_name(tile.name)
+
+    tasks = [
+        (os.path.join(directory, file_name(tile)), file_name(tile), tile.bbox,
+         tile.features, [(file_name(child), child.bbox) for child in tile.children],
+         min_lod_pixels, max_lod_pixels, shared_href)
+        for tile in tiles
+    ]
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            _write_tile_task(task)
+    else:
+        jobs = jobs or os.cpu_count()
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for _ in executor.map(_write_tile_task, tasks, chunksize=chunksize):
+                pass
+    return os.path.join(directory, root_name)
@@ -0,0 +1,51 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.regionator
+#
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+from lxml import etree
+
+KML_STYLE: str = ...
+KML_STYLEMAP: str = ...
+KML_SCHEMA: str = ...
+KML_STYLEURL: str = ...
+KML_SCHEMADATA: str = ...
+KML_FOLDER: str = ...
+SHARED_NAME: str = ...
+_SHARED_TAGS: Tuple[str, ...] = ...
+_ROOT_TAGS: Tuple[str, ...] = ...
+
+BBox = Tuple[float, float, float, float]
+
+
+class _Tile:
+    name: str
+    bbox: BBox
+    features: List[bytes]
+    children: List['_Tile']
+
+    def __init__(self, name: str, bbox: BBox) -> None: ...
+
+
+def _collect(source: Union[str, BinaryIO, etree._Element, etree._ElementTree]) \
+        -> Tuple[List[bytes], List[Tuple[Optional[BBox], bytes]], bool]:
+    ...
+
+
+def _build_quadtree(features: List[Tuple[Optional[BBox], bytes]],
+                    max_features: int, max_depth: int) \
+        -> Tuple[_Tile, List[_Tile]]:
+    ...
+
+
+def tile_file_name(name: str) -> str:
+    ...
+
+
+def regionate(source: Union[str, BinaryIO, etree._Element, etree._ElementTree],
+              directory: str, max_features: int = ..., max_depth: int = ...,
+              min_lod_pixels: int = ..., max_lod_pixels: int = ...,
+              root_name: str = ..., jobs: Optional[int] = ...) -> str:
+    ...
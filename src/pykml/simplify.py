@@ -0,0 +1,473 @@
+#
+# coding: utf-8
+#
+# pykml.simplify
+#
+"""
+The pykml.simplify module reduces the number of vertices of LineString,
+LinearRing and gx:Track geometries.
+
+Two algorithms are provided: Douglas-Peucker, which keeps the vertices
+further than `tolerance` from the simplified line, and Visvalingam-Whyatt,
+which repeatedly drops the vertex of smallest effective area while that area
+is less than `tolerance` squared.  Distances and areas are measured in
+degrees in the longitude/latitude plane, as in `pykml.spatial`; altitudes are
+kept but not taken into account.  NumPy is used for the distance and area
+computations if it is installed.
+
+The first and last vertices of a line are always kept, rings stay closed
+with at least four vertices, and the rings of a polygon are simplified
+together so that they do not cross each other and holes stay inside the
+outer boundary.
+"""
+import heapq
+from array import array
+
+from .geometry import GX_COORD
+from .geometry import GX_MULTITRACK
+from .geometry import GX_TRACK
+from .geometry import KML_COORDINATES
+from .geometry import KML_INNER_BOUNDARY
+from .geometry import KML_LINEARRING
+from .geometry import KML_LINESTRING
+from .geometry import KML_MULTIGEOMETRY
+from .geometry import KML_OUTER_BOUNDARY
+from .geometry import KML_POLYGON
+from .geometry import _as_numpy
+from .geometry import _set_text
+from .geometry import numpy
+from .geometry import parse_coordinates
+from .geometry import parse_gx_coords
+
+KML_WHEN = '{http://www.opengis.net/kml/2.2}when'
+GX_ANGLES = '{http://www.google.com/kml/ext/2.2}angles'
+GX_SIMPLE_ARRAY_DATA = '{http://www.google.com/kml/ext/2.2}SimpleArrayData'
+GX_VALUE = '{http://www.google.com/kml/ext/2.2}value'
+
+DOUGLAS_PEUCKER = 'douglas-peucker'
+VISVALINGAM = 'visvalingam'
+
+# geometries simplified by `simplify`, in document order
+_SIMPLIFIED_TAGS = (KML_LINESTRING, KML_LINEARRING, KML_POLYGON, GX_TRACK)
+# the number of times the tolerance of a polygon is halved before its rings
+# are left unchanged
+_POLYGON_RETRIES = 8
+
+
+def _segment_distances2(xs, ys, first, last):
+    """Returns the squared distances of the vertices between `first` and
+    `last` to the segment joining them"""
+    ax, ay = xs[first], ys[first]
+    dx, dy = xs[last] - ax, ys[last] - ay
+    length2 = dx * dx + dy * dy
+    if numpy is not None and isinstance(xs, numpy.ndarray):
+        px = xs[first + 1:last] - ax
+        py = ys[first + 1:last] - ay
+        if length2:
+            t = numpy.clip((px * dx + py * dy) / length2, 0.0, 1.0)
+            px = px - t * dx
+            py = py - t * dy
+        return px * px + py * py
+
+    distances = []
+    for i in range(first + 1, last):
+        px, py = xs[i] - ax, ys[i] - ay
+        if length2:
+            t = min(max((px * dx + py * dy) / length2, 0.0), 1.0)
+            px -= t * dx
+            py -= t * dy
+        distances.append(px * px + py * py)
+    return distances
+
+
+def _argmax(values):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        i = int(values.argmax())
+    else:
+        i = max(range(len(values)), key=values.__getitem__)
+    return i, values[i]
+
+
+def _douglas_peucker(xs, ys, keep, tolerance2):
+    """Marks the vertices kept by Douglas-Peucker between the vertices
+    already marked in `keep`"""
+    if numpy is not None and isinstance(xs, numpy.ndarray):
+        return _douglas_peucker_numpy(xs, ys, keep, tolerance2)
+    stack = []
+    first = 0
+    for last in range(1, len(keep)):
+        if keep[last]:
+            stack.append((first, last))
+            first = last
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        i, distance2 = _argmax(_segment_distances2(xs, ys, first, last))
+        if distance2 > tolerance2:
+            i += first + 1
+            keep[i] = True
+            stack.append((first, i))
+            stack.append((i, last))
+    return keep
+
+
+def _douglas_peucker_numpy(xs, ys, keep, tolerance2):
+    """Douglas-Peucker over all the segments of a line at once
+
+    Each pass measures the distances of the vertices of all the segments
+    that are not yet simplified enough, and splits each of them at its
+    furthest vertex, so that there is one pass per level of recursion.
+    """
+    keep = numpy.array(keep, dtype=bool)
+    vertices = numpy.flatnonzero(~keep)
+    while len(vertices):
+        kept = numpy.flatnonzero(keep)
+        position = numpy.searchsorted(kept, vertices)
+        first, last = kept[position - 1], kept[position]
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        px, py = xs[vertices] - ax, ys[vertices] - ay
+        length2 = dx * dx + dy * dy
+        t = numpy.divide(px * dx + py * dy, length2,
+                         out=numpy.zeros_like(px), where=length2 > 0)
+        numpy.clip(t, 0.0, 1.0, out=t)
+        px -= t * dx
+        py -= t * dy
+        distances2 = px * px + py * py
+
+        # the vertices of each segment are contiguous
+        starts = numpy.flatnonzero(numpy.diff(position, prepend=-1))
+        segment = numpy.cumsum(numpy.diff(position, prepend=-1) != 0) - 1
+        maximums = numpy.maximum.reduceat(distances2, starts)
+        split = numpy.flatnonzero((distances2 == maximums[segment]) &
+                                  (distances2 > tolerance2))
+        # the first furthest vertex of each segment
+        split = split[numpy.diff(segment[split], prepend=-1) != 0]
+        keep[vertices[split]] = True
+
+        remaining = maximums[segment] > tolerance2
+        remaining[split] = False
+        vertices = vertices[remaining]
+    return keep.tolist()
+
+
+def _triangle_areas(xs, ys):
+    """Returns the areas of the triangles formed by each inner vertex and
+    its neighbours"""
+    if numpy is not None and isinstance(xs, numpy.ndarray):
+        return (0.5 * numpy.abs((xs[:-2] - xs[2:]) * (ys[1:-1] - ys[:-2]) -
+                                (xs[:-2] - xs[1:-1]) * (ys[2:] - ys[:-2]))).tolist()
+    return [_area(xs, ys, i - 1, i, i + 1) for i in range(1, len(xs) - 1)]
+
+
+def _area(xs, ys, a, b, c):
+    return 0.5 * abs((xs[a] - xs[c]) * (ys[b] - ys[a]) -
+                     (xs[a] - xs[b]) * (ys[c] - ys[a]))
+
+
+def _visvalingam(xs, ys, threshold, minimum):
+    """Returns the indexes of the vertices kept by Visvalingam-Whyatt"""
+    areas = [0.0] + _triangle_areas(xs, ys) + [0.0]
+    if numpy is not None and isinstance(xs, numpy.ndarray):
+        xs, ys = xs.tolist(), ys.tolist()
+    n = len(xs)
+    previous = list(range(-1, n - 1))
+    following = list(range(1, n + 1))
+    heap = [(area, i) for i, area in enumerate(areas) if 0 < i < n - 1]
+    heapq.heapify(heap)
+    removed = [False] * n
+    remaining = n
+    while heap and remaining > minimum:
+        area, i = heapq.heappop(heap)
+        if removed[i] or area != areas[i]:
+            # an outdated entry
+            continue
+        if area >= threshold:
+            break
+        removed[i] = True
+        remaining -= 1
+        before, after = previous[i], following[i]
+        following[before] = after
+        previous[after] = before
+        for j in (before, after):
+            if 0 < j < n - 1:
+                # the area of a vertex never decreases, so that vertices are
+                # removed in order of significance
+                areas[j] = max(_area(xs, ys, previous[j], j, following[j]), area)
+                heapq.heappush(heap, (areas[j], j))
+    return [i for i in range(n) if not removed[i]]
+
+
+def _columns(coords):
+    """Returns the longitudes and latitudes of flat or (N, 3) coordinates"""
+    if numpy is not None:
+        if not isinstance(coords, numpy.ndarray):
+            coords = _as_numpy(array('d', coords))
+        coords = coords.reshape(-1, 3)
+        return coords[:, 0], coords[:, 1]
+    return coords[0::3], coords[1::3]
+
+
+def simplify_indices(coords, tolerance, method=DOUGLAS_PEUCKER, closed=None):
+    """Returns the indexes of the vertices kept by a simplification
+
+    `coords` is a flat sequence of (longitude, latitude, altitude) triples
+    or a (N, 3) NumPy array, such as returned by
+    `pykml.geometry.coords_array`.  `method` is DOUGLAS_PEUCKER or
+    VISVALINGAM.  If `closed` is True the coordinates are a ring, which keeps
+    at least four vertices; by default a ring is recognized by its first and
+    last vertices being equal.
+    """
+    if method not in (DOUGLAS_PEUCKER, VISVALINGAM):
+        raise ValueError(f'unknown simplification method: {method!r}')
+    xs, ys = _columns(coords)
+    n = len(xs)
+    if closed is None:
+        closed = n > 3 and xs[0] == xs[-1] and ys[0] == ys[-1]
+    minimum = 4 if closed else 2
+    if n <= minimum or tolerance <= 0:
+        return list(range(n))
+
+    if method == VISVALINGAM:
+        return _visvalingam(xs, ys, tolerance * tolerance, minimum)
+
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    if not closed:
+        keep = _douglas_peucker(xs, ys, keep, tolerance * tolerance)
+        return [i for i in range(n) if keep[i]]
+
+    # a ring is split at the vertex furthest from its start, and always
+    # keeps the vertex furthest from that split
+    i, distance2 = _argmax(_segment_distances2(xs, ys, 0, n - 1))
+    if not distance2:
+        return list(range(n))
+    split = i + 1
+    keep[split] = True
+    keep = _douglas_peucker(xs, ys, keep, tolerance * tolerance)
+    if sum(keep) < minimum:
+        distances = (list(_segment_distances2(xs, ys, 0, split)) + [0.0] +
+                     list(_segment_distances2(xs, ys, split, n - 1)))
+        keep[_argmax(distances)[0] + 1] = True
+    return [i for i in range(n) if keep[i]]
+
+
+def simplify_coords(coords, tolerance, method=DOUGLAS_PEUCKER, closed=None):
+    """Returns the coordinates kept by a simplification
+
+    See `simplify_indices`.  Returns a flat array('d'), or a (N, 3) NumPy
+    array if `coords` is one.
+    """
+    indices = simplify_indices(coords, tolerance, method, closed)
+    if numpy is not None and isinstance(coords, numpy.ndarray):
+        return coords.reshape(-1, 3)[indices]
+    result = array('d')
+    for i in indices:
+        result.extend(coords[3 * i:3 * i + 3])
+    return result
+
+
+# rings of polygons
+
+def _orientation(a, b, c):
+    value = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    return (value > 0) - (value < 0)
+
+
+def _segments_cross(a, b, c, d):
+    """Tests whether segment ab crosses or touches segment cd"""
+    o1, o2 = _orientation(a, b, c), _orientation(a, b, d)
+    o3, o4 = _orientation(c, d, a), _orientation(c, d, b)
+    if o1 != o2 and o3 != o4:
+        return True
+    # collinear segments overlapping
+    return (o1 == o2 == o3 == o4 == 0 and
+            max(min(a[0], b[0]), min(c[0], d[0])) <= min(max(a[0], b[0]), max(c[0], d[0])) and
+            max(min(a[1], b[1]), min(c[1], d[1])) <= min(max(a[1], b[1]), max(c[1], d[1])))
+
+
+def _rings_cross(ring, other):
+    """Tests whether the edges of two rings, or of a ring with itself if
+    `other` is None, cross"""
+    same = other is None
+    if same:
+        other = ring
+    edges = list(zip(ring, ring[1:]))
+    other_edges = list(zip(other, other[1:]))
+    boxes = [(min(c[0], d[0]), min(c[1], d[1]), max(c[0], d[0]), max(c[1], d[1]))
+             for c, d in other_edges]
+    if numpy is not None:
+        wests, souths, easts, norths = numpy.array(boxes).reshape(-1, 4).T
+    last = len(edges) - 1
+    for i, (a, b) in enumerate(edges):
+        west, east = min(a[0], b[0]), max(a[0], b[0])
+        south, north = min(a[1], b[1]), max(a[1], b[1])
+        start = i + 2 if same else 0
+        if numpy is not None:
+            candidates = (start + numpy.flatnonzero(
+                (wests[start:] <= east) & (west <= easts[start:]) &
+                (souths[start:] <= north) & (south <= norths[start:]))).tolist()
+        else:
+            candidates = [j for j in range(start, len(boxes))
+                          if boxes[j][0] <= east and west <= boxes[j][2] and
+                          boxes[j][1] <= north and south <= boxes[j][3]]
+        for j in candidates:
+            if same and i == 0 and j == last:
+                # the first and last edges of a ring share a vertex
+                continue
+            if _segments_cross(a, b, *other_edges[j]):
+                return True
+    return False
+
+
+def _contains(ring, point):
+    """Tests whether a point is inside a ring, by the even-odd rule"""
+    x, y = point
+    inside = False
+    for (ax, ay), (bx, by) in zip(ring, ring[1:]):
+        if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+            inside = not inside
+    return inside
+
+
+def _valid_rings(rings):
+    """Tests whether the simplified rings of a polygon keep its topology:
+    no crossing edges, holes inside the outer ring and outside each
+    other"""
+    for i, ring in enumerate(rings):
+        if _rings_cross(ring, None):
+            return False
+        for other in rings[i + 1:]:
+            if _rings_cross(ring, other):
+                return False
+            if i == 0:
+                if not _contains(ring, other[0]):
+                    return False
+            elif _contains(ring, other[0]) or _contains(other, ring[0]):
+                return False
+    return True
+
+
+def _simplify_rings(rings, tolerance, method):
+    """Returns the indexes of the vertices kept in each ring of a polygon
+
+    The tolerance is halved until the simplified rings are valid, and the
+    rings are left unchanged if they are still not valid after
+    _POLYGON_RETRIES attempts.
+    """
+    for _ in range(_POLYGON_RETRIES):
+        kept = [simplify_indices(coords, tolerance, method, closed=True)
+                for coords in rings]
+        if all(len(indices) == len(coords) // 3
+               for coords, indices in zip(rings, kept)):
+            return kept
+        if _valid_rings([
+                [(coords[3 * i], coords[3 * i + 1]) for i in indices]
+                for coords, indices in zip(rings, kept)]):
+            return kept
+        tolerance /= 2
+    return [list(range(len(coords) // 3)) for coords in rings]
+
+
+# KML elements
+
+def _set_kept_tuples(coordinates, indices):
+    """Keeps the given tuples of a <coordinates> element, as written"""
+    tuples = (coordinates.text or '').split()
+    _set_text(coordinates, ' '.join([tuples[i] for i in indices]))
+    return len(tuples) - len(indices)
+
+
+def _remove_track_vertices(track, indices, count):
+    """Removes the vertices of a gx:Track, with their times, angles and
+    data values, that are not at the given indexes"""
+    kept = set(indices)
+    parents = [track]
+    parents.extend(track.iterdescendants(GX_SIMPLE_ARRAY_DATA))
+    for parent in parents:
+        if parent is track:
+            groups = [list(track.iterchildren(tag))
+                      for tag in (KML_WHEN, GX_COORD, GX_ANGLES)]
+        else:
+            groups = [list(parent.iterchildren(GX_VALUE))]
+        for elements in groups:
+            if len(elements) != count:
+                continue
+            for i, el in enumerate(elements):
+                if i not in kept:
+                    parent.remove(el)
+    return count - len(indices)
+
+
+def simplify_geometry(el, tolerance, method=DOUGLAS_PEUCKER):
+    """Simplifies a geometry element in place
+
+    `el` is a LineString, LinearRing, Polygon, gx:Track, MultiGeometry or
+    gx:MultiTrack element; other elements are left unchanged.  Coordinate
+    tuples that are kept are left as written; the <when>, <gx:angles> and
+    <gx:SimpleArrayData> values of the vertices removed from a gx:Track are
+    removed with them.  Returns the number of vertices removed.
+    """
+    tag = el.tag
+    if tag in (KML_LINESTRING, KML_LINEARRING):
+        coordinates = el.find(KML_COORDINATES)
+        if coordinates is None:
+            return 0
+        coords = parse_coordinates(coordinates.text or '')
+        indices = simplify_indices(coords, tolerance, method,
+                                   closed=True if tag == KML_LINEARRING else None)
+        return _set_kept_tuples(coordinates, indices)
+
+    if tag == KML_POLYGON:
+        elements = []
+        for boundary_tag in (KML_OUTER_BOUNDARY, KML_INNER_BOUNDARY):
+            for boundary in el.iterchildren(boundary_tag):
+                for ring in boundary.iterchildren(KML_LINEARRING):
+                    elements.extend(ring.iterchildren(KML_COORDINATES))
+        rings = [parse_coordinates(coordinates.text or '') for coordinates in elements]
+        if not rings:
+            return 0
+        return sum(_set_kept_tuples(coordinates, indices)
+                   for coordinates, indices in zip(
+                       elements, _simplify_rings(rings, tolerance, method)))
+
+    if tag == GX_TRACK:
+        coords = parse_gx_coords(c.text for c in el.iterchildren(GX_COORD))
+        count = len(coords) // 3
+        return _remove_track_vertices(
+            el, simplify_indices(coords, tolerance, method, closed=False), count)
+
+    if tag in (KML_MULTIGEOMETRY, GX_MULTITRACK):
+        return sum(simplify_geometry(child, tolerance, method)
+                   for child in el.iterchildren(KML_MULTIGEOMETRY, GX_MULTITRACK,
+                                                *_SIMPLIFIED_TAGS))
+    return 0
+
+
+def simplify(doc, tolerance, method=DOUGLAS_PEUCKER):
+    """Simplifies all the geometries of a parsed KML document in place
+
+    See `simplify_geometry`.  Returns the number of vertices removed.
+    """
+    removed = 0
+    for el in doc.iter(*_SIMPLIFIED_TAGS):
+        if el.tag == KML_LINEARRING and el.getparent() is not None and \
+                el.getparent().tag in (KML_OUTER_BOUNDARY, KML_INNER_BOUNDARY):
+            # simplified with its polygon
+            continue
+        removed += simplify_geometry(el, tolerance, method)
+    return removed
+
+
+def iter_simplified(source, tolerance, method=DOUGLAS_PEUCKER):
+    """Yields the simplified geometries of a KML document
+
+    `source` is any source accepted by `pykml.util.iter_geometries`; KML and
+    KMZ files are read incrementally, and each geometry is only valid until
+    the next one is requested.
+    """
+    from .util import iter_geometries
+    for el in iter_geometries(source):
+        simplify_geometry(el, tolerance, method)
+        yield el
@@ -0,0 +1,58 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.simplify
+#
+from array import array
+from typing import Any, BinaryIO, Iterator, List, Optional, Sequence, Tuple, Union
+
+from lxml import etree
+
+KML_WHEN: str = ...
+GX_ANGLES: str = ...
+GX_SIMPLE_ARRAY_DATA: str = ...
+GX_VALUE: str = ...
+DOUGLAS_PEUCKER: str = ...
+VISVALINGAM: str = ...
+_SIMPLIFIED_TAGS: Tuple[str, ...] = ...
+_POLYGON_RETRIES: int = ...
+
+Coordinates = Union[array, Sequence[float], Any]
+_Point = Tuple[float, float]
+
+
+def simplify_indices(coords: Coordinates, tolerance: float,
+                     method: str = ..., closed: Optional[bool] = ...) \
+        -> List[int]:
+    ...
+
+
+def simplify_coords(coords: Coordinates, tolerance: float,
+                    method: str = ..., closed: Optional[bool] = ...) \
+        -> Union[array, Any]:
+    ...
+
+
+def _valid_rings(rings: List[List[_Point]]) -> bool:
+    ...
+
+
+def _simplify_rings(rings: List[array], tolerance: float, method: str) \
+        -> List[List[int]]:
+    ...
+
+
+def simplify_geometry(el: etree._Element, tolerance: float,
+                      method: str = ...) -> int:
+    ...
+
+
+def simplify(doc: Union[etree._Element, etree._ElementTree], tolerance: float,
+             method: str = ...) -> int:
+    ...
+
+
+def iter_simplified(source: Union[str, BinaryIO, etree._Element, etree._ElementTree],
+                    tolerance: float, method: str = ...) \
+        -> Iterator[etree._Element]:
+    ...
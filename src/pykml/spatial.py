@@ -0,0 +1,262 @@
+#
+# coding: utf-8
+#
+# pykml.spatial
+#
+"""
+The pykml.spatial module provides a spatial index over the features of a
+parsed KML document, for bounding box and nearest neighbour queries.
+
+The index is an R-tree packed with the Sort-Tile-Recursive (STR) algorithm.
+Each Placemark is indexed by the bounding box of all its geometries;
+geometries outside of a Placemark are indexed on their own.  Other
+coordinates, such as the gx:LatLonQuad of a GroundOverlay, are not
+indexed.  Bounding boxes
+are (west, south, east, north) tuples in degrees, and distances are measured
+in degrees in the longitude/latitude plane.
+"""
+import heapq
+import struct
+import sys
+from array import array
+from math import ceil, sqrt
+
+from .geometry import GX_COORD
+from .geometry import GX_TRACK
+from .geometry import KML_COORDINATES
+from .geometry import parse_coordinates
+from .geometry import parse_gx_coords
+
+KML_PLACEMARK = '{http://www.opengis.net/kml/2.2}Placemark'
+
+# elements that can be indexed, in the order used to locate them again
+_FEATURE_TAGS = (
+    KML_PLACEMARK,
+    '{http://www.opengis.net/kml/2.2}Point',
+    '{http://www.opengis.net/kml/2.2}LineString',
+    '{http://www.opengis.net/kml/2.2}LinearRing',
+    GX_TRACK,
+)
+
+_FILE_MAGIC = b'PYKMLSI1'
+# capacity, byte order, items, feature elements, levels
+_FILE_HEADER = struct.Struct('<8sI?QQI')
+
+
+def _feature_bboxes(doc):
+    """Returns the indexable elements of a document, and the bounding boxes
+    and element ordinals of its features"""
+    features = list(doc.iter(*_FEATURE_TAGS))
+    ordinals = {id(el): i for i, el in enumerate(features)}
+
+    bboxes = {}
+    for el in doc.iter(KML_COORDINATES, GX_TRACK):
+        if el.tag == GX_TRACK:
+            coords = parse_gx_coords(c.text for c in el.iterchildren(GX_COORD))
+            geometry = el
+        else:
+            coords = parse_coordinates(el.text or '')
+            geometry = el.getparent()
+        if not coords:
+            continue
+
+        owner = next(geometry.iterancestors(KML_PLACEMARK), None)
+        if owner is None:
+            owner = geometry
+        longitudes = coords[0::3]
+        latitudes = coords[1::3]
+        bbox = (min(longitudes), min(latitudes), max(longitudes), max(latitudes))
+
+        ordinal = ordinals.get(id(owner))
+        if ordinal is None:
+            # e.g. the gx:LatLonQuad of a GroundOverlay
+            continue
+        if ordinal in bboxes:
+            bbox = _union(bboxes[ordinal], bbox)
+        bboxes[ordinal] = bbox
+
+    order = sorted(bboxes)
+    return features, array('q', order), [bboxes[i] for i in order]
+
+
+def _union(a, b):
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _str_order(bboxes, capacity):
+    """Returns the order in which STR packs a list of bounding boxes"""
+    n = len(bboxes)
+    center_x = [b[0] + b[2] for b in bboxes]
+    center_y = [b[1] + b[3] for b in bboxes]
+    slab_size = max(ceil(sqrt(ceil(n / capacity))), 1) * capacity
+
+    order = sorted(range(n), key=center_x.__getitem__)
+    result = []
+    for start in range(0, n, slab_size):
+        result.extend(sorted(order[start:start + slab_size],
+                             key=center_y.__getitem__))
+    return result
+
+
+def _min_distance2(x, y, bboxes, i):
+    """Returns the squared distance from a point to the i-th bounding box"""
+    dx = max(bboxes[4 * i] - x, 0.0, x - bboxes[4 * i + 2])
+    dy = max(bboxes[4 * i + 1] - y, 0.0, y - bboxes[4 * i + 3])
+    return dx * dx + dy * dy
+
+
+class SpatialIndex:
+    """A STR packed R-tree over the features of a KML document
+
+    `doc` is a parsed KML document or element.  Queries return the original
+    Placemark (or geometry) elements.
+    """
+
+    def __init__(self, doc, node_capacity=16):
+        if node_capacity < 2:
+            raise ValueError('node_capacity must be at least 2')
+        features, ordinals, bboxes = _feature_bboxes(doc)
+        self._build(features, ordinals, bboxes, node_capacity)
+
+    def _build(self, features, ordinals, bboxes, capacity):
+        self.node_capacity = capacity
+        self._feature_count = len(features)
+
+        order = _str_order(bboxes, capacity)
+        self._ordinals = array('q', (ordinals[i] for i in order))
+        self._elements = [features[i] for i in self._ordinals]
+        bboxes = [bboxes[i] for i in order]
+
+        # each level holds the bounding boxes of its nodes and, above the
+        # leaves, the (start, end) range of their children in the level below
+        self._levels = [(array('d', [v for b in bboxes for v in b]), None)]
+        while len(bboxes) > capacity:
+            parents = []
+            ranges = []
+            for start in range(0, len(bboxes), capacity):
+                end = min(start + capacity, len(bboxes))
+                bbox = bboxes[start]
+                for b in bboxes[start + 1:end]:
+                    bbox = _union(bbox, b)
+                parents.append(bbox)
+                ranges.append((start, end))
+
+            order = _str_order(parents, capacity)
+            bboxes = [parents[i] for i in order]
+            self._levels.append((
+                array('d', [v for b in bboxes for v in b]),
+                array('q', [v for i in order for v in ranges[i]]),
+            ))
+
+    def __len__(self):
+        return len(self._elements)
+
+    def intersection(self, bbox):
+        """Returns the features whose bounding box intersects `bbox`
+
+        `bbox` is a (west, south, east, north) tuple.  The features are
+        returned in document order.
+        """
+        west, south, east, north = bbox
+        top = len(self._levels) - 1
+        stack = [(top, i) for i in range(len(self._levels[top][0]) // 4)]
+        found = []
+        while stack:
+            level, i = stack.pop()
+            bboxes, ranges = self._levels[level]
+            if (bboxes[4 * i] > east or bboxes[4 * i + 2] < west or
+                    bboxes[4 * i + 1] > north or bboxes[4 * i + 3] < south):
+                continue
+            if ranges is None:
+                found.append(i)
+            else:
+                stack.extend((level - 1, j)
+                             for j in range(ranges[2 * i], ranges[2 * i + 1]))
+
+        found.sort(key=self._ordinals.__getitem__)
+        return [self._elements[i] for i in found]
+
+    def nearest(self, longitude, latitude, k=1):
+        """Returns the `k` features nearest to a point, nearest first
+
+        The distance to a feature is the distance to its bounding box.
+        """
+        top = len(self._levels) - 1
+        top_bboxes = self._levels[top][0]
+        heap = [(_min_distance2(longitude, latitude, top_bboxes, i), top, i)
+                for i in range(len(top_bboxes) // 4)]
+        heapq.heapify(heap)
+
+        found = []
+        while heap and len(found) < k:
+            _, level, i = heapq.heappop(heap)
+            if level == 0:
+                found.append(self._elements[i])
+                continue
+            bboxes = self._levels[level - 1][0]
+            ranges = self._levels[level][1]
+            for j in range(ranges[2 * i], ranges[2 * i + 1]):
+                heapq.heappush(
+                    heap,
+                    (_min_distance2(longitude, latitude, bboxes, j), level - 1, j)
+                )
+        return found
+
+    def save(self, fileobject):
+        """Writes the index to a binary file object or file name
+
+        The elements are stored by their position in the document, so the
+        index can be loaded again for the same document with `load`.
+        """
+        if isinstance(fileobject, (str, bytes)) or hasattr(fileobject, '__fspath__'):
+            with open(fileobject, 'wb') as f:
+                return self.save(f)
+
+        fileobject.write(_FILE_HEADER.pack(
+            _FILE_MAGIC, self.node_capacity, sys.byteorder == 'little',
+            len(self._elements), self._feature_count, len(self._levels),
+        ))
+        self._ordinals.tofile(fileobject)
+        for bboxes, ranges in self._levels:
+            fileobject.write(struct.pack('<Q', len(bboxes) // 4))
+            bboxes.tofile(fileobject)
+            if ranges is not None:
+                ranges.tofile(fileobject)
+
+    @classmethod
+    def load(cls, fileobject, doc):
+        """Reads an index written by `save` for the document `doc`"""
+        if isinstance(fileobject, (str, bytes)) or hasattr(fileobject, '__fspath__'):
+            with open(fileobject, 'rb') as f:
+                return cls.load(f, doc)
+
+        header = fileobject.read(_FILE_HEADER.size)
+        if len(header) != _FILE_HEADER.size or not header.startswith(_FILE_MAGIC):
+            raise ValueError('not a pyKML spatial index file')
+        _, capacity, little_endian, items, feature_count, level_count = \
+            _FILE_HEADER.unpack(header)
+        swap = little_endian != (sys.byteorder == 'little')
+
+        def read_array(typecode, count):
+            values = array(typecode)
+            values.fromfile(fileobject, count)
+            if swap:
+                values.byteswap()
+            return values
+
+        index = cls.__new__(cls)
+        index.node_capacity = capacity
+        index._feature_count = feature_count
+        index._ordinals = read_array('q', items)
+        index._levels = []
+        for level in range(level_count):
+            count, = struct.unpack('<Q', fileobject.read(8))
+            bboxes = read_array('d', 4 * count)
+            ranges = read_array('q', 2 * count) if level else None
+            index._levels.append((bboxes, ranges))
+
+        features = list(doc.iter(*_FEATURE_TAGS))
+        if len(features) != feature_count:
+            raise ValueError('the spatial index was built for another document')
+        index._elements = [features[i] for i in index._ordinals]
+        return index
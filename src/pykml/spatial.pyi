@@ -0,0 +1,55 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.spatial
+#
+from array import array
+from typing import Any, BinaryIO, List, Sequence, Tuple, Union
+
+from lxml import etree
+
+KML_PLACEMARK: str = ...
+
+BBox = Tuple[float, float, float, float]
+
+
+def _feature_bboxes(doc: etree._Element) \
+        -> Tuple[List[etree._Element], array, List[BBox]]:
+    ...
+
+
+def _union(a: BBox, b: BBox) -> BBox:
+    ...
+
+
+def _str_order(bboxes: Sequence[BBox], capacity: int) -> List[int]:
+    ...
+
+
+def _min_distance2(x: float, y: float, bboxes: array, i: int) -> float:
+    ...
+
+
+class SpatialIndex:
+    node_capacity: int = ...
+
+    def __init__(self, doc: etree._Element, node_capacity: int = ...) -> None:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+    def intersection(self, bbox: BBox) -> List[etree._Element]:
+        ...
+
+    def nearest(self, longitude: float, latitude: float, k: int = ...) \
+            -> List[etree._Element]:
+        ...
+
+    def save(self, fileobject: Union[str, Any, BinaryIO]) -> None:
+        ...
+
+    @classmethod
+    def load(cls, fileobject: Union[str, Any, BinaryIO],
+             doc: etree._Element) -> 'SpatialIndex':
+        ...
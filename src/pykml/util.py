@@ -7,17 +7,30 @@
 The pykml.util module provides utility functions that operate on KML
 documents
 """
+import copy
 import csv
-import re
 import ssl
+import sys
+from collections import Counter
 from contextlib import contextmanager
 from optparse import OptionParser
+from types import SimpleNamespace
 from urllib.request import urlopen
 
 from lxml import etree
 
 from . import version as pykml_version
 from .factory import KML_ElementMaker as KML
+from .factory import nsmap
+from .geometry import GEOMETRY_CONTAINER_TAGS
+from .geometry import GEOMETRY_TAGS
+from .geometry import to_wkb
+from .geometry import to_wkt
+from .kmz import KmzFile
+from .kmz import is_kmz
+from .parser import iterparse
+
+KML_PLACEMARK = '{http://www.opengis.net/kml/2.2}Placemark'
 
 
 def clean_xml_string(input_string):
@@ -30,40 +43,267 @@ def format_xml_with_cdata(
         cdata_elements=('description',
                         'text',
                         'linkDescription',
-                        'displayName',)):
-    # Convert Objectify document to lxml.etree (is there a better way?)
-    root = etree.fromstring(etree.tostring(etree.ElementTree(obj)))
-
-    # Create an xpath expression to search for all desired cdata elements
-    xpath = '|'.join('//kml:' + tag for tag in cdata_elements)
+                        'displayName',),
+        inplace=False):
+    """Wraps the text of the given KML elements in CDATA sections
 
-    results = root.xpath(
-        xpath,
-        namespaces={'kml': 'http://www.opengis.net/kml/2.2'}
-    )
-    for element in results:
-        element.text = etree.CDATA(element.text)
-    return root
+    A modified copy of the document is returned, unless `inplace` is true,
+    in which case `obj` itself is modified and returned.
+    """
+    if not inplace:
+        obj = copy.deepcopy(obj)
+    tags = [f'{{{nsmap[None]}}}{tag}' for tag in cdata_elements]
+    for element in obj.iter(*tags):
+        if element.text is not None:
+            text = etree.CDATA(element.text)
+            try:
+                element._setText(text)
+            except AttributeError:
+                element.text = text
+    return obj
 
 
-def count_elements(doc):
-    """Counts the number of times each element is used in a document"""
+def write_xml_with_cdata(
+        obj,
+        output,
+        cdata_elements=('description',
+                        'text',
+                        'linkDescription',
+                        'displayName',),
+        encoding='utf-8',
+        xml_declaration=True):
+    """Writes a KML document, wrapping the text of the given elements in CDATA
+
+    The document is written to the binary stream `output` in a single pass
+    of the serializer.  While it is written, each of the given elements is
+    replaced by a copy with a CDATA section; the original elements are put
+    back afterwards, so that the document is left as it was, but it must
+    not be used by other threads in the meantime.
+    """
+    tags = [f'{{{nsmap[None]}}}{tag}' for tag in cdata_elements]
+    replaced = []
+    try:
+        elements = [element for element in obj.iter(*tags)
+                    if element.text is not None and element.getparent() is not None]
+        for element in elements:
+            replacement = etree.Element(element.tag, element.attrib)
+            replacement.text = etree.CDATA(element.text)
+            replacement.extend(copy.deepcopy(child) for child in element.iterchildren())
+            replacement.tail = element.tail
+            element.getparent().replace(element, replacement)
+            replaced.append((element, replacement))
+
+        with etree.xmlfile(output, encoding=encoding) as xf:
+            if xml_declaration:
+                xf.write_declaration()
+            xf.write(obj)
+    finally:
+        for element, replacement in replaced:
+            replacement.getparent().replace(replacement, element)
+
+
+def _split_tag(tag):
+    """Splits a '{namespace}name' tag into its namespace and name"""
+    if tag[:1] == '{':
+        namespace, _, name = tag[1:].partition('}')
+        return namespace, name
+    return None, tag
+
+
+def _group_by_namespace(values, split_tag):
+    """Converts a {tag: value} dict into {namespace: {name: value}}"""
     summary = {}
-    for el in doc.iter():
-        try:
-            namespace, element_name = re.search('^{(.+)}(.+)$', el.tag).groups()
-        except:
-            namespace = None
-            element_name = el.tag
-        if namespace not in summary:
-            summary[namespace] = {}
-        if element_name not in summary[namespace]:
-            summary[namespace][element_name] = 1
-        else:
-            summary[namespace][element_name] += 1
+    for tag, value in values.items():
+        namespace, name = split_tag(tag)
+        summary.setdefault(namespace, {})[name] = value
     return summary
 
 
+class ElementStatistics:
+    """Collects statistics about the elements of KML documents
+
+    Elements are counted per namespace and name.  If requested, the same
+    pass also sums the UTF-8 length of the text of the elements
+    (`text_bytes`), counts their attributes (`attributes`) and builds a
+    histogram of their depth in the document, the root being at depth 0
+    (`depths`).  Comments and processing instructions are not counted.
+    """
+
+    def __init__(self, text_bytes=False, attributes=False, depths=False):
+        self.collect_text_bytes = text_bytes
+        self.collect_attributes = attributes
+        self.collect_depths = depths
+        self._counts = {}
+        self._text_bytes = {}
+        self._attributes = {}
+        self.depth_histogram = {}
+        # the depth of the last element started by add_events
+        self._depth = -1
+        self._split_cache = {}
+
+    @property
+    def events(self):
+        """The iterparse events that `add_events` expects"""
+        return ('start', 'end') if self.collect_depths else ('end',)
+
+    def add_events(self, events, clear=False):
+        """Adds the elements of a sequence of (event, element) pairs
+
+        `events` is produced by `lxml.etree.iterparse` or
+        `lxml.etree.iterwalk` with the events given by `self.events`.  If
+        `clear` is True each element is cleared and removed from its parent
+        once counted, so that a parsed document never stays in memory.  The
+        events of a document may be added in several calls.
+        """
+        counts = self._counts
+        text_bytes = self._text_bytes if self.collect_text_bytes else None
+        attributes = self._attributes if self.collect_attributes else None
+        histogram = self.depth_histogram if self.collect_depths else None
+
+        depth = self._depth
+        try:
+            for event, el in events:
+                if event == 'start':
+                    depth += 1
+                    continue
+
+                tag = el.tag
+                counts[tag] = counts.get(tag, 0) + 1
+                if histogram is not None:
+                    histogram[depth] = histogram.get(depth, 0) + 1
+                    depth -= 1
+                if text_bytes is not None:
+                    text = el.text
+                    if text:
+                        text_bytes[tag] = (text_bytes.get(tag, 0) +
+                                           len(text.encode('utf-8')))
+                if attributes is not None:
+                    attributes[tag] = attributes.get(tag, 0) + len(el.attrib)
+
+                if clear:
+                    el.clear(keep_tail=True)
+                    parent = el.getparent()
+                    if parent is not None:
+                        while el.getprevious() is not None:
+                            del parent[0]
+        finally:
+            self._depth = depth
+
+    def add_document(self, doc):
+        """Adds the elements of a parsed document or element"""
+        if hasattr(doc, 'getroot'):
+            doc = doc.getroot()
+        if not (self.collect_text_bytes or self.collect_attributes or
+                self.collect_depths):
+            # counting only, without the per-element loop of add_events
+            counts = self._counts
+            for tag, count in Counter(
+                    el.tag for el in doc.iter(etree.Element)).items():
+                counts[tag] = counts.get(tag, 0) + count
+            return
+        self.add_events(etree.iterwalk(doc, events=self.events,
+                                       tag=etree.Element))
+
+    def add_file(self, source):
+        """Adds the elements of a KML or KMZ file, without loading it
+
+        `source` is a file name or binary file object.  The file is parsed
+        with a parser target, so no element tree is built at all.
+        """
+        if is_kmz(source):
+            with KmzFile(source) as archive, \
+                    archive.open(archive.kml_name) as f:
+                return self.add_file(f)
+        etree.parse(source, etree.XMLParser(target=self._parser_target()))
+
+    def _parser_target(self):
+        """Returns a parser target with only the callbacks that are needed"""
+        counts = self._counts
+        text_bytes = self._text_bytes
+        attributes = self._attributes
+        histogram = self.depth_histogram
+        depth = -1
+        text_tag = None
+
+        def count(tag, attrib):
+            counts[tag] = counts.get(tag, 0) + 1
+
+        def start(tag, attrib):
+            nonlocal depth, text_tag
+            counts[tag] = counts.get(tag, 0) + 1
+            if self.collect_attributes:
+                attributes[tag] = attributes.get(tag, 0) + len(attrib)
+            if self.collect_depths:
+                depth += 1
+                histogram[depth] = histogram.get(depth, 0) + 1
+            text_tag = tag
+
+        def end(tag):
+            nonlocal depth, text_tag
+            depth -= 1
+            text_tag = None
+
+        def data(text):
+            # text after the end of a child is the tail of that child
+            if text_tag is not None:
+                text_bytes[text_tag] = (text_bytes.get(text_tag, 0) +
+                                        len(text.encode('utf-8')))
+
+        target = SimpleNamespace(close=lambda: None)
+        if not (self.collect_text_bytes or self.collect_attributes or
+                self.collect_depths):
+            target.start = count
+            return target
+        target.start = start
+        target.end = end
+        if self.collect_text_bytes:
+            target.data = data
+        return target
+
+    def _split(self, tag):
+        try:
+            return self._split_cache[tag]
+        except KeyError:
+            result = self._split_cache[tag] = _split_tag(tag)
+            return result
+
+    def counts(self):
+        """Returns the number of elements as {namespace: {name: count}}"""
+        return _group_by_namespace(self._counts, self._split)
+
+    def text_bytes(self):
+        """Returns the text size of elements as {namespace: {name: bytes}}"""
+        return _group_by_namespace(self._text_bytes, self._split)
+
+    def attribute_counts(self):
+        """Returns the number of attributes as {namespace: {name: count}}"""
+        return _group_by_namespace(self._attributes, self._split)
+
+
+def element_statistics(source, text_bytes=False, attributes=False,
+                       depths=False):
+    """Collects statistics about the elements of a KML document
+
+    `source` is a parsed document or element, or a file name or binary file
+    object that is read incrementally.  Returns an ElementStatistics object.
+    """
+    statistics = ElementStatistics(text_bytes, attributes, depths)
+    if hasattr(source, 'iter') or hasattr(source, 'getroot'):
+        statistics.add_document(source)
+    else:
+        statistics.add_file(source)
+    return statistics
+
+
+def count_elements(doc):
+    """Counts the number of times each element is used in a document
+
+    `doc` is a parsed document or element, or a file name or binary file
+    object that is read incrementally.  Returns {namespace: {name: count}}.
+    """
+    return element_statistics(doc).counts()
+
+
 def wrap_angle180(angle):
     # returns an angle such that -180 < angle <= 180
     try:
@@ -73,37 +313,49 @@ def wrap_angle180(angle):
         return ((angle + 180) % 360) - 180
 
 
+def iter_geometries(source):
+    """Yields the geometries of a KML document that are not part of another
+    geometry
+
+    `source` is a parsed document or element, or a KML or KMZ file name or
+    binary file object, which is then read incrementally with
+    `pykml.parser.iterparse`; each geometry is only valid until the next one
+    is requested.  Rings of polygons and members of MultiGeometry elements
+    are yielded as part of their geometry.
+    """
+    if hasattr(source, 'iter'):
+        for el in source.iter(*GEOMETRY_TAGS):
+            if next(el.iterancestors(*GEOMETRY_CONTAINER_TAGS), None) is None:
+                yield el
+        return
+
+    # Placemarks are matched too, so that they are freed once parsed
+    for el in iterparse(source, tag=(KML_PLACEMARK,) + GEOMETRY_TAGS):
+        if (el.tag != KML_PLACEMARK and
+                next(el.iterancestors(*GEOMETRY_CONTAINER_TAGS), None) is None):
+            yield el
+
+
+def iter_wkt(source):
+    """Yields the geometries of a KML document as Well Known Text
+
+    See `iter_geometries` and `pykml.geometry.to_wkt`.
+    """
+    return map(to_wkt, iter_geometries(source))
+
+
+def iter_wkb(source, altitude=None):
+    """Yields the geometries of a KML document as Well Known Binary
+
+    See `iter_geometries` and `pykml.geometry.to_wkb`.
+    """
+    for el in iter_geometries(source):
+        yield to_wkb(el, altitude=altitude)
+
+
 def to_wkt_list(doc):
     """converts all geometries to Well Known Text format"""
-
-    def ring_coords_to_wkt(ring):
-        """converts LinearRing coordinates to WKT style coordinates"""
-        return ((ring.coordinates.text.strip())
-                .replace(' ', '@@')
-                .replace(',', ' ')
-                .replace('@@', ', '))
-
-    ring_wkt_list = []
-    context = etree.iterwalk(doc, events=('start',))
-    for action, elem in context:
-        if elem.tag in ['{http://www.opengis.net/kml/2.2}Polygon',
-                        '{http://www.opengis.net/kml/2.2}MultiPolygon']:
-            # print(f'{action}: {elem.tag}')
-            if elem.tag == '{http://www.opengis.net/kml/2.2}Polygon':
-
-                # outer boundary
-                outer_text = ring_coords_to_wkt(elem.outerBoundaryIs.LinearRing)
-                ringlist = [
-                    f'({outer_text})'
-                ]
-                for obj in elem.findall('{http://www.opengis.net/kml/2.2}innerBoundaryIs'):
-                    inner_text = ring_coords_to_wkt(obj.LinearRing)
-                    ringlist.append(f'({inner_text})')
-
-                rings = ', '.join(ringlist)
-                wkt = f'POLYGON ({rings})'
-                ring_wkt_list.append(wkt)
-    return ring_wkt_list
+    return list(iter_wkt(doc))
 
 
 @contextmanager
@@ -125,6 +377,79 @@ def open_pykml_uri(uri, mode='rt'):
     f.close()
 
 
+# alternative (lower case) names of the CSV columns used for each field
+_CSV_FIELD_ALTERNATIVES = {
+    'latitude_field': ('latitude', 'lat'),
+    'longitude_field': ('longitude', 'lon', 'long'),
+    'altitude_field': ('altitude', 'alt'),
+    'name_field': ('name',),
+    'snippet_field': ('snippet',),
+    'description_field': ('description', 'desc'),
+}
+
+
+def _match_csv_fields(fieldnames, **fields):
+    """Matches the requested CSV columns against the CSV column names
+
+    If a field is not found, other common names for it are looked up
+    ignoring case.  Raises KeyError if the latitude and longitude columns
+    cannot be found.
+    """
+    lower_fieldnames = [s.lower() for s in fieldnames]
+    for field, field_name in fields.items():
+        if field_name not in fieldnames:
+            for name in _CSV_FIELD_ALTERNATIVES[field]:
+                if name in lower_fieldnames:
+                    fields[field] = fieldnames[lower_fieldnames.index(name)]
+                    break
+
+    # check that latitude and longitude columns can be found
+    if fields['latitude_field'] not in fieldnames:
+        raise KeyError(
+            f'Latitude field ({fields["latitude_field"]}) was not found '
+            f'in the CSV file column names {fieldnames}'
+        )
+    if fields['longitude_field'] not in fieldnames:
+        raise KeyError(
+            f'Longitude field ({fields["longitude_field"]}) was not found '
+            f'in the CSV file column names {fieldnames}'
+        )
+    return fields
+
+
+def _csv_row_to_placemark_items(
+        row,
+        fieldnames,
+        latitude_field,
+        longitude_field,
+        altitude_field,
+        name_field,
+        description_field,
+        snippet_field,
+):
+    """Returns the (tag, text, attributes) child items and the coordinates
+    of the Placemark for a CSV row"""
+    items = []
+    if name_field in row:
+        items.append(('name', clean_xml_string(row[name_field]), {}))
+    if snippet_field in row:
+        items.append(('Snippet', clean_xml_string(row[snippet_field]), {'maxLines': '2'}))
+    if description_field in row:
+        items.append(('description', clean_xml_string(row[description_field]), {}))
+    else:
+        desc = '<table border="1"'
+        # iterate through the cells in 'row' filling table
+        for field_name in fieldnames:
+            desc += f'<tr><th>{field_name}</th><td>{row[field_name]}</td></tr>'
+        desc += '</table>'
+        items.append(('description', clean_xml_string(desc), {}))
+
+    coord_list = [row[longitude_field], row[latitude_field]]
+    if altitude_field in row:
+        coord_list += [row[altitude_field]]
+    return items, ','.join(coord_list)
+
+
 def convert_csv_to_kml(
         fileobject,
         latitude_field='latitude',
@@ -144,114 +469,92 @@ def convert_csv_to_kml(
     )
 
     csvdoc = csv.DictReader(fileobject)
+    fields = _match_csv_fields(
+        csvdoc.fieldnames,
+        latitude_field=latitude_field,
+        longitude_field=longitude_field,
+        altitude_field=altitude_field,
+        name_field=name_field,
+        description_field=description_field,
+        snippet_field=snippet_field,
+    )
 
-    # if field is not found, check for other common field names
-    if latitude_field not in csvdoc.fieldnames:
-        match_field = None
-        for name in ['latitude', 'lat']:
-            try:
-                match_field = csvdoc.fieldnames[[s.lower() for s in csvdoc.fieldnames].index(name)]
-                break
-            except:
-                pass
-        if match_field is not None:
-            latitude_field = match_field
-    if longitude_field not in csvdoc.fieldnames:
-        match_field = None
-        for name in ['longitude', 'lon', 'long']:
-            try:
-                match_field = csvdoc.fieldnames[[s.lower() for s in csvdoc.fieldnames].index(name)]
-                break
-            except:
-                pass
-        if match_field is not None:
-            longitude_field = match_field
-    if altitude_field not in csvdoc.fieldnames:
-        match_field = None
-        for name in ['altitude', 'alt']:
-            try:
-                match_field = csvdoc.fieldnames[[s.lower() for s in csvdoc.fieldnames].index(name)]
-                break
-            except:
-                pass
-        if match_field is not None:
-            altitude_field = match_field
-    if name_field not in csvdoc.fieldnames:
-        match_field = None
-        for name in ['name']:
-            try:
-                match_field = csvdoc.fieldnames[[s.lower() for s in csvdoc.fieldnames].index(name)]
-                break
-            except:
-                pass
-        if match_field is not None:
-            name_field = match_field
-    if snippet_field not in csvdoc.fieldnames:
-        match_field = None
-        for name in ['snippet']:
-            try:
-                match_field = csvdoc.fieldnames[[s.lower() for s in csvdoc.fieldnames].index(name)]
-                break
-            except:
-                pass
-        if match_field is not None:
-            snippet_field = match_field
-    if description_field not in csvdoc.fieldnames:
-        match_field = None
-        for name in ['description', 'desc']:
-            try:
-                match_field = csvdoc.fieldnames[[s.lower() for s in csvdoc.fieldnames].index(name)]
-                break
-            except:
-                pass
-        if match_field is not None:
-            description_field = match_field
-
-    # check that latitude and longitude columns can be found
-    if latitude_field not in csvdoc.fieldnames:
-        raise KeyError(
-            f'Latitude field ({latitude_field}) was not found '
-            f'in the CSV file column names {csvdoc.fieldnames}'
-        )
-    if longitude_field not in csvdoc.fieldnames:
-        raise KeyError(
-            f'Longitude field ({longitude_field}) was not found '
-            f'in the CSV file column names {csvdoc.fieldnames}'
-        )
     for row in csvdoc:
+        items, coordinates = _csv_row_to_placemark_items(
+            row, csvdoc.fieldnames, **fields)
         pm = KML.Placemark()
-        if name_field in row:
-            pm.append(
-                KML.name(clean_xml_string(row[name_field]))
-            )
-        if snippet_field in row:
-            pm.append(
-                KML.Snippet(clean_xml_string(row[snippet_field]), maxLines="2")
-            )
-        if description_field in row:
-            pm.append(
-                KML.description(clean_xml_string(row[description_field]))
-            )
-        else:
-            desc = '<table border="1"'
-            # iterate through the cells in 'row' filling table
-            for field_name in csvdoc.fieldnames:
-                desc += f'<tr><th>{field_name}</th><td>{row[field_name]}</td></tr>'
-            desc += '</table>'
-            pm.append(KML.description(clean_xml_string(desc)))
-
-        coord_list = [row[longitude_field], row[latitude_field]]
-        if altitude_field in row:
-            coord_list += [row[altitude_field]]
+        for tag, text, attrib in items:
+            pm.append(getattr(KML, tag)(text, **attrib))
         pm.append(
             KML.Point(
-                KML.coordinates(','.join(coord_list))
+                KML.coordinates(coordinates)
             )
         )
         kmldoc.Document.Folder.append(pm)
     return kmldoc
 
 
+def write_csv_to_kml(
+        fileobject,
+        output,
+        latitude_field='latitude',
+        longitude_field='longitude',
+        altitude_field='altitude',
+        name_field='name',
+        description_field='description',
+        snippet_field='snippet',
+        cdata_elements=('description',
+                        'text',
+                        'linkDescription',
+                        'displayName',),
+        encoding='utf-8',
+):
+    """Reads a CSV document from a file-like object and writes it as KML
+
+    This function produces the same document as `convert_csv_to_kml`
+    followed by `format_xml_with_cdata`, but writes it incrementally to the
+    binary stream `output`: the KML header is written first, then one
+    Placemark per CSV row, so memory use does not depend on the number of
+    rows.
+    """
+    kml = '{%s}%%s' % nsmap[None]
+
+    csvdoc = csv.DictReader(fileobject)
+    fields = _match_csv_fields(
+        csvdoc.fieldnames,
+        latitude_field=latitude_field,
+        longitude_field=longitude_field,
+        altitude_field=altitude_field,
+        name_field=name_field,
+        description_field=description_field,
+        snippet_field=snippet_field,
+    )
+
+    with etree.xmlfile(output, encoding=encoding) as xf:
+        xf.write_declaration()
+        with xf.element(kml % 'kml', nsmap=nsmap), \
+                xf.element(kml % 'Document'), \
+                xf.element(kml % 'Folder'):
+            with xf.element(kml % 'name'):
+                xf.write('KmlFile')
+            xf.write('\n')
+
+            for row in csvdoc:
+                items, coordinates = _csv_row_to_placemark_items(
+                    row, csvdoc.fieldnames, **fields)
+                with xf.element(kml % 'Placemark'):
+                    for tag, text, attrib in items:
+                        with xf.element(kml % tag, attrib):
+                            if tag in cdata_elements:
+                                xf.write(etree.CDATA(text))
+                            else:
+                                xf.write(text)
+                    with xf.element(kml % 'Point'), \
+                            xf.element(kml % 'coordinates'):
+                        xf.write(coordinates)
+                xf.write('\n')
+
+
 def csv2kml():
     """Parse a CSV file and generates a KML document
 
@@ -273,12 +576,31 @@ def csv2kml():
                       help='name of the column used for the placemark description')
     parser.add_option('--snippet_field', dest='snippet_field',
                       help='name of the column used for the placemark snippet text')
+    parser.add_option('--stream', dest='stream', action='store_true', default=False,
+                      help='write each placemark as soon as it is read, '
+                           'without building the document in memory')
     (options, args) = parser.parse_args()
     if len(args) != 1:
         parser.error('wrong number of arguments')
     else:
         uri = args[0]
 
+    if options.stream:
+        with open_pykml_uri(uri) as f:
+            write_csv_to_kml(
+                f,
+                sys.stdout.buffer,
+                latitude_field=options.latitude_field,
+                longitude_field=options.longitude_field,
+                altitude_field=options.altitude_field,
+                name_field=options.name_field,
+                description_field=options.description_field,
+                snippet_field=options.snippet_field,
+                encoding='ascii',
+            )
+        sys.stdout.buffer.write(b'\n')
+        return
+
     # try to open the URI as both a local file and a remote URL
     with open_pykml_uri(uri) as f:
         kmldoc = convert_csv_to_kml(
@@ -291,7 +613,7 @@ def csv2kml():
             snippet_field=options.snippet_field,
         )
 
-    root = format_xml_with_cdata(kmldoc)
+    root = format_xml_with_cdata(kmldoc, inplace=True)
 
     print(etree.tostring(root,
                          encoding='ascii',
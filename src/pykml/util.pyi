@@ -4,24 +4,93 @@
 # Stub file for pyxml.util
 #
 from contextlib import contextmanager
-from typing import Sequence, List, Any, Optional, Dict, TypeVar, Iterable
+from typing import Sequence, List, Any, Optional, Dict, TypeVar, Iterable, \
+    BinaryIO, Tuple, Callable, Union, Iterator
 
 from lxml import etree
 
 from .factory import KML_ElementMaker as KML
 
+KML_PLACEMARK: str = ...
+
 
 def clean_xml_string(input_string: str) -> str:
     ...
 
 
 def format_xml_with_cdata(obj: etree._Element,
-                          cdata_elements: Iterable[str] = ...) \
+                          cdata_elements: Iterable[str] = ...,
+                          inplace: bool = ...) \
         -> etree._Element:
     ...
 
 
-def count_elements(doc: etree.XMLParser) \
+def write_xml_with_cdata(obj: etree._Element,
+                         output: BinaryIO,
+                         cdata_elements: Iterable[str] = ...,
+                         encoding: str = ...,
+                         xml_declaration: bool = ...) \
+        -> None:
+    ...
+
+
+def _split_tag(tag: str) -> Tuple[Optional[str], str]:
+    ...
+
+
+def _group_by_namespace(values: Dict[str, int],
+                        split_tag: Callable[[str], Tuple[Optional[str], str]]) \
+        -> Dict[Optional[str], Dict[str, int]]:
+    ...
+
+
+class ElementStatistics:
+    collect_text_bytes: bool = ...
+    collect_attributes: bool = ...
+    collect_depths: bool = ...
+    depth_histogram: Dict[int, int] = ...
+
+    def __init__(self, text_bytes: bool = ..., attributes: bool = ...,
+                 depths: bool = ...) -> None:
+        ...
+
+    @property
+    def events(self) -> Tuple[str, ...]:
+        ...
+
+    def add_events(self, events: Iterable[Tuple[str, etree._Element]],
+                   clear: bool = ...) -> None:
+        ...
+
+    def add_document(self, doc: Union[etree._Element, etree._ElementTree]) \
+            -> None:
+        ...
+
+    def add_file(self, source: Union[str, BinaryIO]) -> None:
+        ...
+
+    def _parser_target(self) -> Any:
+        ...
+
+    def counts(self) -> Dict[Optional[str], Dict[str, int]]:
+        ...
+
+    def text_bytes(self) -> Dict[Optional[str], Dict[str, int]]:
+        ...
+
+    def attribute_counts(self) -> Dict[Optional[str], Dict[str, int]]:
+        ...
+
+
+def element_statistics(source: Union[etree._Element, etree._ElementTree,
+                                     str, BinaryIO],
+                       text_bytes: bool = ..., attributes: bool = ...,
+                       depths: bool = ...) -> ElementStatistics:
+    ...
+
+
+def count_elements(doc: Union[etree._Element, etree._ElementTree,
+                              str, BinaryIO]) \
         -> Dict[Optional[str], Dict[str, int]]:
     ...
 
@@ -33,6 +102,25 @@ def wrap_angle180(angle: Angle) -> Angle:
     ...
 
 
+def iter_geometries(source: Union[etree._Element, etree._ElementTree,
+                                  str, BinaryIO]) \
+        -> Iterator[etree._Element]:
+    ...
+
+
+def iter_wkt(source: Union[etree._Element, etree._ElementTree,
+                           str, BinaryIO]) \
+        -> Iterator[str]:
+    ...
+
+
+def iter_wkb(source: Union[etree._Element, etree._ElementTree,
+                           str, BinaryIO],
+             altitude: Optional[bool] = ...) \
+        -> Iterator[bytes]:
+    ...
+
+
 def to_wkt_list(doc: etree.XMLParser) \
         -> List[str]:
     ...
@@ -43,6 +131,25 @@ def open_pykml_uri(uri: str, mode: str = ...) -> None:
     ...
 
 
+def _match_csv_fields(fieldnames: Sequence[str],
+                      **fields: Optional[str]) \
+        -> Dict[str, Optional[str]]:
+    ...
+
+
+def _csv_row_to_placemark_items(
+        row: Dict[str, str],
+        fieldnames: Sequence[str],
+        latitude_field: str,
+        longitude_field: str,
+        altitude_field: Optional[str],
+        name_field: Optional[str],
+        description_field: Optional[str],
+        snippet_field: Optional[str],
+) -> Tuple[List[Tuple[str, str, Dict[str, str]]], str]:
+    ...
+
+
 # TODO: fileobject
 def convert_csv_to_kml(
         fileobject: Any,
@@ -56,5 +163,21 @@ def convert_csv_to_kml(
     ...
 
 
+# TODO: fileobject
+def write_csv_to_kml(
+        fileobject: Any,
+        output: BinaryIO,
+        latitude_field: str = ...,
+        longitude_field: str = ...,
+        altitude_field: str = ...,
+        name_field: str = ...,
+        description_field: str = ...,
+        snippet_field: str = ...,
+        cdata_elements: Iterable[str] = ...,
+        encoding: str = ...,
+) -> None:
+    ...
+
+
 def csv2kml() -> None:
     ...
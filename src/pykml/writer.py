@@ -0,0 +1,407 @@
+#
+# coding: utf-8
+#
+# pykml.writer
+#
+"""
+The pykml.writer module provides a writer that serializes KML documents
+directly to a binary stream, a gzip file or a KMZ archive, without building
+an element tree.  The markup is assembled as text and encoded in large
+blocks, which is several times faster than creating the elements with
+`pykml.factory.KML_ElementMaker` and serializing them.
+
+Containers (kml, Document, Folder, Placemark, MultiGeometry) are context
+managers, and the elements they contain are written by calling typed
+methods::
+
+    with KmlWriter('export.kmz', pretty_print=True) as writer:
+        with writer.document(name='Export'):
+            writer.style('red', line_color='ff0000ff', line_width=2)
+            with writer.placemark(name='A', style_url='#red'):
+                writer.point((-122.1, 37.2))
+"""
+import gzip
+from array import array
+from contextlib import ExitStack
+
+from lxml import etree
+
+from .factory import _ROOT_NAMESPACES
+from .factory import _escape_xml
+from .factory import nsmap
+from .geometry import format_coordinates
+from .kmz import KmzFile
+
+GX = '{%s}%%s' % nsmap['gx']
+
+# elements whose text is written as CDATA by default, as in
+# pykml.util.format_xml_with_cdata
+DEFAULT_CDATA_ELEMENTS = ('description', 'text', 'linkDescription', 'displayName')
+
+# namespace prefixes
+_PREFIXES = {uri: prefix for prefix, uri in nsmap.items()}
+# number of pending text parts that triggers writing to the output
+_FLUSH_PARTS = 4096
+
+
+def _format_value(value):
+    """Formats a Python value as KML text"""
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return str(value)
+
+
+def _cdata(text):
+    """Returns a CDATA section, split where the text contains ']]>'"""
+    return '<![CDATA[' + text.replace(']]>', ']]]]><![CDATA[>') + ']]>'
+
+
+def _qualified_name(tag):
+    """Returns the prefixed name of a KML name or '{namespace}name' tag"""
+    if tag[0] != '{':
+        return tag
+    namespace, _, name = tag[1:].partition('}')
+    try:
+        prefix = _PREFIXES[namespace]
+    except KeyError:
+        raise ValueError(f'namespace {namespace} is not declared') from None
+    return name if prefix is None else f'{prefix}:{name}'
+
+
+def _coordinates_text(coords):
+    """Formats coordinates given as text, a (longitude, latitude[, altitude])
+    tuple, a sequence of such tuples, or a packed array of triples"""
+    if isinstance(coords, str):
+        return coords
+    if isinstance(coords, array) or hasattr(coords, 'ndim'):
+        return format_coordinates(coords)
+    if coords and not isinstance(coords[0], (tuple, list)):
+        return ','.join(map(str, coords))
+    return ' '.join([','.join(map(str, t)) for t in coords])
+
+
+class KmlWriter:
+    """Writes a KML document incrementally
+
+    `output` is a file name or binary file object.  With `compression`
+    'gzip' the document is gzip compressed, and with 'kmz' it is written as
+    the doc.kml member of a KMZ archive; by default file names ending in
+    '.gz' or '.kmz' select the compression.  `compresslevel` applies to
+    both.  The text of the KML elements named in `cdata_elements` is
+    written in CDATA sections.  The kml root element, with the namespaces
+    of `pykml.factory.nsmap`, is opened when entering the writer.
+    """
+
+    def __init__(self, output, encoding='utf-8', pretty_print=False,
+                 cdata_elements=DEFAULT_CDATA_ELEMENTS, compression=None,
+                 compresslevel=None):
+        if compression is None and isinstance(output, str):
+            if output.lower().endswith('.kmz'):
+                compression = 'kmz'
+            elif output.lower().endswith('.gz'):
+                compression = 'gzip'
+        if compression not in (None, 'gzip', 'kmz'):
+            raise ValueError(f'unsupported compression: {compression}')
+
+        self.output = output
+        self.encoding = encoding
+        self.pretty_print = pretty_print
+        self.cdata_elements = frozenset(cdata_elements)
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self._stack = None
+        self._sink = None
+        self._root = None
+        self._parts = []
+        self._write = self._parts.append
+        self._depth = 0
+        self._names = {}
+
+    def __enter__(self):
+        stack = ExitStack()
+        try:
+            self._sink = self._open_sink(stack)
+        except BaseException:
+            stack.close()
+            raise
+        self._stack = stack
+        self._write(f"<?xml version='1.0' encoding='{self.encoding}'?>\n")
+        self._root = _OpenElement(self, 'kml', _ROOT_NAMESPACES)
+        self._root.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stack, self._stack = self._stack, None
+        with stack:
+            if exc_type is None:
+                self._root.__exit__(None, None, None)
+                self._flush()
+
+    def _open_sink(self, stack):
+        """Opens the binary stream that the XML is written to"""
+        output = self.output
+        if self.compression == 'kmz':
+            kmz = stack.enter_context(
+                KmzFile(output, 'w', compresslevel=self.compresslevel))
+            return stack.enter_context(kmz.open('doc.kml', 'w'))
+
+        if isinstance(output, str):
+            if self.compression == 'gzip':
+                return stack.enter_context(gzip.open(
+                    output, 'wb', compresslevel=_gzip_level(self.compresslevel)))
+            return stack.enter_context(open(output, 'wb'))
+        if self.compression == 'gzip':
+            return stack.enter_context(gzip.GzipFile(
+                fileobj=output, mode='wb',
+                compresslevel=_gzip_level(self.compresslevel)))
+        return output
+
+    # low level writing
+
+    def _flush(self):
+        """Encodes the pending text and writes it to the output"""
+        if self._parts:
+            self._sink.write(
+                ''.join(self._parts).encode(self.encoding, 'xmlcharrefreplace'))
+            self._parts.clear()
+
+    def _name(self, tag):
+        try:
+            return self._names[tag]
+        except KeyError:
+            name = self._names[tag] = _qualified_name(tag)
+            return name
+
+    def _container(self, tag, attrib=None, content=None):
+        """Returns an element that is opened when entering its context and
+        closed when leaving it
+
+        `content` is a function writing the first children of the element,
+        called after its start tag.
+        """
+        return _OpenElement(self, self._name(tag), _format_attributes(attrib), content)
+
+    def element(self, tag, text=None, attrib=None):
+        """Writes an element with text and attributes
+
+        `tag` is the name of a KML element, or a qualified
+        '{namespace}name'.  Nothing is written if both `text` and `attrib`
+        are None.  Text is escaped, but not checked for characters that XML
+        does not allow.
+        """
+        if text is None and attrib is None:
+            return
+        name = self._name(tag)
+        start = name + _format_attributes(attrib) if attrib else name
+        indent = '  ' * self._depth if self.pretty_print else ''
+        newline = '\n' if self.pretty_print else ''
+        if text is None:
+            self._write(f'{indent}<{start}/>{newline}')
+            return
+        if text.__class__ is not str:
+            text = _format_value(text)
+        text = _cdata(text) if name in self.cdata_elements else _escape_xml(text)
+        self._write(f'{indent}<{start}>{text}</{name}>{newline}')
+
+    def write(self, el):
+        """Writes an existing element, such as one built with
+        `pykml.factory.KML_ElementMaker`
+
+        The element is serialized with lxml, so it declares the namespaces
+        it uses again.
+        """
+        if self.pretty_print:
+            self._write('  ' * self._depth)
+        self._write(etree.tostring(el, encoding=str, with_tail=False,
+                                   pretty_print=self.pretty_print))
+
+    def _feature_fields(self, name, visibility, open_, snippet, description):
+        self.element('name', name)
+        self.element('visibility', visibility)
+        self.element('open', open_)
+        self.element('Snippet', snippet)
+        self.element('description', description)
+
+    # containers
+
+    def document(self, name=None, id=None, visibility=None, open=None,
+                 snippet=None, description=None):
+        """Opens a Document element; use it as a context manager"""
+        return self._container('Document', {'id': id}, lambda: self._feature_fields(
+            name, visibility, open, snippet, description))
+
+    def folder(self, name=None, id=None, visibility=None, open=None,
+               snippet=None, description=None):
+        """Opens a Folder element; use it as a context manager"""
+        return self._container('Folder', {'id': id}, lambda: self._feature_fields(
+            name, visibility, open, snippet, description))
+
+    def placemark(self, name=None, id=None, visibility=None, snippet=None,
+                  description=None, style_url=None, extended_data=None):
+        """Opens a Placemark element; use it as a context manager
+
+        `extended_data` is a dict of ExtendedData names and values.  The
+        geometry of the Placemark is written inside the context.
+        """
+        def content():
+            self._feature_fields(name, visibility, None, snippet, description)
+            self.element('styleUrl', style_url)
+            if extended_data:
+                with self._container('ExtendedData'):
+                    for key, value in extended_data.items():
+                        with self._container('Data', {'name': key}):
+                            self.element('value', '' if value is None else value)
+
+        return self._container('Placemark', {'id': id}, content)
+
+    def multi_geometry(self, id=None):
+        """Opens a MultiGeometry element; use it as a context manager"""
+        return self._container('MultiGeometry', {'id': id})
+
+    # styles
+
+    def style(self, id=None, icon_href=None, icon_scale=None, icon_color=None,
+              label_color=None, label_scale=None, line_color=None,
+              line_width=None, poly_color=None, poly_fill=None,
+              poly_outline=None, balloon_text=None):
+        """Writes a Style element
+
+        Colors are KML 'aabbggrr' hexadecimal strings.  Sub-styles are only
+        written if any of their values is given.
+        """
+        with self._container('Style', {'id': id}):
+            if (icon_href, icon_scale, icon_color) != (None, None, None):
+                with self._container('IconStyle'):
+                    self.element('color', icon_color)
+                    self.element('scale', icon_scale)
+                    if icon_href is not None:
+                        with self._container('Icon'):
+                            self.element('href', icon_href)
+            if (label_color, label_scale) != (None, None):
+                with self._container('LabelStyle'):
+                    self.element('color', label_color)
+                    self.element('scale', label_scale)
+            if (line_color, line_width) != (None, None):
+                with self._container('LineStyle'):
+                    self.element('color', line_color)
+                    self.element('width', line_width)
+            if (poly_color, poly_fill, poly_outline) != (None, None, None):
+                with self._container('PolyStyle'):
+                    self.element('color', poly_color)
+                    self.element('fill', poly_fill)
+                    self.element('outline', poly_outline)
+            if balloon_text is not None:
+                with self._container('BalloonStyle'):
+                    self.element('text', balloon_text)
+
+    # geometries
+
+    def point(self, coords, extrude=None, altitude_mode=None, id=None):
+        """Writes a Point element
+
+        Coordinates are given as text, a (longitude, latitude[, altitude])
+        tuple, a sequence of such tuples or a packed array of triples, as
+        returned by `pykml.geometry.coords_array`.
+        """
+        with self._container('Point', {'id': id}):
+            self.element('extrude', extrude)
+            self.element('altitudeMode', altitude_mode)
+            self.element('coordinates', _coordinates_text(coords))
+
+    def line_string(self, coords, extrude=None, tessellate=None,
+                    altitude_mode=None, id=None):
+        """Writes a LineString element; see `point` for the coordinates"""
+        with self._container('LineString', {'id': id}):
+            self.element('extrude', extrude)
+            self.element('tessellate', tessellate)
+            self.element('altitudeMode', altitude_mode)
+            self.element('coordinates', _coordinates_text(coords))
+
+    def linear_ring(self, coords, extrude=None, tessellate=None,
+                    altitude_mode=None, id=None):
+        """Writes a LinearRing element; see `point` for the coordinates"""
+        with self._container('LinearRing', {'id': id}):
+            self.element('extrude', extrude)
+            self.element('tessellate', tessellate)
+            self.element('altitudeMode', altitude_mode)
+            self.element('coordinates', _coordinates_text(coords))
+
+    def polygon(self, outer, inner=(), extrude=None, tessellate=None,
+                altitude_mode=None, id=None):
+        """Writes a Polygon element from the coordinates of its outer ring
+        and of any inner rings"""
+        with self._container('Polygon', {'id': id}):
+            self.element('extrude', extrude)
+            self.element('tessellate', tessellate)
+            self.element('altitudeMode', altitude_mode)
+            with self._container('outerBoundaryIs'):
+                self.linear_ring(outer)
+            for ring in inner:
+                with self._container('innerBoundaryIs'):
+                    self.linear_ring(ring)
+
+    def track(self, whens, coords, altitude_mode=None, id=None):
+        """Writes a gx:Track element from its time stamps and coordinates
+
+        `coords` is a sequence of (longitude, latitude, altitude) tuples or
+        a packed array of triples.
+        """
+        if isinstance(coords, array) or hasattr(coords, 'ndim'):
+            coords = format_coordinates(coords).split()
+            coords = [c.replace(',', ' ') for c in coords]
+        else:
+            coords = [' '.join(map(str, c)) for c in coords]
+        with self._container(GX % 'Track', {'id': id}):
+            self.element('altitudeMode', altitude_mode)
+            for when in whens:
+                self.element('when', when)
+            for coord in coords:
+                self.element(GX % 'coord', coord)
+
+
+class _OpenElement:
+    """An element of a KmlWriter, opened when entering its context and
+    closed when leaving it"""
+
+    def __init__(self, writer, name, attributes, content=None):
+        self._writer = writer
+        self._name = name
+        self._attributes = attributes
+        self._content = content
+
+    def __enter__(self):
+        writer = self._writer
+        if writer.pretty_print:
+            writer._write(f'{"  " * writer._depth}<{self._name}{self._attributes}>\n')
+        else:
+            writer._write(f'<{self._name}{self._attributes}>')
+        writer._depth += 1
+        if self._content is not None:
+            self._content()
+        return writer
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            return
+        writer = self._writer
+        writer._depth -= 1
+        if writer.pretty_print:
+            writer._write(f'{"  " * writer._depth}</{self._name}>\n')
+        else:
+            writer._write(f'</{self._name}>')
+        if len(writer._parts) > _FLUSH_PARTS:
+            writer._flush()
+
+
+def _format_attributes(attrib):
+    """Formats the attributes that have a value as XML markup"""
+    if not attrib:
+        return ''
+    return ''.join(
+        f' {key}="{_escape_xml(_format_value(value))}"'
+        for key, value in attrib.items() if value is not None
+    )
+
+
+def _gzip_level(compresslevel):
+    return 9 if compresslevel is None else compresslevel
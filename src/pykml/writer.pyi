@@ -0,0 +1,159 @@
+#
+# coding: utf-8
+#
+# Stub file for pyxml.writer
+#
+from contextlib import ExitStack
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Mapping, \
+    Optional, Sequence, Union
+
+from lxml import etree
+
+GX: str = ...
+DEFAULT_CDATA_ELEMENTS: Sequence[str] = ...
+_PREFIXES: Dict[str, Optional[str]] = ...
+_FLUSH_PARTS: int = ...
+
+Coordinates = Union[str, Sequence[float], Sequence[Sequence[float]], Any]
+
+
+def _format_value(value: Any) -> str:
+    ...
+
+
+def _cdata(text: str) -> str:
+    ...
+
+
+def _qualified_name(tag: str) -> str:
+    ...
+
+
+def _coordinates_text(coords: Coordinates) -> str:
+    ...
+
+
+class KmlWriter:
+    output: Union[str, BinaryIO] = ...
+    encoding: str = ...
+    pretty_print: bool = ...
+    cdata_elements: frozenset = ...
+    compression: Optional[str] = ...
+    compresslevel: Optional[int] = ...
+
+    def __init__(self, output: Union[str, BinaryIO], encoding: str = ...,
+                 pretty_print: bool = ...,
+                 cdata_elements: Iterable[str] = ...,
+                 compression: Optional[str] = ...,
+                 compresslevel: Optional[int] = ...) -> None:
+        ...
+
+    def __enter__(self) -> 'KmlWriter':
+        ...
+
+    def __exit__(self, *exc_info: Any) -> None:
+        ...
+
+    def _open_sink(self, stack: ExitStack) -> BinaryIO:
+        ...
+
+    def _flush(self) -> None:
+        ...
+
+    def _name(self, tag: str) -> str:
+        ...
+
+    def _container(self, tag: str, attrib: Optional[Mapping[str, Any]] = ...,
+                   content: Optional[Callable[[], None]] = ...) -> '_OpenElement':
+        ...
+
+    def element(self, tag: str, text: Optional[Any] = ...,
+                attrib: Optional[Mapping[str, Any]] = ...) -> None:
+        ...
+
+    def write(self, el: etree._Element) -> None:
+        ...
+
+    def _feature_fields(self, name: Optional[Any], visibility: Optional[Any],
+                        open_: Optional[Any], snippet: Optional[Any],
+                        description: Optional[Any]) -> None:
+        ...
+
+    def document(self, name: Optional[Any] = ..., id: Optional[str] = ...,
+                 visibility: Optional[bool] = ..., open: Optional[bool] = ...,
+                 snippet: Optional[Any] = ...,
+                 description: Optional[Any] = ...) -> '_OpenElement':
+        ...
+
+    def folder(self, name: Optional[Any] = ..., id: Optional[str] = ...,
+               visibility: Optional[bool] = ..., open: Optional[bool] = ...,
+               snippet: Optional[Any] = ...,
+               description: Optional[Any] = ...) -> '_OpenElement':
+        ...
+
+    def placemark(self, name: Optional[Any] = ..., id: Optional[str] = ...,
+                  visibility: Optional[bool] = ...,
+                  snippet: Optional[Any] = ...,
+                  description: Optional[Any] = ...,
+                  style_url: Optional[str] = ...,
+                  extended_data: Optional[Mapping[str, Any]] = ...) \
+            -> '_OpenElement':
+        ...
+
+    def multi_geometry(self, id: Optional[str] = ...) -> '_OpenElement':
+        ...
+
+    def style(self, id: Optional[str] = ..., icon_href: Optional[str] = ...,
+              icon_scale: Optional[float] = ..., icon_color: Optional[str] = ...,
+              label_color: Optional[str] = ..., label_scale: Optional[float] = ...,
+              line_color: Optional[str] = ..., line_width: Optional[float] = ...,
+              poly_color: Optional[str] = ..., poly_fill: Optional[bool] = ...,
+              poly_outline: Optional[bool] = ...,
+              balloon_text: Optional[str] = ...) -> None:
+        ...
+
+    def point(self, coords: Coordinates, extrude: Optional[bool] = ...,
+              altitude_mode: Optional[str] = ..., id: Optional[str] = ...) -> None:
+        ...
+
+    def line_string(self, coords: Coordinates, extrude: Optional[bool] = ...,
+                    tessellate: Optional[bool] = ...,
+                    altitude_mode: Optional[str] = ...,
+                    id: Optional[str] = ...) -> None:
+        ...
+
+    def linear_ring(self, coords: Coordinates, extrude: Optional[bool] = ...,
+                    tessellate: Optional[bool] = ...,
+                    altitude_mode: Optional[str] = ...,
+                    id: Optional[str] = ...) -> None:
+        ...
+
+    def polygon(self, outer: Coordinates, inner: Iterable[Coordinates] = ...,
+                extrude: Optional[bool] = ..., tessellate: Optional[bool] = ...,
+                altitude_mode: Optional[str] = ...,
+                id: Optional[str] = ...) -> None:
+        ...
+
+    def track(self, whens: Iterable[str], coords: Coordinates,
+              altitude_mode: Optional[str] = ..., id: Optional[str] = ...) -> None:
+        ...
+
+
+class _OpenElement:
+    def __init__(self, writer: KmlWriter, name: str, attributes: str,
+                 content: Optional[Callable[[], None]] = ...) -> None:
+        ...
+
+    def __enter__(self) -> KmlWriter:
+        ...
+
+    def __exit__(self, *exc_info: Any) -> None:
+        ...
+
+
+def _format_attributes(attrib: Optional[Mapping[str, Any]]) -> str:
+    ...
+
+
+def _gzip_level(compresslevel: Optional[int]) -> int:
+    ...
@@ -0,0 +1,137 @@
+#
+# coding: utf-8
+#
+# test_columnar
+#
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+
+from pykml.columnar import COLUMNS
+from pykml.columnar import iter_record_batches
+from pykml.columnar import pyarrow
+from pykml.geometry import numpy
+from pykml.kmz import KmzFile
+from pykml.parser import fromstring
+
+TEST_KML = b'''<kml xmlns="http://www.opengis.net/kml/2.2"
+ xmlns:gx="http://www.google.com/kml/ext/2.2"><Document>
+<Schema id="survey">
+  <SimpleField name="population" type="int"/>
+  <SimpleField name="label" type="string"/>
+</Schema>
+<Placemark id="p1">
+  <name>Point</name>
+  <styleUrl> #red </styleUrl>
+  <TimeStamp><when>2020-01-02T03:04:05+01:00</when></TimeStamp>
+  <ExtendedData>
+    <Data name="kind"><value>city</value></Data>
+    <SchemaData schemaUrl="#survey">
+      <SimpleData name="population">12</SimpleData>
+    </SchemaData>
+  </ExtendedData>
+  <Point><coordinates>1,2,3</coordinates></Point>
+</Placemark>
+<Placemark>
+  <TimeSpan><begin>2007</begin><end>2008-02-03</end></TimeSpan>
+  <ExtendedData>
+    <SchemaData schemaUrl="#survey">
+      <SimpleData name="label">square</SimpleData>
+      <SimpleData name="population">many</SimpleData>
+    </SchemaData>
+  </ExtendedData>
+  <Polygon><outerBoundaryIs><LinearRing>
+    <coordinates>0,0 1,0 1,1 0,0</coordinates>
+  </LinearRing></outerBoundaryIs></Polygon>
+</Placemark>
+<Folder>
+  <Placemark>
+    <name>no geometry</name>
+    <ExtendedData><Data name="name"><value>data</value></Data></ExtendedData>
+  </Placemark>
+</Folder>
+<Placemark>
+  <gx:Track>
+    <when>2010-05-28T02:02:09Z</when>
+    <gx:coord>4 5 6</gx:coord>
+    <gx:coord>7 8 9</gx:coord>
+  </gx:Track>
+</Placemark>
+</Document></kml>'''
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class ColumnarTestCase(unittest.TestCase):
+    def test_iter_record_batches(self):
+        """Tests extracting the columns of Placemarks"""
+        batches = list(iter_record_batches(fromstring(TEST_KML)))
+        self.assertEqual(len(batches), 1)
+        columns = batches[0]
+        self.assertEqual(list(columns),
+                         list(COLUMNS) + ['kind', 'population', 'label', 'data_name'])
+        self.assertEqual(columns['id'].tolist(), ['p1', None, None, None])
+        self.assertEqual(columns['name'].tolist(), ['Point', None, 'no geometry', None])
+        self.assertEqual(columns['styleUrl'].tolist(), ['#red', None, None, None])
+        self.assertEqual(columns['geometry_type'].tolist(),
+                         ['Point', 'Polygon', None, 'Track'])
+
+        offsets = columns['coordinate_offsets']
+        self.assertEqual(offsets.tolist(), [0, 1, 5, 5, 7])
+        self.assertEqual(columns['longitude'][offsets[1]:offsets[2]].tolist(),
+                         [0.0, 1.0, 1.0, 0.0])
+        self.assertEqual(columns['latitude'].tolist(), [2, 0, 0, 1, 0, 5, 8])
+        self.assertEqual(columns['altitude'].tolist(), [3, 0, 0, 0, 0, 6, 9])
+
+        self.assertEqual(columns['when'].dtype, numpy.dtype('datetime64[ms]'))
+        self.assertEqual(str(columns['when'][0]), '2020-01-02T02:04:05.000')
+        self.assertTrue(numpy.isnat(columns['when'][1:]).all())
+        self.assertEqual(columns['begin'][1], numpy.datetime64('2007-01-01'))
+        self.assertEqual(columns['end'][1], numpy.datetime64('2008-02-03'))
+        self.assertTrue(numpy.isnat(columns['begin'][[0, 2, 3]]).all())
+
+        self.assertEqual(columns['kind'].tolist(), ['city', None, None, None])
+        self.assertEqual(columns['population'].dtype, numpy.float64)
+        self.assertEqual(columns['population'][0], 12.0)
+        self.assertTrue(numpy.isnan(columns['population'][1:]).all())
+        self.assertEqual(columns['label'].tolist(), [None, 'square', None, None])
+        self.assertEqual(columns['data_name'].tolist(), [None, None, 'data', None])
+
+    def test_iter_record_batches_stream(self):
+        """Tests extracting the columns of a file in batches"""
+        batches = list(iter_record_batches(BytesIO(TEST_KML), batch_size=3))
+        self.assertEqual([len(batch['id']) for batch in batches], [3, 1])
+        self.assertEqual(batches[0]['population'].tolist()[0], 12.0)
+        self.assertEqual(batches[1]['coordinate_offsets'].tolist(), [0, 2])
+        self.assertEqual(batches[1]['longitude'].tolist(), [4.0, 7.0])
+        # the ExtendedData columns of a batch are those of its Placemarks
+        self.assertNotIn('kind', batches[1])
+
+        with self.assertRaises(ValueError):
+            next(iter_record_batches(BytesIO(TEST_KML), batch_size=0))
+
+    def test_iter_record_batches_kmz(self):
+        """Tests extracting the columns of a KMZ file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'test.kmz'
+            with KmzFile(path, 'w') as kmz:
+                kmz.write('doc.kml', TEST_KML)
+            columns, = iter_record_batches(path)
+            self.assertEqual(columns['name'].tolist(),
+                             ['Point', None, 'no geometry', None])
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_iter_record_batches_arrow(self):
+        """Tests extracting the columns as Arrow record batches"""
+        batch, = iter_record_batches(BytesIO(TEST_KML), as_arrow=True)
+        self.assertEqual(batch.num_rows, 4)
+        self.assertNotIn('coordinate_offsets', batch.schema.names)
+        self.assertEqual(batch.column('latitude').to_pylist(),
+                         [[2.0], [0.0, 0.0, 1.0, 0.0], [], [5.0, 8.0]])
+        self.assertEqual(batch.column('name').to_pylist(),
+                         ['Point', None, 'no geometry', None])
+        self.assertEqual(batch.column('population').type, pyarrow.float64())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,7 +16,10 @@ import pykml.parser
 from pykml.factory import ATOM_ElementMaker as ATOM
 from pykml.factory import GX_ElementMaker as GX
 from pykml.factory import KML_ElementMaker as KML
+from pykml.factory import build_placemarks
 from pykml.factory import get_factory_object_name
+from pykml.factory import iter_placemark_xml
+from pykml.factory import placemarks_to_bytes
 from pykml.factory import write_python_script_for_kml_document
 from pykml.parser import Schema
 
@@ -240,6 +243,94 @@ class KmlFactoryTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
 
         self.assertXmlEquivalentOutputs(data, expected)
 
+    def test_build_placemarks(self):
+        """Tests building Placemarks from columns of values."""
+        placemarks = build_placemarks(
+            names=['a & b', 'c'],
+            coordinates=[(-122.1, 37.2), (-122.3, 37.4)],
+            style_urls=['#red', None],
+            extended_data=[{'population': 10, 'note': '<1>'}, {}],
+            ids=['pm1', None],
+        )
+        doc = KML.kml(KML.Document(*placemarks))
+        schema = Schema('ogckml22.xsd')
+        self.assertTrue(schema.validate(doc))
+
+        expected = KML.kml(
+            KML.Document(
+                KML.Placemark(
+                    KML.name('a & b'),
+                    KML.styleUrl('#red'),
+                    KML.ExtendedData(
+                        KML.Data(KML.value('10'), name='population'),
+                        KML.Data(KML.value('<1>'), name='note'),
+                    ),
+                    KML.Point(KML.coordinates('-122.1,37.2')),
+                    id='pm1',
+                ),
+                KML.Placemark(
+                    KML.name('c'),
+                    KML.Point(KML.coordinates('-122.3,37.4')),
+                ),
+            )
+        )
+        self.assertXmlEquivalentOutputs(etree.tostring(doc),
+                                        etree.tostring(expected))
+        self.assertEqual(doc.Document.Placemark.name, 'a & b')
+
+    def test_placemarks_to_bytes(self):
+        """Tests serializing Placemarks built from columns of values."""
+        data = placemarks_to_bytes(
+            names=['line', 'ring'],
+            coordinates=[[(0, 0, 1), (1, 1, 2)], '0,0 1,0 1,1 0,0'],
+            geometry='LineString',
+        )
+        self.assertEqual(
+            data,
+            b'<Placemark><name>line</name><LineString>'
+            b'<coordinates>0,0,1 1,1,2</coordinates></LineString></Placemark>'
+            b'<Placemark><name>ring</name><LineString>'
+            b'<coordinates>0,0 1,0 1,1 0,0</coordinates></LineString></Placemark>'
+        )
+        self.assertEqual(
+            placemarks_to_bytes(coordinates=[(1, 2, 3), '4,5']),
+            b'<Placemark><Point><coordinates>1,2,3</coordinates></Point></Placemark>'
+            b'<Placemark><Point><coordinates>4,5</coordinates></Point></Placemark>'
+        )
+        self.assertEqual(placemarks_to_bytes(names=[]), b'')
+        self.assertEqual(
+            placemarks_to_bytes(names=['Zürich'], encoding='ascii'),
+            b'<Placemark><name>Z&#252;rich</name></Placemark>'
+        )
+        self.assertEqual(
+            placemarks_to_bytes(names=['a', 'b', 'c'],
+                                coordinates=[(1, 2), None, (3, 4)]),
+            b'<Placemark><name>a</name><Point><coordinates>1,2</coordinates></Point>'
+            b'</Placemark><Placemark><name>b</name></Placemark>'
+            b'<Placemark><name>c</name><Point><coordinates>3,4</coordinates></Point>'
+            b'</Placemark>'
+        )
+        self.assertEqual(
+            placemarks_to_bytes(names=['a', 'b'], coordinates=[None, [(0, 0), (1, 1)]],
+                                geometry='LineString'),
+            b'<Placemark><name>a</name></Placemark><Placemark><name>b</name>'
+            b'<LineString><coordinates>0,0 1,1</coordinates></LineString></Placemark>'
+        )
+        with self.assertRaises(ValueError):
+            placemarks_to_bytes(names=['a'], coordinates=[])
+        # characters that XML cannot represent are rejected, as by lxml
+        for name in ('a\x01', 'a\ufffe'):
+            with self.assertRaises(ValueError):
+                placemarks_to_bytes(names=[name])
+            with self.assertRaises(ValueError):
+                build_placemarks(names=[name])
+            with self.assertRaises(ValueError):
+                list(iter_placemark_xml(names=[name]))
+            with self.assertRaises(ValueError):
+                KML.name(name)
+        with self.assertRaises(ValueError):
+            placemarks_to_bytes(names=['a'], geometry='Polygon')
+
 
 class GeneratePythonScriptTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
     def test_write_python_script_for_kml_document(self):
@@ -0,0 +1,263 @@
+#
+# coding: utf-8
+#
+# test_geometry
+#
+import struct
+import unittest
+from array import array
+from io import BytesIO
+
+from pykml.factory import GX_ElementMaker as GX
+from pykml.factory import KML_ElementMaker as KML
+from pykml.geometry import CoordinatesRangeError
+from pykml.geometry import CoordinatesSyntaxError
+from pykml.geometry import check_ranges
+from pykml.geometry import coords_array
+from pykml.geometry import format_coordinates
+from pykml.geometry import format_gx_coords
+from pykml.geometry import numpy
+from pykml.geometry import parse_coordinates
+from pykml.geometry import parse_gx_coords
+from pykml.geometry import set_coords_array
+from pykml.geometry import to_wkb
+from pykml.geometry import to_wkt
+from pykml.geometry import tokenize_coordinates
+
+
+class KmlGeometryTestCase(unittest.TestCase):
+    def test_parse_coordinates(self):
+        """Tests parsing coordinate strings with various whitespace"""
+        self.assertEqual(
+            parse_coordinates('-122.1,37.2,30 -122.3,37.4,40'),
+            array('d', [-122.1, 37.2, 30, -122.3, 37.4, 40])
+        )
+        self.assertEqual(
+            parse_coordinates('\n\t-122.1,37.2,30\n\t  -122.3,37.4,40\n'),
+            array('d', [-122.1, 37.2, 30, -122.3, 37.4, 40])
+        )
+        # altitude is optional
+        self.assertEqual(
+            parse_coordinates('-122.1,37.2 -122.3,37.4'),
+            array('d', [-122.1, 37.2, 0, -122.3, 37.4, 0])
+        )
+        self.assertEqual(
+            parse_coordinates('-122.1,37.2 -122.3,37.4,40'),
+            array('d', [-122.1, 37.2, 0, -122.3, 37.4, 40])
+        )
+        self.assertEqual(parse_coordinates(''), array('d'))
+
+    def test_parse_invalid_coordinates(self):
+        """Tests parsing malformed coordinate strings"""
+        with self.assertRaises(ValueError):
+            parse_coordinates('-122.1,37.2,30,1')
+        with self.assertRaises(ValueError):
+            parse_coordinates('-122.1 37.2')
+        with self.assertRaises(ValueError):
+            parse_coordinates('-122.1,37.2, -122.3,37.4')
+        with self.assertRaises(ValueError):
+            parse_coordinates('-122.1,north')
+
+    def test_tokenize_coordinates(self):
+        """Tests splitting coordinate strings into tuples"""
+        self.assertEqual(tokenize_coordinates(' 1,2,3\n\t4,5,6\r\n'),
+                         (['1,2,3', '4,5,6'], 3))
+        self.assertEqual(tokenize_coordinates('1,2  3,4'), (['1,2', '3,4'], 2))
+        self.assertEqual(tokenize_coordinates('1,2 3,4,5'), (['1,2', '3,4,5'], None))
+        # values are only checked when parsed
+        self.assertEqual(tokenize_coordinates('nan,x'), (['nan,x'], 2))
+        self.assertEqual(tokenize_coordinates(''), ([], None))
+
+        for text, index, token in [
+            ('1,2 3,4,5,6', 1, '3,4,5,6'),
+            ('1,2 3', 1, '3'),
+            ('1,2 ,3', 1, ',3'),
+            ('1,,2', 0, '1,,2'),
+            ('1,2,', 0, '1,2,'),
+        ]:
+            with self.subTest(text=text):
+                with self.assertRaises(CoordinatesSyntaxError) as context:
+                    tokenize_coordinates(text)
+                self.assertEqual((context.exception.index, context.exception.token),
+                                 (index, token))
+
+        with self.assertRaises(CoordinatesSyntaxError) as context:
+            parse_coordinates('1,2 3,4 5,north')
+        self.assertEqual(context.exception.index, 2)
+
+    def test_parse_gx_coords(self):
+        """Tests parsing gx:coord texts"""
+        self.assertEqual(parse_gx_coords(['1 2 3', ' 4\t5  6\n']),
+                         array('d', [1, 2, 3, 4, 5, 6]))
+        with self.assertRaises(CoordinatesSyntaxError) as context:
+            parse_gx_coords(['1 2 3 4', '5 6'])
+        self.assertEqual(context.exception.index, 0)
+        with self.assertRaises(CoordinatesSyntaxError) as context:
+            parse_gx_coords(['1 2 3', '4 5 x'])
+        self.assertEqual(context.exception.index, 1)
+        with self.assertRaises(CoordinatesSyntaxError) as context:
+            parse_gx_coords(['1 2 3', None])
+        self.assertEqual(context.exception.index, 1)
+
+    def test_check_ranges(self):
+        """Tests checking the ranges of longitudes and latitudes"""
+        check_ranges(array('d'))
+        check_ranges(parse_coordinates('-180,-90,1e9 180,90,-1e9'))
+        for text, message, index in (('1,2 180.5,0', 'longitude', 1),
+                                     ('1,-91 1,2', 'latitude', 0),
+                                     ('1,2 1,nan', 'latitude', 1),
+                                     ('nan,2 1,2', 'longitude', 0)):
+            with self.assertRaises(CoordinatesRangeError) as cm:
+                check_ranges(parse_coordinates(text))
+            self.assertIn(message, str(cm.exception))
+            self.assertEqual(cm.exception.index, index)
+
+    def test_format_coordinates(self):
+        """Tests formatting packed coordinates as KML text"""
+        coords = array('d', [-122.1, 37.2, 30, -122.3, 37.4, 0])
+        self.assertEqual(format_coordinates(coords),
+                         '-122.1,37.2,30.0 -122.3,37.4,0.0')
+        self.assertEqual(format_coordinates(coords, precision=2),
+                         '-122.10,37.20,30.00 -122.30,37.40,0.00')
+        self.assertEqual(format_coordinates(coords, altitude=False),
+                         '-122.1,37.2 -122.3,37.4')
+        self.assertEqual(format_gx_coords(coords),
+                         ['-122.1 37.2 30.0', '-122.3 37.4 0.0'])
+        self.assertEqual(format_coordinates(array('d')), '')
+        with self.assertRaises(ValueError):
+            format_coordinates([1.0, 2.0])
+
+    def test_coords_array(self):
+        """Tests reading the coordinates of geometry elements"""
+        line = KML.LineString(
+            KML.coordinates('-122.1,37.2,30 -122.3,37.4,40'),
+        )
+        self.assertEqual(coords_array(line),
+                         array('d', [-122.1, 37.2, 30, -122.3, 37.4, 40]))
+        self.assertEqual(coords_array(line.coordinates),
+                         array('d', [-122.1, 37.2, 30, -122.3, 37.4, 40]))
+
+        track = GX.Track(
+            KML.when('2010-05-28T02:02:09Z'),
+            KML.when('2010-05-28T02:02:35Z'),
+            GX.coord('-122.1 37.2 151.3'),
+            GX.coord('-122.3 37.4 152.2'),
+        )
+        self.assertEqual(coords_array(track),
+                         array('d', [-122.1, 37.2, 151.3, -122.3, 37.4, 152.2]))
+        self.assertEqual(coords_array(track.coord),
+                         array('d', [-122.1, 37.2, 151.3]))
+
+        with self.assertRaises(ValueError):
+            coords_array(KML.Polygon())
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_coords_array_numpy(self):
+        """Tests reading coordinates as a NumPy array"""
+        point = KML.Point(KML.coordinates('-122.1,37.2'))
+        coords = coords_array(point, as_numpy=True)
+        self.assertEqual(coords.shape, (1, 3))
+        self.assertEqual(coords.tolist(), [[-122.1, 37.2, 0.0]])
+
+        coords[:, 2] = 10.0
+        set_coords_array(point, coords)
+        self.assertEqual(point.coordinates, '-122.1,37.2,10.0')
+
+    def test_set_coords_array(self):
+        """Tests writing the coordinates of geometry elements"""
+        ring = KML.LinearRing(
+            KML.coordinates('0,0 1,0 1,1 0,0'),
+        )
+        coords = coords_array(ring)
+        coords[2::3] = array('d', [5] * 4)
+        set_coords_array(ring, coords, precision=1)
+        self.assertEqual(ring.coordinates,
+                         '0.0,0.0,5.0 1.0,0.0,5.0 1.0,1.0,5.0 0.0,0.0,5.0')
+        set_coords_array(ring, coords, altitude=False)
+        self.assertEqual(ring.coordinates, '0.0,0.0 1.0,0.0 1.0,1.0 0.0,0.0')
+
+        track = GX.Track(
+            GX.coord('-122.1 37.2 151.3'),
+            GX.coord('-122.3 37.4 152.2'),
+        )
+        set_coords_array(track, array('d', [1, 2, 3, 4, 5, 6]))
+        self.assertEqual([c.text for c in track.coord], ['1.0 2.0 3.0', '4.0 5.0 6.0'])
+        with self.assertRaises(ValueError):
+            set_coords_array(track, array('d', [1, 2, 3]))
+
+    def test_to_wkt(self):
+        """Tests converting geometry elements to Well Known Text"""
+        self.assertEqual(to_wkt(KML.Point(KML.coordinates('-122.1,37.2'))),
+                         'POINT (-122.1 37.2)')
+        self.assertEqual(to_wkt(KML.Point()), 'POINT EMPTY')
+        self.assertEqual(
+            to_wkt(KML.LineString(KML.coordinates('\n 0,0,1\n\t1.50,1,2 '))),
+            'LINESTRING (0 0 1, 1.50 1 2)'
+        )
+        # tuples of mixed size are completed with a zero altitude
+        self.assertEqual(
+            to_wkt(KML.LinearRing(KML.coordinates('0,0 1,0,5 1,1 0,0'))),
+            'LINESTRING (0.0 0.0 0.0, 1.0 0.0 5.0, 1.0 1.0 0.0, 0.0 0.0 0.0)'
+        )
+        self.assertEqual(
+            to_wkt(GX.Track(GX.coord('-122.1 37.2 151.3'),
+                            GX.coord('-122.3  37.4 152.2'))),
+            'LINESTRING (-122.1 37.2 151.3, -122.3 37.4 152.2)'
+        )
+        self.assertEqual(
+            to_wkt(KML.MultiGeometry(
+                KML.Point(KML.coordinates('1,2')),
+                KML.Point(KML.coordinates('3,4')),
+            )),
+            'MULTIPOINT ((1 2), (3 4))'
+        )
+        self.assertEqual(
+            to_wkt(KML.MultiGeometry(
+                KML.Point(KML.coordinates('1,2')),
+                KML.Polygon(
+                    KML.outerBoundaryIs(KML.LinearRing(
+                        KML.coordinates('0,0 1,0 1,1 0,0'))),
+                    KML.innerBoundaryIs(KML.LinearRing(
+                        KML.coordinates('.2,.2 .8,.2 .8,.8 .2,.2'))),
+                ),
+            )),
+            'GEOMETRYCOLLECTION (POINT (1 2), POLYGON ((0 0, 1 0, 1 1, 0 0), '
+            '(.2 .2, .8 .2, .8 .8, .2 .2)))'
+        )
+        self.assertEqual(to_wkt(KML.MultiGeometry()), 'GEOMETRYCOLLECTION EMPTY')
+        with self.assertRaises(CoordinatesSyntaxError) as context:
+            to_wkt(GX.Track(GX.coord('1 2 3'), GX.coord()))
+        self.assertEqual(context.exception.index, 1)
+        with self.assertRaises(ValueError):
+            to_wkt(KML.Model())
+
+    def test_to_wkb(self):
+        """Tests converting geometry elements to Well Known Binary"""
+        self.assertEqual(to_wkb(KML.Point(KML.coordinates('1,2'))),
+                         struct.pack('<BIdd', 1, 1, 1, 2))
+        self.assertEqual(to_wkb(KML.Point(KML.coordinates('1,2')), altitude=True),
+                         struct.pack('<BIddd', 1, 1001, 1, 2, 0))
+        self.assertEqual(
+            to_wkb(KML.LineString(KML.coordinates('0,0,1 1,1,2'))),
+            struct.pack('<BII6d', 1, 1002, 2, 0, 0, 1, 1, 1, 2)
+        )
+        polygon = KML.Polygon(
+            KML.outerBoundaryIs(KML.LinearRing(
+                KML.coordinates('0,0 1,0 1,1 0,0'))),
+        )
+        self.assertEqual(
+            to_wkb(KML.MultiGeometry(polygon)),
+            struct.pack('<BI', 1, 6) +
+            struct.pack('<IBIII8d', 1, 1, 3, 1, 4, 0, 0, 1, 0, 1, 1, 0, 0)
+        )
+
+        buffer = BytesIO()
+        self.assertIsNone(to_wkb(GX.Track(GX.coord('1 2 3')), output=buffer))
+        self.assertEqual(buffer.getvalue(),
+                         struct.pack('<BII3d', 1, 1002, 1, 1, 2, 3))
+        with self.assertRaises(CoordinatesSyntaxError):
+            to_wkb(GX.Track(GX.coord()))
+
+
+if __name__ == '__main__':
+    unittest.main()
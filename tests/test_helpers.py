@@ -5,6 +5,8 @@
 #
 import unittest
 
+from pykml.factory import KML_ElementMaker as KML
+from pykml.geometry import CoordinatesSyntaxError
 from pykml.helpers import separate_namespace
 from pykml.helpers import set_max_decimal_places
 from pykml.parser import Schema
@@ -184,6 +186,77 @@ class KmlHelpersTestCase(unittest.TestCase):
             '-122.111 37.11 151.3'
         )
 
+    def test_set_max_decimal_places_mixed_tuples(self):
+        """Tests setting the number of decimal places for tuples of mixed size"""
+
+        test_kml = \
+            '<kml xmlns="http://www.opengis.net/kml/2.2">' \
+            '<Document>' \
+            '<Placemark>' \
+            '<Point>' \
+            '<coordinates>-105.6381333137406,40.25542364754504</coordinates>' \
+            '</Point>' \
+            '</Placemark>' \
+            '<Placemark>' \
+            '<LineString>' \
+            '<coordinates>\n' \
+            '  -105.6400899274733,40.25778038346723,10\n' \
+            '  -105.6397083557171,40.25680995109639\n' \
+            '</coordinates>' \
+            '</LineString>' \
+            '</Placemark>' \
+            '</Document>' \
+            '</kml>'
+        test_kml = test_kml.encode('utf-8')
+
+        doc = fromstring(test_kml, schema=Schema('ogckml22.xsd'))
+        set_max_decimal_places(
+            doc,
+            max_decimals={
+                'latitude': 3,
+                'altitude': 1,
+            }
+        )
+
+        coords_list = doc.findall('.//{http://www.opengis.net/kml/2.2}coordinates')
+        # longitude values are not changed
+        self.assertEqual(
+            coords_list[0],
+            '-105.6381333137406,40.255'
+        )
+        self.assertEqual(
+            coords_list[1],
+            '-105.6400899274733,40.258,10.0 '
+            '-105.6397083557171,40.257'
+        )
+
+    def test_set_max_decimal_places_whitespace(self):
+        """Tests setting the number of decimal places of coordinates
+        separated by any whitespace, and of malformed coordinates"""
+        doc = KML.kml(KML.Placemark(KML.LineString(
+            KML.coordinates('\t1.2345,2.3456,3\n  4.5678,5.6789,6\r\n'))))
+        set_max_decimal_places(doc, max_decimals={'longitude': 2, 'latitude': 2})
+        self.assertEqual(doc.Placemark.LineString.coordinates,
+                         '1.23,2.35,3 4.57,5.68,6')
+
+        doc = KML.kml(KML.Placemark(KML.LineString(
+            KML.coordinates('1.2345,2.3456 3.1,4.1,5.1,6.1'))))
+        with self.assertRaises(CoordinatesSyntaxError) as context:
+            set_max_decimal_places(doc, max_decimals={'longitude': 2})
+        self.assertEqual(context.exception.index, 1)
+
+    def test_set_max_decimal_places_rounding(self):
+        """Tests that values are rounded as binary floating point numbers"""
+        doc = KML.kml(KML.Placemark(
+            KML.LookAt(KML.longitude('2.675'), KML.latitude('0.125')),
+            KML.LineString(KML.coordinates('2.675,1.005,0 0.125,-2.675,0')),
+        ))
+        set_max_decimal_places(doc, max_decimals={'longitude': 2, 'latitude': 2})
+        self.assertEqual(doc.Placemark.LookAt.longitude.text, '2.67')
+        self.assertEqual(doc.Placemark.LookAt.latitude.text, '0.12')
+        self.assertEqual(doc.Placemark.LineString.coordinates.text,
+                         '2.67,1.00,0 0.12,-2.67,0')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,122 @@
+#
+# coding: utf-8
+#
+# test_kmz
+#
+import os
+import tempfile
+import unittest
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.kmz import KmzFile
+from pykml.kmz import is_kmz
+from pykml.parser import iterparse
+from pykml.parser import parse
+
+
+def make_document(count=3):
+    return KML.kml(KML.Document(*[
+        KML.Placemark(
+            KML.name(f'pm{i}'),
+            KML.Style(KML.IconStyle(KML.Icon(KML.href('files/icon.png')))),
+            KML.Point(KML.coordinates(f'{i},{i}')),
+        )
+        for i in range(count)
+    ]))
+
+
+def make_kmz(doc, compresslevel=None):
+    buffer = BytesIO()
+    with KmzFile(buffer, 'w', compresslevel=compresslevel) as kmz:
+        kmz.write_kml(doc)
+        kmz.write('files/icon.png', b'\x89PNG icon')
+    buffer.seek(0)
+    return buffer
+
+
+class KmzFileTestCase(unittest.TestCase):
+    def test_write_and_read(self):
+        """Tests writing a KMZ archive and reading it back"""
+        buffer = make_kmz(make_document())
+        self.assertTrue(is_kmz(buffer))
+        self.assertEqual(buffer.tell(), 0)
+
+        with KmzFile(buffer) as kmz:
+            self.assertEqual(kmz.namelist(), ['doc.kml', 'files/icon.png'])
+            self.assertEqual(kmz.kml_name, 'doc.kml')
+            self.assertEqual(kmz.read('files/icon.png'), b'\x89PNG icon')
+            with kmz.open('files/icon.png') as f:
+                self.assertEqual(f.read(4), b'\x89PNG')
+
+            root = kmz.parse().getroot()
+            self.assertEqual(len(root.Document.Placemark), 3)
+            names = [pm.name.text for pm in kmz.iterparse()]
+            self.assertEqual(names, ['pm0', 'pm1', 'pm2'])
+
+    def test_compresslevel(self):
+        """Tests that members are compressed with the given level"""
+        doc = make_document(200)
+        stored = make_kmz(doc, compresslevel=0).getbuffer().nbytes
+        compressed = make_kmz(doc, compresslevel=9).getbuffer().nbytes
+        self.assertLess(compressed, stored)
+        with zipfile.ZipFile(make_kmz(doc, compresslevel=9)) as archive:
+            info = archive.getinfo('doc.kml')
+            self.assertEqual(info.compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_kml_name(self):
+        """Tests locating the KML document of archives without doc.kml"""
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('images/overlay.kml', b'<kml/>')
+            archive.writestr('overview.kml', b'<kml/>')
+            archive.writestr('other.kml', b'<kml/>')
+        with KmzFile(buffer) as kmz:
+            self.assertEqual(kmz.kml_name, 'overview.kml')
+
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('icon.png', b'')
+        with KmzFile(buffer) as kmz:
+            with self.assertRaises(KeyError):
+                kmz.kml_name
+
+    def test_parser_reads_kmz(self):
+        """Tests that parse and iterparse recognize KMZ archives"""
+        self.assertFalse(is_kmz(BytesIO(b'<kml/>')))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'test.kmz')
+            with open(path, 'wb') as f:
+                f.write(make_kmz(make_document()).getvalue())
+
+            root = parse(path).getroot()
+            self.assertEqual(root.Document.Placemark[1].name, 'pm1')
+            with open(path, 'rb') as f:
+                root = parse(f).getroot()
+            self.assertEqual(root.Document.Placemark[2].name, 'pm2')
+
+            names = [pm.name.text for pm in iterparse(path)]
+            self.assertEqual(names, ['pm0', 'pm1', 'pm2'])
+
+    def test_is_kmz_path(self):
+        """Tests that file names are recognized by their first bytes only"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'test.kml')
+            with open(path, 'wb') as f:
+                f.write(b'<kml/>')
+            self.assertFalse(is_kmz(path))
+
+            with open(path, 'wb') as f:
+                f.write(make_kmz(make_document()).getvalue())
+            with mock.patch('zipfile.is_zipfile') as is_zipfile:
+                self.assertTrue(is_kmz(path))
+            is_zipfile.assert_not_called()
+
+            self.assertFalse(is_kmz(os.path.join(tmpdir, 'missing.kmz')))
+            self.assertFalse(is_kmz(tmpdir))
+
+
+if __name__ == '__main__':
+    unittest.main()
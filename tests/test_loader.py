@@ -0,0 +1,195 @@
+#
+# coding: utf-8
+#
+# test_loader
+#
+import asyncio
+import gzip
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from unittest import mock
+from urllib.error import HTTPError
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.kmz import KmzFile
+from pykml.loader import AsyncLoader
+from pykml.loader import _Connection
+from pykml.loader import load_kml_uris
+
+
+def make_document(name):
+    doc = KML.kml(KML.Document(KML.Placemark(
+        KML.name(name),
+        KML.Point(KML.coordinates('1,2')),
+    )))
+    return etree.tostring(doc, xml_declaration=True, encoding='utf-8')
+
+
+def make_kmz(name):
+    buffer = BytesIO()
+    with KmzFile(buffer, 'w') as kmz:
+        kmz.write('doc.kml', make_document(name))
+    return buffer.getvalue()
+
+
+class KmlHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        path = self.path
+        if path.startswith('http://'):
+            # a request to the server as a proxy
+            self.server.proxied.append(path)
+            path = '/' + path.split('/', 3)[3]
+        if path == '/slow.kml':
+            time.sleep(1)
+        if path.startswith('/redirect'):
+            self.send_response(302)
+            self.send_header('Location', '/doc.kml')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif path.startswith('/doc') or path == '/slow.kml':
+            self.send_body(make_document(path))
+        elif path == '/archive.kmz':
+            self.send_body(make_kmz(path), 'application/vnd.google-earth.kmz')
+        elif path == '/chunked.kml':
+            body = gzip.compress(make_document(path))
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i in range(0, len(body), 50):
+                chunk = body[i:i + 50]
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        elif path == '/truncated.kml':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b'5\r\n<kml>\r\n')
+            self.close_connection = True
+        else:
+            self.send_error(404)
+
+    def send_body(self, body, content_type='application/vnd.google-earth.kml+xml'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class AsyncLoaderTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), KmlHandler)
+        cls.server.daemon_threads = True
+        cls.server.connections = 0
+        cls.server.proxied = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_load_kml_uris(self):
+        connections = self.server.connections
+        uris = [f'{self.base}/doc{i}.kml' for i in range(20)]
+        docs = load_kml_uris(uris, max_connections=4)
+        self.assertEqual([str(doc.getroot().Document.Placemark.name) for doc in docs],
+                         [f'/doc{i}.kml' for i in range(20)])
+        # connections are kept alive and reused
+        self.assertLessEqual(self.server.connections - connections, 4)
+
+    def test_kmz_chunked_and_redirect(self):
+        docs = load_kml_uris([f'{self.base}/archive.kmz',
+                              f'{self.base}/chunked.kml',
+                              f'{self.base}/redirect'])
+        self.assertEqual([str(doc.getroot().Document.Placemark.name) for doc in docs],
+                         ['/archive.kmz', '/chunked.kml', '/doc.kml'])
+
+    def test_local_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'local.kml')
+            with open(path, 'wb') as f:
+                f.write(make_document('local'))
+            docs = load_kml_uris([path, 'file://' + path])
+        self.assertEqual([str(doc.getroot().Document.Placemark.name) for doc in docs],
+                         ['local', 'local'])
+
+    def test_errors(self):
+        missing, slow = load_kml_uris([f'{self.base}/missing.kml',
+                                       f'{self.base}/slow.kml'],
+                                      timeout=0.2, return_exceptions=True)
+        self.assertIsInstance(missing, HTTPError)
+        self.assertEqual(missing.code, 404)
+        self.assertIsInstance(slow, asyncio.TimeoutError)
+        with self.assertRaises(HTTPError):
+            load_kml_uris([f'{self.base}/missing.kml'])
+
+    def test_errors_close_connections(self):
+        async def fetch(paths):
+            async with AsyncLoader(timeout=0.2) as loader:
+                for path in paths:
+                    await loader.fetch(self.base + path)
+
+        with mock.patch.object(_Connection, 'close', autospec=True,
+                               side_effect=_Connection.close) as close:
+            # a timeout on a new connection
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(fetch(['/slow.kml']))
+            self.assertEqual(close.call_count, 1)
+
+            # a timeout on an idle connection is not retried
+            close.reset_mock()
+            connections = self.server.connections
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(fetch(['/doc.kml', '/slow.kml']))
+            self.assertEqual(close.call_count, 1)
+            self.assertEqual(self.server.connections - connections, 1)
+
+            # a chunked body cut short
+            close.reset_mock()
+            with self.assertRaises(asyncio.IncompleteReadError):
+                asyncio.run(fetch(['/truncated.kml']))
+            self.assertEqual(close.call_count, 1)
+
+    def test_proxy(self):
+        uris = ['http://kml.invalid/doc.kml', 'http://kml.invalid/chunked.kml',
+                'http://kml.invalid/redirect']
+        with mock.patch.dict(os.environ, {'http_proxy': self.base, 'no_proxy': ''}):
+            docs = load_kml_uris(uris)
+        self.assertEqual([str(doc.getroot().Document.Placemark.name) for doc in docs],
+                         ['/doc.kml', '/chunked.kml', '/doc.kml'])
+        self.assertEqual(sorted(self.server.proxied), sorted(uris + uris[:1]))
+
+    def test_fetch(self):
+        async def fetch():
+            async with AsyncLoader() as loader:
+                return await loader.fetch(f'{self.base}/doc.kml')
+
+        response, body = asyncio.run(fetch())
+        self.assertEqual(response.status, 200)
+        self.assertEqual(int(response.headers['Content-Length']), len(body))
+        self.assertEqual(body, make_document('/doc.kml'))
+
+
+if __name__ == '__main__':
+    unittest.main()
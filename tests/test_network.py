@@ -0,0 +1,202 @@
+#
+# coding: utf-8
+#
+# test_network
+#
+import os
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.error import HTTPError
+
+from lxml import etree
+
+from pykml.factory import KML_ElementMaker as KML
+from pykml.network import HttpCache
+from pykml.network import resolve_network_links
+
+
+def network_link(name, href, refresh_interval=None):
+    link = KML.Link(KML.href(href))
+    if refresh_interval is not None:
+        link.append(KML.refreshMode('onInterval'))
+        link.append(KML.refreshInterval(refresh_interval))
+    return KML.NetworkLink(KML.name(name), link)
+
+
+DOCUMENTS = {
+    '/root.kml': KML.kml(KML.Document(
+        KML.name('root'),
+        network_link('a', 'a.kml'),
+        network_link('b', 'sub/b.kml', 3600),
+        network_link('missing', '/missing.kml'),
+    )),
+    '/a.kml': KML.kml(KML.Document(
+        KML.Placemark(KML.name('pa')),
+        network_link('back', 'root.kml'),
+    )),
+    # more than one feature in the kml element, which Google Earth accepts
+    '/sub/b.kml': KML.kml(
+        KML.Folder(
+            KML.name('folder b'),
+            KML.Placemark(KML.name('pb')),
+        ),
+        KML.Placemark(KML.name('pc')),
+    ),
+}
+
+
+class NetworkLinkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path not in DOCUMENTS:
+            self.server.requests[self.path, 404] += 1
+            self.send_error(404)
+            return
+        etag = '"%s"' % self.path
+        if self.headers.get('If-None-Match') == etag:
+            self.server.requests[self.path, 304] += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.server.requests[self.path, 200] += 1
+        body = etree.tostring(DOCUMENTS[self.path])
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class NetworkLinkTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), NetworkLinkHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = 'http://127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = Counter()
+
+    def test_graph(self):
+        root = resolve_network_links(f'{self.base}/root.kml')
+        self.assertEqual([node.uri for node in root.links],
+                         [f'{self.base}/a.kml', f'{self.base}/sub/b.kml',
+                          f'{self.base}/missing.kml'])
+        a, b, missing = root.links
+        self.assertIs(a.links[0], root)
+        self.assertEqual(b.refresh_interval, 3600)
+        self.assertIsInstance(missing.error, HTTPError)
+        self.assertEqual(len(list(root.walk())), 4)
+        self.assertEqual(b.document.getroot().Folder.Placemark.name, 'pb')
+
+        root = resolve_network_links(f'{self.base}/root.kml', max_depth=0)
+        self.assertEqual(root.links, [])
+        self.assertEqual(len(root.hrefs), 3)
+
+    def test_merge(self):
+        doc = resolve_network_links(f'{self.base}/root.kml', merge=True)
+        document = doc.getroot().Document
+        self.assertEqual([folder.name for folder in document.Folder], ['a', 'b'])
+        a, b = document.Folder
+        self.assertEqual(a.Document.Placemark.name, 'pa')
+        # the link back to the root document is left in place
+        self.assertEqual(a.Document.NetworkLink.name, 'back')
+        self.assertEqual(b.Folder.Placemark.name, 'pb')
+        self.assertEqual(b.Placemark.name, 'pc')
+        self.assertEqual(document.NetworkLink.name, 'missing')
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = resolve_network_links(f'{self.base}/root.kml', cache_dir=tmp)
+            self.assertFalse(root.from_cache)
+            self.assertEqual(self.server.requests[f'/root.kml', 200], 1)
+
+            self.server.requests.clear()
+            root = resolve_network_links(f'{self.base}/root.kml', cache_dir=tmp)
+            a, b, missing = root.links
+            # revalidated with the ETag
+            self.assertTrue(root.from_cache)
+            self.assertTrue(a.from_cache)
+            self.assertEqual(self.server.requests['/root.kml', 304], 1)
+            self.assertEqual(self.server.requests['/a.kml', 304], 1)
+            # fresh for the refresh interval of its link
+            self.assertTrue(b.from_cache)
+            self.assertNotIn(('/sub/b.kml', 304), self.server.requests)
+            self.assertEqual(b.document.getroot().Folder.Placemark.name, 'pb')
+            self.assertIsInstance(missing.error, HTTPError)
+
+            doc = resolve_network_links(f'{self.base}/root.kml', cache_dir=tmp,
+                                        merge=True)
+            self.assertEqual(len(doc.getroot().Document.Folder), 2)
+
+    def test_cache_eviction(self):
+        """Tests that the documents served from the cache outlive the
+        eviction of their cache entries"""
+        with tempfile.TemporaryDirectory() as tmp:
+            resolve_network_links(f'{self.base}/root.kml', cache_dir=tmp)
+            root = resolve_network_links(f'{self.base}/root.kml', cache_dir=tmp)
+            a, b, missing = root.links
+            self.assertTrue(a.from_cache and b.from_cache)
+            # as by the documents of a later crawl
+            root.resolver.cache.clear()
+            self.assertEqual(b.document.getroot().Folder.Placemark.name, 'pb')
+            self.assertEqual(a.document.getroot().Document.Placemark.name, 'pa')
+
+    def test_cache_threads(self):
+        """Tests that the cache files are not accessed in the event loop"""
+        threads = []
+        get, put = HttpCache.get, HttpCache.put
+
+        def record(method):
+            def wrapper(*args):
+                threads.append(threading.current_thread())
+                return method(*args)
+            return wrapper
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(HttpCache, 'get', record(get)), \
+                mock.patch.object(HttpCache, 'put', record(put)):
+            resolve_network_links(f'{self.base}/root.kml', cache_dir=tmp)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+class HttpCacheTestCase(unittest.TestCase):
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = HttpCache(tmp, max_size=250)
+            for i in range(3):
+                cache.put(f'http://example.com/{i}', b'x' * 100, {'expires': None})
+                os.utime(cache._path(f'http://example.com/{i}', '.body'),
+                         (time.time() - 10 + i,) * 2)
+            self.assertEqual(cache.size, 200)
+            self.assertIsNone(cache.get('http://example.com/0'))
+            self.assertEqual(cache.read('http://example.com/2'), b'x' * 100)
+            self.assertEqual(cache.get('http://example.com/1')['url'],
+                             'http://example.com/1')
+
+            self.assertEqual(HttpCache(tmp).size, 200)
+            cache.clear()
+            self.assertEqual(cache.size, 0)
+            self.assertEqual(os.listdir(tmp), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#
+# coding: utf-8
+#
+# test_offsets
+#
+import math
+import os
+import tempfile
+import unittest
+
+from pykml.offsets import INDEX_SUFFIX
+from pykml.offsets import OffsetIndex
+
+HEAD = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        b'<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n')
+TAIL = b'</Document></kml>\n'
+
+
+def placemark(i):
+    return (f'<Placemark id="p{i}"><name> point {i} </name>'
+            f'<Point><coordinates>{i},{-i}</coordinates></Point>'
+            '</Placemark>\n').encode()
+
+
+FEATURES = [
+    placemark(0),
+    b'<Placemark><description><![CDATA[<Placemark>]]></description>'
+    b'<!-- </Placemark> --></Placemark>\n',
+    b'<Folder id="folder"><name>folder</name>'
+    b'<Placemark id="inner"><name>inner</name><LineString>'
+    b'<coordinates>1,2 3,4 -1,0</coordinates></LineString></Placemark>'
+    b'</Folder>\n',
+    placemark(1),
+]
+
+
+class OffsetIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, 'doc.kml')
+        self.write(FEATURES)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def write(self, features):
+        with open(self.path, 'wb') as f:
+            f.write(HEAD + b''.join(features) + TAIL)
+        # the modification time may not change within the same clock tick
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 1000))
+
+    def test_entries(self):
+        index = OffsetIndex(self.path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual([entry.id for entry in index], ['p0', None, 'inner', 'p1'])
+        self.assertEqual([entry.name for entry in index],
+                         ['point 0', None, 'inner', 'point 1'])
+        self.assertEqual(index[0].bbox, (0.0, 0.0, 0.0, 0.0))
+        self.assertTrue(all(math.isnan(value) for value in index[1].bbox))
+        self.assertEqual(index[2].bbox, (-1.0, 0.0, 3.0, 4.0))
+        self.assertEqual(index[-1].bbox, (1.0, -1.0, 1.0, -1.0))
+        self.assertTrue(os.path.exists(self.path + INDEX_SUFFIX))
+
+    def test_read_parse(self):
+        index = OffsetIndex(self.path)
+        self.assertEqual(index.read(0), placemark(0).rstrip())
+        self.assertEqual(index.read(1), FEATURES[1].rstrip())
+        self.assertEqual(index.get('inner').name, 'inner')
+        self.assertEqual(index.parse(1).description, '<Placemark>')
+        self.assertEqual([el.get('id') for el in index.parse_many([3, 0])],
+                         ['p1', 'p0'])
+        self.assertEqual(index.find('p1'), [3])
+        self.assertEqual(index.find('folder'), [])
+        with self.assertRaises(KeyError):
+            index.get('folder')
+
+    def test_tags(self):
+        index = OffsetIndex(self.path, tag=('Folder', 'Placemark'))
+        self.assertEqual([entry.id for entry in index],
+                         ['p0', None, 'folder', 'inner', 'p1'])
+        self.assertEqual(index.get('folder').Placemark.name, 'inner')
+        # the sidecar is rebuilt for other tags
+        self.assertEqual(len(OffsetIndex(self.path)), 4)
+
+    def test_reload(self):
+        index = OffsetIndex(self.path)
+        reloaded = OffsetIndex(self.path)
+        self.assertEqual(reloaded.update(), 0)
+        self.assertEqual([entry[:4] for entry in reloaded], [entry[:4] for entry in index])
+        self.assertEqual(reloaded[2].bbox, index[2].bbox)
+        self.assertEqual(reloaded.get('p1').name.text.strip(), 'point 1')
+
+    def test_update(self):
+        index = OffsetIndex(self.path)
+        self.write(FEATURES + [placemark(2)])
+        with self.assertRaises(ValueError):
+            index.read(0)
+        self.assertEqual(index.update(), 1)
+        self.assertEqual(index.get('p2').name.text.strip(), 'point 2')
+        self.assertEqual(len(OffsetIndex(self.path)), 5)
+
+        # an edit before all features rescans them
+        self.write([placemark(3)] + FEATURES)
+        self.assertEqual(index.update(), 5)
+        self.assertEqual([entry.id for entry in index],
+                         ['p3', 'p0', None, 'inner', 'p1'])
+        self.assertEqual(index.get('p1').name.text.strip(), 'point 1')
+
+        # an edit in the middle rescans the features after it
+        self.write([placemark(3)] + FEATURES[:3] + [placemark(4)])
+        self.assertEqual(index.update(), 1)
+        self.assertEqual(index.get('p4').name.text.strip(), 'point 4')
+        self.assertEqual(index.find('p1'), [])
+
+    def test_corrupt_index(self):
+        with open(self.path + INDEX_SUFFIX, 'wb') as f:
+            f.write(b'garbage')
+        self.assertEqual(len(OffsetIndex(self.path)), 4)
+
+        # a truncated index is rebuilt
+        with open(self.path + INDEX_SUFFIX, 'rb') as f:
+            data = f.read()
+        for length in (40, 45, len(data) - 8):
+            with open(self.path + INDEX_SUFFIX, 'wb') as f:
+                f.write(data[:length])
+            self.assertEqual(len(OffsetIndex(self.path)), 4)
+
+    def test_unwritable_index(self):
+        index_path = os.path.join(self.tempdir.name, 'missing', 'doc.idx')
+        index = OffsetIndex(self.path, index_path=index_path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.get('p1').name.text.strip(), 'point 1')
+        self.assertFalse(os.path.exists(os.path.dirname(index_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
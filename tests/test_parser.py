@@ -3,18 +3,38 @@
 #
 # test_parser
 #
+import os
 import ssl
+import tempfile
+import threading
 import unittest
 from io import BytesIO
 from pathlib import Path
+from unittest import mock
 from urllib.error import URLError
 from urllib.request import urlopen
 
-from lxml import etree
+from lxml import etree, objectify
 
+import pykml.parser
+from pykml.geometry import CoordinatesRangeError
+from pykml.geometry import CoordinatesSyntaxError
+from pykml.kmz import KmzFile
+from pykml.parser import DocumentCache
+from pykml.parser import OGCKML_SCHEMA
+from pykml.parser import PARSER_POOL_SIZE
 from pykml.parser import Schema
+from pykml.parser import _parser_pool_of_thread
+from pykml.parser import check_coordinates
+from pykml.parser import clear_parser_pool
+from pykml.parser import clear_schema_cache
 from pykml.parser import fromstring
+from pykml.parser import get_xml_schema
+from pykml.parser import iterparse
+from pykml.parser import iterparse_parallel
 from pykml.parser import parse
+from pykml.parser import validate_kml_files
+from pykml.parser import validate_stream
 
 
 class ValidatorTestCase(unittest.TestCase):
@@ -27,6 +47,63 @@ class ValidatorTestCase(unittest.TestCase):
         schema = Schema('https://developers.google.com/kml/schema/kml22gx.xsd')
         self.assertTrue(isinstance(schema.schema, etree.XMLSchema))
 
+    def test_schema_cache(self):
+        """Tests that compiled schemas are shared between Schema instances"""
+        schema1 = Schema('kml22gx.xsd')
+        schema2 = Schema('kml22gx.xsd')
+        self.assertIs(schema1.schema, schema2.schema)
+        self.assertIs(get_xml_schema('kml22gx.xsd'), schema1.schema)
+        bundled_file = (Path(__file__).parent.parent /
+                        'src' / 'pykml' / 'schemas' / 'kml22gx.xsd')
+        if bundled_file.is_file():
+            self.assertIs(get_xml_schema(str(bundled_file)), schema1.schema)
+
+        # invalidate a single schema
+        ogc_schema = Schema('ogckml22.xsd').schema
+        clear_schema_cache('kml22gx.xsd')
+        self.assertIsNot(Schema('kml22gx.xsd').schema, schema1.schema)
+        self.assertIs(Schema('ogckml22.xsd').schema, ogc_schema)
+
+        # invalidate all schemas
+        clear_schema_cache()
+        self.assertIsNot(Schema('ogckml22.xsd').schema, ogc_schema)
+
+    def test_schema_cache_concurrency(self):
+        """Tests that a schema being loaded does not block other schemas,
+        and is loaded only once"""
+        clear_schema_cache()
+        ogc_schema = get_xml_schema('ogckml22.xsd')
+        load_xml_schema = pykml.parser._load_xml_schema
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def slow_load(key):
+            loads.append(key)
+            started.set()
+            release.wait(5)
+            return load_xml_schema(key)
+
+        with mock.patch.object(pykml.parser, '_load_xml_schema', slow_load):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(
+                get_xml_schema('kml22gx.xsd'))) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            self.assertTrue(started.wait(5))
+            # a cached schema is returned while another one is loading
+            self.assertIs(get_xml_schema('ogckml22.xsd'), ogc_schema)
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(loads), 1)
+        self.assertIs(results[0], results[1])
+
+    def test_initialize_schema_ogc_url(self):
+        """Tests that the OGC schema URL resolves to the bundled schema"""
+        self.assertIs(Schema(OGCKML_SCHEMA).schema,
+                      Schema('ogckml22.xsd').schema)
+
 
 class ParseKmlOgcTestCase(unittest.TestCase):
     """A collection of tests related to parsing KML OGC documents"""
@@ -203,5 +280,523 @@ class ParseKmlGxTestCase(unittest.TestCase):
             print('Unable to access the URL. Skipping test...')
 
 
+def _feature_id(elem):
+    """Called by the processes of iterparse_parallel() in the tests"""
+    return elem.get('id')
+
+
+class ParserPoolTestCase(unittest.TestCase):
+    """A collection of tests related to reusing parsers"""
+
+    def setUp(self):
+        clear_parser_pool()
+
+    def tearDown(self):
+        clear_parser_pool()
+
+    def test_parser_reuse(self):
+        """Tests that a thread reuses its parsers for the same options"""
+        test_kml = b'<kml xmlns="http://www.opengis.net/kml/2.2">' \
+                   b'<Placemark><name>a</name></Placemark></kml>'
+        schema = Schema('ogckml22.xsd')
+        for _ in range(3):
+            fromstring(test_kml)
+            parse(BytesIO(test_kml), schema=schema)
+            fromstring(test_kml, parser_options={'remove_blank_text': False})
+        pool = _parser_pool_of_thread()
+        self.assertEqual(len(pool), 3)
+
+        # the parsers still validate and recover after errors
+        with self.assertRaises(etree.XMLSyntaxError):
+            fromstring(b'<bad_element />', schema=schema)
+        with self.assertRaises(etree.XMLSyntaxError):
+            fromstring(b'<kml')
+        tree = fromstring(test_kml, schema=schema)
+        self.assertEqual(tree.Placemark.name, 'a')
+        self.assertEqual(len(pool), 3)
+
+        # options that cannot be hashed are not pooled
+        fromstring(test_kml, parser_options={'target': None, 'resolve_entities': []})
+        self.assertEqual(len(pool), 3)
+
+    def test_parser_pool_size(self):
+        """Tests that the least recently used parsers are dropped"""
+        test_kml = b'<kml xmlns="http://www.opengis.net/kml/2.2"/>'
+        for size in range(PARSER_POOL_SIZE + 2):
+            fromstring(test_kml, parser_options={'huge_tree': bool(size % 2),
+                                                 'collect_ids': size})
+        pool = _parser_pool_of_thread()
+        self.assertEqual(len(pool), PARSER_POOL_SIZE)
+        self.assertNotIn((('collect_ids', 0),), [key[:1] for key in pool])
+
+    def test_parser_pool_threads(self):
+        """Tests that threads do not share parsers"""
+        test_kml = b'<kml xmlns="http://www.opengis.net/kml/2.2"/>'
+        fromstring(test_kml)
+        parsers = list(_parser_pool_of_thread().values())
+
+        def parse_in_thread():
+            fromstring(test_kml)
+            parsers.extend(_parser_pool_of_thread().values())
+
+        thread = threading.Thread(target=parse_in_thread)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(parsers), 2)
+        self.assertIsNot(parsers[0], parsers[1])
+
+
+class IterparseTestCase(unittest.TestCase):
+    """A collection of tests related to incrementally parsing KML documents"""
+
+    test_kml = \
+        b'<kml xmlns="http://www.opengis.net/kml/2.2">' \
+        b'<Document>' \
+        b'<Style id="style"/>' \
+        b'<Folder>' \
+        b'<name>folder</name>' \
+        b'<Placemark>' \
+        b'<name>first</name>' \
+        b'<description><![CDATA[<b>bold</b>]]></description>' \
+        b'<Point><coordinates>1,2</coordinates></Point>' \
+        b'</Placemark>' \
+        b'<Placemark>' \
+        b'<name>second</name>' \
+        b'</Placemark>' \
+        b'</Folder>' \
+        b'</Document>' \
+        b'</kml>'
+
+    def test_iterparse_placemarks(self):
+        """Tests that complete objectify Placemarks are yielded in order"""
+        names = []
+        for placemark in iterparse(BytesIO(self.test_kml)):
+            self.assertIsInstance(placemark, objectify.ObjectifiedElement)
+            self.assertEqual(placemark.tag,
+                             '{http://www.opengis.net/kml/2.2}Placemark')
+            names.append(placemark.name.text)
+            if placemark.name == 'first':
+                self.assertEqual(placemark.Point.coordinates, '1,2')
+                self.assertEqual(
+                    etree.tostring(placemark.description),
+                    b'<description xmlns="http://www.opengis.net/kml/2.2">'
+                    b'<![CDATA[<b>bold</b>]]></description>'
+                )
+        self.assertEqual(names, ['first', 'second'])
+
+    def test_iterparse_clears_processed_elements(self):
+        """Tests that processed elements are removed from the tree"""
+        placemarks = iterparse(BytesIO(self.test_kml))
+        first = next(placemarks)
+        folder = first.getparent()
+        self.assertEqual(len(folder.getchildren()), 3)
+        second = next(placemarks)
+        # the folder name has been removed and the first placemark cleared
+        self.assertEqual(folder.getchildren(), [first, second])
+        self.assertEqual(len(first.getchildren()), 0)
+        self.assertEqual(second.name, 'second')
+        list(placemarks)
+        self.assertEqual(folder.getchildren(), [second])
+
+    def test_iterparse_nested_tags(self):
+        """Tests that enclosing matches are yielded intact after their children"""
+        tags = [el.tag.split('}')[1]
+                for el in iterparse(BytesIO(self.test_kml),
+                                    tag=('Folder', 'Placemark'))]
+        self.assertEqual(tags, ['Placemark', 'Placemark', 'Folder'])
+
+        folder = next(iterparse(BytesIO(self.test_kml), tag='Folder'))
+        self.assertEqual(folder.name, 'folder')
+        self.assertEqual(len(folder.Placemark), 2)
+
+    def test_iterparse_kml_file(self):
+        """Tests incrementally parsing a local KML file, with validation"""
+        test_datafile = (Path(__file__).parent /
+                         'testfiles' /
+                         'google_kml_developers_guide' /
+                         'complete_tour_example.kml')
+        placemarks = list(pm.get('id') or pm.get('targetId') for pm in
+                          iterparse(test_datafile,
+                                    schema=Schema('kml22gx.xsd')))
+        self.assertEqual(placemarks,
+                         ['pin2', 'mountainpin1', 'pin2', 'polygon1'])
+
+        flytos = list(iterparse(str(test_datafile),
+                                tag='{http://www.google.com/kml/ext/2.2}FlyTo'))
+        self.assertEqual(len(flytos), 5)
+
+    def test_iterparse_invalid_kml_document(self):
+        """Tests incrementally parsing an invalid KML document"""
+        test_kml = b'<kml xmlns="http://www.opengis.net/kml/2.2">' \
+                   b'<Placemark><bad_element/></Placemark>' \
+                   b'</kml>'
+        with self.assertRaises(etree.XMLSyntaxError):
+            list(iterparse(BytesIO(test_kml), schema=Schema('ogckml22.xsd')))
+
+
+class IterparseParallelTestCase(unittest.TestCase):
+    """A collection of tests related to parsing the features of a KML file in
+    parallel"""
+
+    test_kml = b'<?xml version="1.0" encoding="UTF-8"?>\n' \
+               b'<!-- <Placemark> -->\n' \
+               b'<kml xmlns="http://www.opengis.net/kml/2.2"' \
+               b' xmlns:gx="http://www.google.com/kml/ext/2.2"><Document>' \
+               b'<Style id="style"/>' \
+               b'<Folder id="folder"><Placemark id="inner"/></Folder>' \
+               b'<Placemark id="cdata"><description>' \
+               b'<![CDATA[<Placemark> </Folder>]]></description>' \
+               b'<gx:Track/></Placemark>' \
+               b'<!-- </Placemark> -->' \
+               b'<Placemark id="empty" targetId=">"/>' \
+               b'</Document></kml>'
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempdir.name) / 'features.kml'
+        self.path.write_bytes(self.test_kml)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_iterparse_parallel(self):
+        """Tests parsing the outermost features, in one and several processes"""
+        for jobs in (1, 2):
+            elements = list(iterparse_parallel(self.path, jobs=jobs, chunk_size=1))
+            self.assertEqual([el.get('id') for el in elements],
+                             ['folder', 'cdata', 'empty'])
+            self.assertEqual(elements[0].Placemark.get('id'), 'inner')
+            self.assertEqual(
+                etree.tostring(elements[1].description),
+                b'<description xmlns="http://www.opengis.net/kml/2.2"'
+                b' xmlns:gx="http://www.google.com/kml/ext/2.2">'
+                b'<![CDATA[<Placemark> </Folder>]]></description>')
+            self.assertEqual(len(elements[1].findall(
+                '{http://www.google.com/kml/ext/2.2}Track')), 1)
+
+    def test_iterparse_parallel_func(self):
+        """Tests calling a function with each feature in the processes"""
+        ids = list(iterparse_parallel(str(self.path), _feature_id, jobs=2,
+                                      chunk_size=1))
+        self.assertEqual(ids, ['folder', 'cdata', 'empty'])
+        ids = list(iterparse_parallel(self.path, _feature_id, jobs=2,
+                                      ordered=False, chunk_size=1))
+        self.assertEqual(sorted(ids), ['cdata', 'empty', 'folder'])
+        ids = list(iterparse_parallel(self.path, _feature_id, tag='Placemark',
+                                      jobs=1))
+        self.assertEqual(ids, ['inner', 'cdata', 'empty'])
+
+    def test_iterparse_parallel_invalid(self):
+        """Tests parsing files that cannot be split"""
+        self.path.write_bytes(b'<!-- <kml> -->')
+        with self.assertRaises(ValueError):
+            list(iterparse_parallel(self.path, jobs=1))
+        self.path.write_bytes(b'<kml><Placemark></Placemark></Placemark></kml>')
+        with self.assertRaises(ValueError):
+            list(iterparse_parallel(self.path, jobs=1))
+        self.path.write_bytes(b'<kml><Placemark><![CDATA[</Placemark></kml>')
+        with self.assertRaises(ValueError):
+            list(iterparse_parallel(self.path, jobs=1))
+        self.path.write_bytes(b'<kml><Placemark><bad></Placemark></kml>')
+        with self.assertRaises(etree.XMLSyntaxError):
+            list(iterparse_parallel(self.path, jobs=1))
+
+
+class DocumentCacheTestCase(unittest.TestCase):
+    """A collection of tests related to caching parsed documents"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tempdir.name) / 'doc.kml'
+        self.write(self.path, 'first')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    @staticmethod
+    def write(path, name):
+        stat = path.stat() if path.exists() else None
+        path.write_bytes(
+            b'<kml xmlns="http://www.opengis.net/kml/2.2"><Placemark><name>'
+            + name.encode() + b'</name></Placemark></kml>'
+        )
+        if stat is not None:
+            # the modification time may not change within the same clock tick
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+    def test_copies(self):
+        """Tests that cached documents are returned as independent copies"""
+        cache = DocumentCache()
+        doc = cache.parse(self.path)
+        self.assertEqual(doc.getroot().Placemark.name, 'first')
+        self.assertEqual(doc.docinfo.URL, str(self.path))
+        doc.getroot().Placemark.name = 'changed'
+        again = cache.parse(self.path)
+        self.assertEqual(again.getroot().Placemark.name, 'first')
+        self.assertIsNot(again.getroot(), doc.getroot())
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.documents), (1, 1, 1))
+
+    def test_mtime(self):
+        """Tests that changed files are parsed again"""
+        cache = DocumentCache()
+        cache.parse(self.path)
+        self.write(self.path, 'second')
+        self.assertEqual(cache.parse(self.path).getroot().Placemark.name, 'second')
+        self.assertEqual(cache.parse(str(self.path)).getroot().Placemark.name, 'second')
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.documents), (1, 2, 1))
+
+    def test_changed_while_parsed(self):
+        """Tests that files that change while they are parsed are not cached"""
+        def parse_and_write(*args):
+            doc = parse(*args)
+            self.write(self.path, 'second')
+            return doc
+
+        cache = DocumentCache()
+        with mock.patch.object(pykml.parser, 'parse', parse_and_write):
+            self.assertEqual(cache.parse(self.path).getroot().Placemark.name, 'first')
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.parse(self.path).getroot().Placemark.name, 'second')
+        self.assertEqual(len(cache), 1)
+
+    def test_hash(self):
+        """Tests that files with the same contents share a document"""
+        cache = DocumentCache(key='hash')
+        other = Path(self.tempdir.name) / 'other.kml'
+        other.write_bytes(self.path.read_bytes())
+        cache.parse(self.path)
+        self.assertEqual(cache.parse(other).docinfo.URL, str(other))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(cache.parse(f).getroot().Placemark.name, 'first')
+        self.write(self.path, 'second')
+        self.assertEqual(cache.parse(self.path).getroot().Placemark.name, 'second')
+        self.assertEqual(cache.cache_info()[:4], (2, 2, 0, 2))
+
+    def test_options(self):
+        """Tests that documents are cached for their schema and options"""
+        cache = DocumentCache()
+        cache.parse(self.path)
+        cache.parse(self.path, schema=Schema('ogckml22.xsd'))
+        cache.parse(self.path, parser_options={'remove_blank_text': True})
+        cache.parse(self.path, schema=Schema('ogckml22.xsd'))
+        self.assertEqual(cache.cache_info()[:4], (1, 3, 0, 3))
+        with self.assertRaises(ValueError):
+            DocumentCache(key='name')
+
+    def test_eviction(self):
+        """Tests that the least recently used documents are evicted"""
+        paths = [Path(self.tempdir.name) / f'{i}.kml' for i in range(3)]
+        for i, path in enumerate(paths):
+            self.write(path, str(i))
+        size = paths[0].stat().st_size
+        cache = DocumentCache(max_size=2 * size)
+        cache.parse(paths[0])
+        cache.parse(paths[1])
+        cache.parse(paths[0])
+        cache.parse(paths[2])
+        info = cache.cache_info()
+        self.assertEqual(info, (1, 3, 1, 2, 2 * size, 2 * size))
+        cache.parse(paths[0])
+        self.assertEqual(cache.cache_info().hits, 2)
+        cache.parse(paths[1])
+        self.assertEqual(cache.cache_info().misses, 4)
+
+        # documents larger than the cache are not kept
+        cache = DocumentCache(max_size=size - 1)
+        cache.parse(paths[0])
+        self.assertEqual(len(cache), 0)
+        cache.clear()
+        self.assertEqual(cache.cache_info(), (0, 0, 0, 0, 0, size - 1))
+
+
+class ValidateKmlFilesTestCase(unittest.TestCase):
+    """A collection of tests related to validating many KML files"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.valid_file = Path(self.tempdir.name) / 'valid.kml'
+        self.valid_file.write_bytes(
+            b'<kml xmlns="http://www.opengis.net/kml/2.2">'
+            b'<Placemark><name>valid</name></Placemark>'
+            b'</kml>'
+        )
+        self.invalid_file = Path(self.tempdir.name) / 'invalid.kml'
+        self.invalid_file.write_bytes(
+            b'<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+            b'<Placemark><bad_element/></Placemark>\n'
+            b'</kml>'
+        )
+        self.malformed_file = Path(self.tempdir.name) / 'malformed.kml'
+        self.malformed_file.write_bytes(b'<kml>')
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_validate_kml_files(self):
+        """Tests validating several files in worker processes"""
+        uris = [str(self.valid_file), str(self.invalid_file),
+                str(self.malformed_file)] * 2
+        results = list(validate_kml_files(uris, jobs=2))
+
+        self.assertEqual([result['uri'] for result in results], uris)
+        self.assertEqual([result['valid'] for result in results],
+                         [True, False, False] * 2)
+        self.assertEqual(results[0]['errors'], [])
+        self.assertEqual(results[1]['errors'][0]['line'], 2)
+        self.assertIn('bad_element', results[1]['errors'][0]['message'])
+        self.assertIn('Invalid XML', results[2]['errors'][0]['message'])
+        for result in results:
+            self.assertGreaterEqual(result['seconds'], 0)
+
+    def test_validate_kml_files_gx_schema(self):
+        """Tests validating files in the current process"""
+        test_datafile = (Path(__file__).parent /
+                         'testfiles' /
+                         'google_kml_developers_guide' /
+                         'complete_tour_example.kml')
+        results = list(validate_kml_files([str(test_datafile)],
+                                          schema_uri='kml22gx.xsd'))
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]['valid'])
+
+        missing_file = str(Path(self.tempdir.name) / 'missing.kml')
+        results = list(validate_kml_files([missing_file], jobs=1))
+        self.assertFalse(results[0]['valid'])
+
+    def test_validate_kml_files_streaming(self):
+        """Tests validating files while they are parsed"""
+        uris = [str(self.valid_file), str(self.invalid_file),
+                str(self.malformed_file)]
+        results = list(validate_kml_files(uris, jobs=2, streaming=True))
+        self.assertEqual([result['valid'] for result in results],
+                         [True, False, False])
+        self.assertEqual(results[1]['errors'][0]['line'], 2)
+        self.assertIn('bad_element', results[1]['errors'][0]['message'])
+        self.assertIn('Invalid XML', results[2]['errors'][0]['message'])
+
+    def test_validate_kml_files_max_errors(self):
+        """Tests limiting the errors reported by streaming validation"""
+        path = Path(self.tempdir.name) / 'errors.kml'
+        path.write_bytes(b'<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n' +
+                         b'<Placemark><visibility>maybe</visibility></Placemark>\n' * 3 +
+                         b'</Document>\n</kml>\n')
+        uris = [str(path)] * 2
+        for max_errors, count in ((1, 1), (None, 3)):
+            results = list(validate_kml_files(uris, jobs=2, streaming=True,
+                                              max_errors=max_errors))
+            self.assertEqual([len(result['errors']) for result in results],
+                             [count, count])
+
+
+class ValidateStreamTestCase(unittest.TestCase):
+    """A collection of tests related to validating KML while parsing"""
+
+    def make_kml(self, placemarks):
+        return (b'<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n' +
+                b''.join(placemarks) + b'</Document>\n</kml>\n')
+
+    def test_validate_stream(self):
+        valid = b'<Placemark><name>p</name><Point><coordinates>1,2</coordinates>' \
+                b'</Point></Placemark>\n'
+        invalid = b'<Placemark><visibility>maybe</visibility></Placemark>\n'
+        placemarks = [valid] * 5000
+        for line in (10, 20, 30):
+            # lines are counted from 1, after the two lines of the header
+            placemarks[line - 3] = invalid
+        test_kml = self.make_kml(placemarks)
+
+        schema = Schema('ogckml22.xsd')
+        self.assertEqual(validate_stream(BytesIO(self.make_kml([valid] * 5000)),
+                                         schema), [])
+
+        errors = validate_stream(BytesIO(test_kml), schema)
+        self.assertEqual([error['line'] for error in errors], [10, 20, 30])
+        self.assertIn('visibility', errors[0]['message'])
+
+        errors = validate_stream(BytesIO(test_kml), schema, max_errors=2)
+        self.assertEqual([error['line'] for error in errors], [10, 20])
+
+    def test_validate_stream_order(self):
+        """Tests that the order of the children of containers is checked"""
+        test_kml = b'<kml xmlns="http://www.opengis.net/kml/2.2"><Document>\n' \
+                   b'<Placemark><name>a</name></Placemark>\n' \
+                   b'<Placemark><name>b</name></Placemark>\n' \
+                   b'<name>late</name>\n' \
+                   b'<Style><IconStyle><scale>1</scale></IconStyle></Style>\n' \
+                   b'</Document></kml>'
+        errors = validate_stream(BytesIO(test_kml), Schema('ogckml22.xsd'))
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['line'], 4)
+        self.assertIn('name', errors[0]['message'])
+
+    def test_validate_stream_malformed(self):
+        errors = validate_stream(BytesIO(b'<kml>\n<Document>\n</kml>'),
+                                 Schema('ogckml22.xsd'))
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['line'], 3)
+        self.assertIn('Invalid XML', errors[0]['message'])
+
+    def test_validate_stream_kml_file(self):
+        test_datafile = (Path(__file__).parent /
+                         'testfiles' /
+                         'google_kml_developers_guide' /
+                         'complete_tour_example.kml')
+        self.assertEqual(validate_stream(test_datafile, Schema('kml22gx.xsd')), [])
+
+
+
+class CheckCoordinatesTestCase(unittest.TestCase):
+    """A collection of tests related to checking coordinates while parsing"""
+
+    def make_kml(self, coordinates):
+        placemarks = [b'<Placemark><LineString><coordinates>%s</coordinates>'
+                      b'</LineString></Placemark>\n' % text for text in coordinates]
+        return (b'<kml xmlns="http://www.opengis.net/kml/2.2"\n'
+                b' xmlns:gx="http://www.google.com/kml/ext/2.2">\n<Document>\n' +
+                b''.join(placemarks) + b'</Document>\n</kml>\n')
+
+    def test_check_coordinates(self):
+        coordinates = [b'%d,%d,0 %d,%d' % (i % 360 - 180, i % 180 - 90, i % 10, 0)
+                       for i in range(2500)]
+        self.assertIsNone(check_coordinates(BytesIO(self.make_kml(coordinates))))
+
+        for index, text, error in ((0, b'1,2 3', CoordinatesSyntaxError),
+                                   (2200, b'1,2 3,-95', CoordinatesRangeError),
+                                   (2499, b'1,2 181,0', CoordinatesRangeError)):
+            test_kml = self.make_kml(coordinates[:index] + [text] +
+                                     coordinates[index + 1:])
+            with self.assertRaises(error) as cm:
+                check_coordinates(BytesIO(test_kml))
+            # lines are counted from 1, after the three lines of the header
+            self.assertEqual(cm.exception.lineno, index + 4)
+            self.assertEqual(cm.exception.index, 1)
+
+    def test_check_gx_coords(self):
+        track = b'<gx:Track><gx:coord>1 2 3</gx:coord>\n<gx:coord>1 100 3</gx:coord>' \
+                b'</gx:Track>'
+        test_kml = self.make_kml([b'1,2']).replace(b'</Document>', track + b'</Document>')
+        with self.assertRaises(CoordinatesRangeError) as cm:
+            check_coordinates(BytesIO(test_kml))
+        self.assertEqual(cm.exception.lineno, 6)
+        self.assertIn('latitude', str(cm.exception))
+
+    def test_check_coordinates_kmz(self):
+        test_datafile = (Path(__file__).parent /
+                         'testfiles' /
+                         'google_kml_developers_guide' /
+                         'complete_tour_example.kml')
+        self.assertIsNone(check_coordinates(test_datafile))
+        buffer = BytesIO()
+        with KmzFile(buffer, 'w') as kmz:
+            kmz.write('doc.kml', self.make_kml([b'1,2', b'1,2 -200,0']))
+        buffer.seek(0)
+        with self.assertRaises(CoordinatesRangeError):
+            check_coordinates(buffer)
+        with self.assertRaises(etree.XMLSyntaxError):
+            check_coordinates(BytesIO(b'<kml>\n<Document>\n</kml>'))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,167 @@
+#
+# coding: utf-8
+#
+# test_regionator
+#
+import os
+import tempfile
+import unittest
+import warnings
+from io import BytesIO
+from unittest import mock
+
+from lxml import etree
+
+from pykml.factory import GX_ElementMaker as GX
+from pykml.factory import KML_ElementMaker as KML
+from pykml.parser import Schema
+from pykml.parser import parse
+from pykml.parser import iterparse
+from pykml.regionator import SHARED_NAME
+from pykml.regionator import regionate
+from pykml.regionator import tile_file_name
+
+NS = '{http://www.opengis.net/kml/2.2}'
+
+
+def make_document():
+    """Creates a document with a 10 x 10 grid of points, a line across the
+    grid and a placemark without geometry"""
+    placemarks = [
+        KML.Placemark(
+            KML.name(f'{x},{y}'),
+            KML.styleUrl('#point'),
+            KML.Point(KML.coordinates(f'{x},{y}')),
+        )
+        for x in range(10) for y in range(10)
+    ]
+    placemarks.append(KML.Placemark(
+        KML.name('line'),
+        KML.LineString(KML.coordinates('0,0 9,9')),
+    ))
+    placemarks.append(KML.Placemark(KML.name('nowhere')))
+    return KML.kml(KML.Document(
+        KML.Style(KML.IconStyle(KML.scale(2)), id='point'),
+        *placemarks
+    ))
+
+
+def read_tiles(directory, name):
+    """Returns the placemark names of a tile and its descendants, by tile
+    file name"""
+    tile = parse(os.path.join(directory, name)).getroot()
+    names = {name: [pm.name.text for pm in tile.Document.iterchildren(NS + 'Placemark')]}
+    for link in tile.Document.iterchildren(NS + 'NetworkLink'):
+        names.update(read_tiles(directory, link.Link.href.text))
+    return names
+
+
+class RegionateTestCase(unittest.TestCase):
+    def check_tiles(self, directory, root):
+        self.assertEqual(root, os.path.join(directory, 'doc.kml'))
+        tiles = read_tiles(directory, 'doc.kml')
+        names = [name for tile_names in tiles.values() for name in tile_names]
+        self.assertEqual(sorted(names), sorted(
+            [f'{x},{y}' for x in range(10) for y in range(10)] + ['line', 'nowhere']))
+        self.assertTrue(all(len(tile_names) <= 10 for name, tile_names in tiles.items()
+                            if name != 'doc.kml'))
+        # the largest feature and the features without geometry are in the root
+        self.assertIn('line', tiles['doc.kml'])
+        self.assertIn('nowhere', tiles['doc.kml'])
+        self.assertIn(tile_file_name('0'), tiles)
+
+        schema = Schema('kml22gx.xsd')
+        for name in list(tiles) + [SHARED_NAME]:
+            self.assertTrue(schema.validate(parse(os.path.join(directory, name))), name)
+
+        tile = parse(os.path.join(directory, tile_file_name('0'))).getroot()
+        box = tile.Document.Region.LatLonAltBox
+        self.assertEqual((box.west, box.south, box.east, box.north), (0, 4.5, 4.5, 9))
+        self.assertEqual(tile.Document.Placemark.styleUrl.text, SHARED_NAME + '#point')
+        shared = parse(os.path.join(directory, SHARED_NAME)).getroot()
+        self.assertEqual(shared.Document.Style.get('id'), 'point')
+        return tiles
+
+    def test_regionate_document(self):
+        with tempfile.TemporaryDirectory() as directory:
+            root = regionate(make_document(), directory, max_features=10, jobs=1)
+            self.check_tiles(directory, root)
+
+    def test_regionate_stream(self):
+        source = BytesIO(etree.tostring(make_document()))
+        with tempfile.TemporaryDirectory() as directory:
+            root = regionate(source, directory, max_features=10, jobs=2)
+            tiles = self.check_tiles(directory, root)
+        with tempfile.TemporaryDirectory() as directory:
+            regionate(make_document(), directory, max_features=10, jobs=1)
+            self.assertEqual(read_tiles(directory, 'doc.kml'), tiles)
+
+    def test_max_depth(self):
+        doc = KML.kml(KML.Document(*[
+            KML.Placemark(KML.name(str(i)), KML.Point(KML.coordinates('1,1')))
+            for i in range(20)
+        ]))
+        with tempfile.TemporaryDirectory() as directory:
+            regionate(doc, directory, max_features=5, max_depth=2, jobs=1)
+            tiles = read_tiles(directory, 'doc.kml')
+        self.assertEqual(max(map(len, tiles)), len(tile_file_name('00')))
+        self.assertEqual(sum(map(len, tiles.values())), 20)
+
+    def test_overlays_and_folders(self):
+        """Tests that overlays and NetworkLinks are kept in the root tile,
+        and that Folders are reported"""
+        doc = KML.kml(KML.Document(
+            KML.GroundOverlay(
+                KML.name('ground'),
+                KML.Icon(KML.href('ground.png')),
+                GX.LatLonQuad(KML.coordinates('0,0 1,0 1,1 0,1')),
+            ),
+            KML.Folder(
+                KML.name('folder'),
+                KML.ScreenOverlay(KML.name('screen')),
+                KML.NetworkLink(KML.name('link'), KML.Link(KML.href('other.kml'))),
+                *[KML.Placemark(KML.name(str(i)), KML.Point(KML.coordinates(f'{i},{i}')))
+                  for i in range(4)]
+            ),
+        ))
+        for source in (doc, BytesIO(etree.tostring(doc))):
+            with tempfile.TemporaryDirectory() as directory:
+                with self.assertWarns(UserWarning):
+                    regionate(source, directory, max_features=2, jobs=1)
+                root = parse(os.path.join(directory, 'doc.kml')).getroot()
+                self.assertTrue(Schema('kml22gx.xsd').validate(root))
+            self.assertEqual(root.Document.GroundOverlay.name, 'ground')
+            self.assertEqual(root.Document.ScreenOverlay.name, 'screen')
+            self.assertEqual([el.name.text for el in root.Document.NetworkLink],
+                             ['link', tile_file_name('1')])
+
+        with tempfile.TemporaryDirectory() as directory:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                regionate(make_document(), directory, max_features=10, jobs=1)
+
+    def test_stream_folder(self):
+        """Tests that the Placemarks of a Folder are released as they are
+        read"""
+        doc = KML.kml(KML.Document(KML.Folder(*[
+            KML.Placemark(KML.name(str(i)), KML.Point(KML.coordinates(f'{i % 90},0')))
+            for i in range(3000)
+        ])))
+        siblings = []
+
+        def counting_iterparse(*args, **kwargs):
+            for el in iterparse(*args, **kwargs):
+                siblings.append(el.getparent().countchildren())
+                yield el
+
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('pykml.regionator.iterparse', counting_iterparse):
+            with self.assertWarns(UserWarning):
+                regionate(BytesIO(etree.tostring(doc)), directory, jobs=1)
+            tiles = read_tiles(directory, 'doc.kml')
+        self.assertEqual(sum(map(len, tiles.values())), 3000)
+        self.assertLess(max(siblings), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#
+# coding: utf-8
+#
+# test_simplify
+#
+import math
+import unittest
+from array import array
+from io import BytesIO
+from unittest import mock
+
+from lxml import etree
+
+import pykml.simplify
+from pykml.factory import GX_ElementMaker as GX
+from pykml.factory import KML_ElementMaker as KML
+from pykml.geometry import coords_array
+from pykml.geometry import numpy
+from pykml.simplify import DOUGLAS_PEUCKER
+from pykml.simplify import VISVALINGAM
+from pykml.simplify import iter_simplified
+from pykml.simplify import simplify
+from pykml.simplify import simplify_coords
+from pykml.simplify import simplify_geometry
+from pykml.simplify import simplify_indices
+
+
+def zigzag(count, amplitude):
+    """Returns a line along the equator that oscillates by `amplitude`"""
+    coords = array('d')
+    for i in range(count):
+        coords.extend((i * 0.01, amplitude * (-1) ** i, float(i)))
+    return coords
+
+
+def circle(count, radius=1.0):
+    coords = array('d')
+    for i in range(count):
+        angle = 2 * math.pi * i / count
+        coords.extend((radius * math.cos(angle), radius * math.sin(angle), 0.0))
+    coords.extend(coords[:3])
+    return coords
+
+
+def format_coords(coords):
+    return ' '.join(f'{coords[i]},{coords[i + 1]}' for i in range(0, len(coords), 3))
+
+
+class SimplifyCoordsTestCase(unittest.TestCase):
+    def test_line(self):
+        coords = zigzag(100, 1e-6)
+        for method in (DOUGLAS_PEUCKER, VISVALINGAM):
+            self.assertEqual(simplify_indices(coords, 1e-3, method), [0, 99])
+            self.assertEqual(len(simplify_indices(coords, 1e-7, method)), 100)
+        self.assertEqual(list(simplify_coords(coords, 1e-3)),
+                         [0.0, 1e-6, 0.0, 0.99, -1e-6, 99.0])
+
+    def test_douglas_peucker_keeps_far_vertices(self):
+        coords = array('d', [0, 0, 0, 1, 0.5, 0, 2, 0.26, 0, 3, 0, 0])
+        self.assertEqual(simplify_indices(coords, 0.1), [0, 1, 3])
+
+    def test_ring(self):
+        coords = circle(360)
+        for method in (DOUGLAS_PEUCKER, VISVALINGAM):
+            with self.subTest(method=method):
+                indices = simplify_indices(coords, 10.0, method)
+                self.assertEqual(len(indices), 4)
+                self.assertEqual((indices[0], indices[-1]), (0, 360))
+                indices = simplify_indices(coords, 0.01, method)
+                self.assertLess(len(indices), 100)
+                self.assertGreater(len(indices), 10)
+
+    def test_pure_python(self):
+        coords = zigzag(50, 0.02) + circle(50)
+        with mock.patch.object(pykml.simplify, 'numpy', None):
+            expected = [simplify_indices(coords, 0.01, method)
+                        for method in (DOUGLAS_PEUCKER, VISVALINGAM)]
+        self.assertEqual(expected, [simplify_indices(coords, 0.01, method)
+                                    for method in (DOUGLAS_PEUCKER, VISVALINGAM)])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        coords = numpy.frombuffer(zigzag(10, 1e-6), dtype=numpy.float64).reshape(-1, 3)
+        simplified = simplify_coords(coords, 1e-3)
+        self.assertEqual(simplified.shape, (2, 3))
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            simplify_indices(zigzag(10, 0), 1.0, 'bezier')
+
+
+class SimplifyGeometryTestCase(unittest.TestCase):
+    def test_line_string(self):
+        line = KML.LineString(KML.coordinates('0,0,1 1,0.00001,2 2.0,0,3'))
+        self.assertEqual(simplify_geometry(line, 0.001), 1)
+        self.assertEqual(line.coordinates.text, '0,0,1 2.0,0,3')
+
+    def test_linear_ring(self):
+        ring = KML.LinearRing(KML.coordinates(format_coords(circle(100))))
+        simplify_geometry(ring, 10.0)
+        coords = coords_array(ring)
+        self.assertEqual(len(coords), 12)
+        self.assertEqual(list(coords[:3]), list(coords[-3:]))
+
+    def test_polygon_holes(self):
+        # the hole is inside a bump of the outer ring, which is removed by
+        # the tolerance
+        outer = array('d', [0, 0, 0, 5, 0.001, 0, 10, 0, 0, 10, 10, 0,
+                            5.5, 10, 0, 5, 10.5, 0, 4.5, 10, 0, 0, 10, 0, 0, 0, 0])
+        hole = array('d', [4.9, 10.1, 0, 5.1, 10.1, 0, 5, 10.3, 0, 4.9, 10.1, 0])
+        polygon = KML.Polygon(
+            KML.outerBoundaryIs(KML.LinearRing(KML.coordinates(format_coords(outer)))),
+            KML.innerBoundaryIs(KML.LinearRing(KML.coordinates(format_coords(hole)))),
+        )
+        self.assertEqual(simplify_indices(outer, 1.0), [0, 2, 3, 7, 8])
+        self.assertEqual(simplify_geometry(polygon, 1.0), 1)
+        outer_text = polygon.outerBoundaryIs.LinearRing.coordinates.text
+        self.assertIn('5.0,10.5', outer_text)
+        self.assertNotIn('5.0,0.001', outer_text)
+
+    def test_track(self):
+        track = GX.Track(
+            KML.when('2020-01-01T00:00:00Z'),
+            KML.when('2020-01-01T00:00:01Z'),
+            KML.when('2020-01-01T00:00:02Z'),
+            GX.coord('0 0 0'), GX.coord('1 0.00001 0'), GX.coord('2 0 0'),
+            KML.ExtendedData(KML.SchemaData(
+                GX.SimpleArrayData(GX.value('1'), GX.value('2'), GX.value('3'),
+                                   name='speed'),
+                schemaUrl='#schema',
+            )),
+        )
+        self.assertEqual(simplify_geometry(track, 0.001), 1)
+        self.assertEqual([when.text for when in track.iterchildren(KML.when().tag)],
+                         ['2020-01-01T00:00:00Z', '2020-01-01T00:00:02Z'])
+        self.assertEqual(list(coords_array(track)), [0, 0, 0, 2, 0, 0])
+        self.assertEqual([value.text for value in track.iter(GX.value().tag)],
+                         ['1', '3'])
+
+    def test_document(self):
+        doc = KML.kml(KML.Document(
+            KML.Placemark(KML.LineString(KML.coordinates(format_coords(zigzag(10, 1e-6))))),
+            KML.Placemark(KML.MultiGeometry(
+                KML.LineString(KML.coordinates(format_coords(zigzag(10, 1e-6)))),
+                KML.Point(KML.coordinates('0,0')),
+            )),
+        ))
+        self.assertEqual(simplify(doc, 1e-3), 16)
+
+    def test_iter_simplified(self):
+        doc = KML.kml(KML.Document(
+            KML.Placemark(KML.LineString(KML.coordinates(format_coords(zigzag(10, 1e-6))))),
+        ))
+        source = BytesIO(etree.tostring(doc))
+        lines = [len(coords_array(el)) // 3 for el in iter_simplified(source, 1e-3)]
+        self.assertEqual(lines, [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+#
+# coding: utf-8
+#
+# test_spatial
+#
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+
+from pykml.factory import GX_ElementMaker as GX
+from pykml.factory import KML_ElementMaker as KML
+from pykml.parser import parse
+from pykml.spatial import SpatialIndex
+
+
+def make_grid_document(size=20):
+    """Creates a document with a size x size grid of point placemarks"""
+    placemarks = [
+        KML.Placemark(
+            KML.name(f'{x},{y}'),
+            KML.Point(KML.coordinates(f'{x},{y}')),
+        )
+        for x in range(size) for y in range(size)
+    ]
+    return KML.kml(KML.Document(*placemarks))
+
+
+class SpatialIndexTestCase(unittest.TestCase):
+    def test_intersection(self):
+        """Tests bounding box queries"""
+        doc = make_grid_document()
+        index = SpatialIndex(doc, node_capacity=4)
+        self.assertEqual(len(index), 400)
+
+        names = [pm.name.text for pm in index.intersection((2.5, 3, 4, 4.5))]
+        # placemarks are returned in document order
+        self.assertEqual(names, ['3,3', '3,4', '4,3', '4,4'])
+        self.assertEqual(index.intersection((30, 30, 40, 40)), [])
+        self.assertEqual(len(index.intersection((-180, -90, 180, 90))), 400)
+
+    def test_nearest(self):
+        """Tests nearest neighbour queries"""
+        doc = make_grid_document()
+        index = SpatialIndex(doc, node_capacity=4)
+
+        names = [pm.name.text for pm in index.nearest(7.1, 3.2)]
+        self.assertEqual(names, ['7,3'])
+        names = [pm.name.text for pm in index.nearest(-1, -1.5, k=3)]
+        self.assertEqual(names, ['0,0', '1,0', '0,1'])
+
+    def test_geometries(self):
+        """Tests indexing lines, polygons, tracks and multiple geometries"""
+        doc = KML.kml(KML.Document(
+            KML.Placemark(
+                KML.name('line'),
+                KML.LineString(KML.coordinates('0,0,0 10,10,0')),
+            ),
+            KML.Placemark(
+                KML.name('multi'),
+                KML.MultiGeometry(
+                    KML.Point(KML.coordinates('20,20')),
+                    KML.Polygon(
+                        KML.outerBoundaryIs(KML.LinearRing(
+                            KML.coordinates('30,30 31,30 31,31 30,30'),
+                        )),
+                    ),
+                ),
+            ),
+            KML.Placemark(
+                KML.name('track'),
+                GX.Track(
+                    GX.coord('-5 -5 0'),
+                    GX.coord('-6 -6 0'),
+                ),
+            ),
+            KML.Placemark(KML.name('no geometry')),
+        ))
+        index = SpatialIndex(doc)
+        self.assertEqual(len(index), 3)
+
+        names = [pm.name.text for pm in index.intersection((5, 5, 6, 6))]
+        self.assertEqual(names, ['line'])
+        # the bounding box of a placemark covers all its geometries
+        names = [pm.name.text for pm in index.intersection((25, 25, 26, 26))]
+        self.assertEqual(names, ['multi'])
+        names = [pm.name.text for pm in index.nearest(-10, -10)]
+        self.assertEqual(names, ['track'])
+
+    def test_ground_overlay(self):
+        """Tests that the gx:LatLonQuad of a GroundOverlay is not indexed"""
+        doc = KML.kml(KML.Document(
+            KML.GroundOverlay(
+                KML.name('overlay'),
+                KML.Icon(KML.href('overlay.png')),
+                GX.LatLonQuad(KML.coordinates('0,0 1,0 1,1 0,1')),
+            ),
+            KML.Placemark(
+                KML.name('point'),
+                KML.Point(KML.coordinates('0.5,0.5')),
+            ),
+        ))
+        index = SpatialIndex(doc)
+        self.assertEqual(len(index), 1)
+        names = [pm.name.text for pm in index.intersection((0, 0, 1, 1))]
+        self.assertEqual(names, ['point'])
+
+    def test_save_load(self):
+        """Tests writing an index to disk and loading it again"""
+        doc = make_grid_document()
+        index = SpatialIndex(doc, node_capacity=4)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            index_file = Path(tempdir) / 'grid.idx'
+            index.save(index_file)
+            loaded = SpatialIndex.load(index_file, doc)
+
+        self.assertEqual(len(loaded), len(index))
+        self.assertEqual(loaded.intersection((2.5, 3, 4, 4.5)),
+                         index.intersection((2.5, 3, 4, 4.5)))
+        self.assertEqual(loaded.nearest(7.1, 3.2, k=5),
+                         index.nearest(7.1, 3.2, k=5))
+
+        f = BytesIO()
+        index.save(f)
+        f.seek(0)
+        with self.assertRaises(ValueError):
+            SpatialIndex.load(f, make_grid_document(size=3))
+        with self.assertRaises(ValueError):
+            SpatialIndex.load(BytesIO(b'not an index'), doc)
+
+    def test_parsed_document(self):
+        """Tests indexing a parsed KML file"""
+        test_datafile = (Path(__file__).parent /
+                         'testfiles' /
+                         'google_kml_developers_guide' /
+                         'complete_tour_example.kml')
+        with test_datafile.open('rb') as f:
+            doc = parse(f)
+        index = SpatialIndex(doc)
+        self.assertEqual(len(index), 3)
+        ids = [pm.get('id') for pm in index.nearest(170.157, -43.671, k=3)]
+        self.assertEqual(ids[0], 'mountainpin1')
+
+
+if __name__ == '__main__':
+    unittest.main()
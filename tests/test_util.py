@@ -5,12 +5,15 @@
 #
 import os
 import tempfile
+import struct
 import unittest
+from io import BytesIO
 from pathlib import Path
 
 import xmlunittest
 from lxml import etree
 
+from pykml.factory import GX_ElementMaker as GX
 from pykml.factory import KML_ElementMaker as KML
 from pykml.parser import Schema
 from pykml.parser import parse
@@ -41,6 +44,47 @@ class KmlUtilTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
                          summary['http://www.google.com/kml/ext/2.2']['Wait']
                          )
 
+        # the file is read incrementally and gives the same counts
+        self.assertEqual(count_elements(str(test_datafile)), summary)
+
+    def test_element_statistics(self):
+        """Tests collecting element statistics from documents and files."""
+        from pykml.util import element_statistics
+
+        doc = KML.kml(
+            KML.Document(
+                KML.name('é'),
+                KML.Placemark(
+                    KML.name('abc'),
+                    KML.Point(KML.coordinates('1,2')),
+                    id='pm1',
+                ),
+            )
+        )
+        ns = 'http://www.opengis.net/kml/2.2'
+        for source in (doc, BytesIO(etree.tostring(doc))):
+            statistics = element_statistics(source, text_bytes=True,
+                                            attributes=True, depths=True)
+            self.assertEqual(statistics.counts(), {ns: {
+                'kml': 1, 'Document': 1, 'name': 2, 'Placemark': 1,
+                'Point': 1, 'coordinates': 1,
+            }})
+            self.assertEqual(statistics.text_bytes()[ns],
+                             {'name': 5, 'coordinates': 3})
+            self.assertEqual(statistics.attribute_counts()[ns]['Placemark'], 1)
+            self.assertEqual(statistics.depth_histogram,
+                             {0: 1, 1: 1, 2: 2, 3: 2, 4: 1})
+
+        # events fed in several batches
+        from pykml.util import ElementStatistics
+        statistics = ElementStatistics(depths=True)
+        events = list(etree.iterparse(BytesIO(etree.tostring(doc)),
+                                      events=statistics.events))
+        for i in range(0, len(events), 3):
+            statistics.add_events(events[i:i + 3])
+        self.assertEqual(statistics.depth_histogram,
+                         {0: 1, 1: 1, 2: 2, 3: 2, 4: 1})
+
     def test_wrap_angle180(self):
         """Tests the wrap_angle180 utility function."""
         from pykml.util import wrap_angle180
@@ -145,6 +189,44 @@ class KmlUtilTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
              '-122.366212 37.818977 30))')
         )
 
+    def test_iter_wkt(self):
+        """Tests streaming the geometries of a document as WKT and WKB."""
+        from pykml.util import iter_wkb
+        from pykml.util import iter_wkt
+
+        doc = KML.kml(
+            KML.Document(
+                KML.Placemark(
+                    KML.name('point'),
+                    KML.Point(KML.coordinates('1,2')),
+                ),
+                KML.Placemark(
+                    KML.MultiGeometry(
+                        KML.LineString(KML.coordinates('0,0 1,1')),
+                        KML.MultiGeometry(
+                            KML.Point(KML.coordinates('3,4')),
+                        ),
+                    ),
+                ),
+                KML.Placemark(
+                    GX.Track(GX.coord('1 2 3')),
+                ),
+            )
+        )
+        expected = [
+            'POINT (1 2)',
+            'GEOMETRYCOLLECTION (LINESTRING (0 0, 1 1), MULTIPOINT ((3 4)))',
+            'LINESTRING (1 2 3)',
+        ]
+        self.assertEqual(list(iter_wkt(doc)), expected)
+        data = etree.tostring(doc)
+        self.assertEqual(list(iter_wkt(BytesIO(data))), expected)
+
+        wkb = list(iter_wkb(BytesIO(data)))
+        self.assertEqual(len(wkb), 3)
+        self.assertEqual(wkb[0], struct.pack('<BIdd', 1, 1, 1, 2))
+        self.assertEqual(wkb, list(iter_wkb(doc)))
+
     def test_getXmlWithCDATA(self):
         """tests the format_as_cdata function"""
         from pykml.util import format_xml_with_cdata
@@ -185,6 +267,100 @@ class KmlUtilTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
 
         self.assertXmlEquivalentOutputs(data, expected)
 
+    def test_format_xml_with_cdata_in_place(self):
+        """tests that format_xml_with_cdata modifies the document in place"""
+        from pykml.util import format_xml_with_cdata
+
+        kml_obj = KML.kml(
+            KML.Document(
+                KML.Placemark(
+                    KML.name('<html>'),
+                    KML.description('<html>'),
+                )
+            )
+        )
+        root = format_xml_with_cdata(kml_obj, inplace=True)
+
+        self.assertIs(root, kml_obj)
+        self.assertEqual(
+            etree.tostring(kml_obj.Document.Placemark.description),
+            b'<description xmlns="http://www.opengis.net/kml/2.2" '
+            b'xmlns:atom="http://www.w3.org/2005/Atom" '
+            b'xmlns:gx="http://www.google.com/kml/ext/2.2">'
+            b'<![CDATA[<html>]]></description>'
+        )
+        self.assertEqual(kml_obj.Document.Placemark.description, '<html>')
+
+    def test_format_xml_with_cdata_copy(self):
+        """tests that format_xml_with_cdata leaves the document unchanged by
+        default"""
+        from pykml.util import format_xml_with_cdata
+
+        kml_obj = KML.kml(KML.Document(KML.Placemark(KML.description('<html>'))))
+        original = etree.tostring(kml_obj)
+        root = format_xml_with_cdata(kml_obj)
+
+        self.assertIsNot(root, kml_obj)
+        self.assertEqual(etree.tostring(kml_obj), original)
+        self.assertIn(b'<![CDATA[<html>]]>', etree.tostring(root))
+
+    def test_write_xml_with_cdata(self):
+        """tests the write_xml_with_cdata function"""
+        from io import BytesIO
+        from pykml.util import write_xml_with_cdata
+
+        kml_obj = KML.kml(
+            KML.Document(
+                etree.Comment(' placemarks '),
+                KML.Placemark(
+                    KML.name('foobar'),
+                    KML.description('<html>'),
+                    GX.balloonVisibility('1'),
+                )
+            )
+        )
+        original = etree.tostring(kml_obj)
+
+        output = BytesIO()
+        write_xml_with_cdata(kml_obj, output)
+
+        expected = \
+            '<?xml version=\'1.0\' encoding=\'utf-8\'?>\n' \
+            '<kml xmlns="http://www.opengis.net/kml/2.2" ' \
+            'xmlns:atom="http://www.w3.org/2005/Atom" ' \
+            'xmlns:gx="http://www.google.com/kml/ext/2.2">' \
+            '<Document>' \
+            '<!-- placemarks -->' \
+            '<Placemark>' \
+            '<name>foobar</name>' \
+            '<description><![CDATA[<html>]]></description>' \
+            '<gx:balloonVisibility>1</gx:balloonVisibility>' \
+            '</Placemark>' \
+            '</Document>' \
+            '</kml>'
+        self.assertEqual(output.getvalue(), expected.encode('utf-8'))
+        # the document has not been modified
+        self.assertEqual(etree.tostring(kml_obj), original)
+
+        # CDATA sections of a parsed document are left as they were
+        doc = parse(BytesIO(
+            b'<kml xmlns="http://www.opengis.net/kml/2.2"><Placemark>'
+            b'<description><![CDATA[<b>]]></description>'
+            b'<text>&lt;i&gt;</text></Placemark></kml>'
+        )).getroot()
+        description = doc.Placemark.description
+        original = etree.tostring(doc)
+        output = BytesIO()
+        write_xml_with_cdata(doc, output, xml_declaration=False)
+        self.assertEqual(
+            output.getvalue(),
+            b'<kml xmlns="http://www.opengis.net/kml/2.2"><Placemark>'
+            b'<description><![CDATA[<b>]]></description>'
+            b'<text><![CDATA[<i>]]></text></Placemark></kml>'
+        )
+        self.assertEqual(etree.tostring(doc), original)
+        self.assertIs(doc.Placemark.description, description)
+
     def test_convert_csv_to_kml(self):
         """Tests the convert_csv_to_kml function"""
         import tempfile
@@ -261,6 +437,35 @@ class KmlUtilTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
 
         self.assertXmlEquivalentOutputs(data, expected)
 
+    def test_write_csv_to_kml(self):
+        """Tests the write_csv_to_kml function"""
+        from io import BytesIO, StringIO
+        from pykml.util import convert_csv_to_kml
+        from pykml.util import format_xml_with_cdata
+        from pykml.util import write_csv_to_kml
+
+        csv_data = \
+            'name,snippet,lat,lon,alt\n' \
+            'first,The first one,45.0,-90.0,10\n' \
+            'second,The second one,46.0,-89.0,20\n' \
+            'third,"The third one (with quotes)",45.0,-88.0,30\n'
+
+        output = BytesIO()
+        write_csv_to_kml(StringIO(csv_data), output)
+        data = output.getvalue()
+        self.assertTrue(data.startswith(b"<?xml version='1.0' encoding='utf-8'?>"))
+        self.assertEqual(data.count(b'<Placemark>'), 3)
+        self.assertIn(b'<coordinates>-89.0,46.0,20</coordinates>', data)
+
+        kmldoc = convert_csv_to_kml(StringIO(csv_data))
+        expected = etree.tostring(format_xml_with_cdata(kmldoc),
+                                  encoding='utf-8', xml_declaration=True)
+        parser = etree.XMLParser(remove_blank_text=True, strip_cdata=False)
+        self.assertEqual(
+            etree.tostring(etree.fromstring(data, parser)),
+            etree.tostring(etree.fromstring(expected, parser))
+        )
+
     def test_convert_csv_to_kml_missing_coordinate_fields(self):
         """Tests the convert_csv_to_kml function"""
         from pykml.util import convert_csv_to_kml
@@ -0,0 +1,181 @@
+#
+# coding: utf-8
+#
+# test_writer
+#
+import gzip
+import os
+import tempfile
+import unittest
+from array import array
+from io import BytesIO
+
+import xmlunittest
+from lxml import etree
+
+from pykml.factory import GX_ElementMaker as GX
+from pykml.factory import KML_ElementMaker as KML
+from pykml.kmz import KmzFile
+from pykml.parser import Schema
+from pykml.parser import parse
+from pykml.writer import KmlWriter
+
+
+def write_document(writer):
+    with writer.document(name='Export'):
+        writer.style('red', line_color='ff0000ff', line_width=2,
+                     balloon_text='<b>$[name]</b>')
+        with writer.folder(name='Features', open=True):
+            with writer.placemark(name='point', id='pm1',
+                                  description='<p>a & b</p>',
+                                  style_url='#red',
+                                  extended_data={'population': 10}):
+                writer.point((-122.1, 37.2))
+            with writer.placemark(name='shapes'):
+                with writer.multi_geometry():
+                    writer.line_string(array('d', [0, 0, 1, 1, 1, 2]),
+                                       tessellate=True)
+                    writer.polygon('0,0 1,0 1,1 0,0',
+                                   inner=[[(0.2, 0.2), (0.8, 0.2), (0.8, 0.8),
+                                           (0.2, 0.2)]])
+            with writer.placemark(name='track'):
+                writer.track(['2010-05-28T02:02:09Z'], [(-122.1, 37.2, 151.3)])
+
+
+EXPECTED = KML.kml(
+    KML.Document(
+        KML.name('Export'),
+        KML.Style(
+            KML.LineStyle(KML.color('ff0000ff'), KML.width(2)),
+            KML.BalloonStyle(KML.text('<b>$[name]</b>')),
+            id='red',
+        ),
+        KML.Folder(
+            KML.name('Features'),
+            KML.open(1),
+            KML.Placemark(
+                KML.name('point'),
+                KML.description('<p>a & b</p>'),
+                KML.styleUrl('#red'),
+                KML.ExtendedData(
+                    KML.Data(KML.value(10), name='population'),
+                ),
+                KML.Point(KML.coordinates('-122.1,37.2')),
+                id='pm1',
+            ),
+            KML.Placemark(
+                KML.name('shapes'),
+                KML.MultiGeometry(
+                    KML.LineString(
+                        KML.tessellate(1),
+                        KML.coordinates('0.0,0.0,1.0 1.0,1.0,2.0'),
+                    ),
+                    KML.Polygon(
+                        KML.outerBoundaryIs(KML.LinearRing(
+                            KML.coordinates('0,0 1,0 1,1 0,0'))),
+                        KML.innerBoundaryIs(KML.LinearRing(
+                            KML.coordinates('0.2,0.2 0.8,0.2 0.8,0.8 0.2,0.2'))),
+                    ),
+                ),
+            ),
+            KML.Placemark(
+                KML.name('track'),
+                GX.Track(
+                    KML.when('2010-05-28T02:02:09Z'),
+                    GX.coord('-122.1 37.2 151.3'),
+                ),
+            ),
+        ),
+    )
+)
+
+
+class KmlWriterTestCase(unittest.TestCase, xmlunittest.XmlTestMixin):
+    def test_write(self):
+        """Tests writing a document without building a tree"""
+        output = BytesIO()
+        with KmlWriter(output) as writer:
+            write_document(writer)
+        data = output.getvalue()
+
+        self.assertTrue(data.startswith(b"<?xml version='1.0' encoding='utf-8'?>"))
+        self.assertIn(b'<description><![CDATA[<p>a & b</p>]]></description>', data)
+        self.assertIn(b'<text><![CDATA[<b>$[name]</b>]]></text>', data)
+        self.assertXmlEquivalentOutputs(data, etree.tostring(EXPECTED))
+        self.assertTrue(Schema('kml22gx.xsd').validate(etree.fromstring(data)))
+
+    def test_escaping(self):
+        """Tests escaping text, attributes and CDATA sections"""
+        output = BytesIO()
+        with KmlWriter(output) as writer:
+            with writer.placemark(name='<a & b>', id='"1"',
+                                  description='x ]]> y'):
+                writer.element('{http://www.google.com/kml/ext/2.2}balloonVisibility',
+                               True)
+        root = etree.fromstring(output.getvalue())
+        placemark = root[0]
+        self.assertEqual(placemark.get('id'), '"1"')
+        self.assertEqual(placemark[0].text, '<a & b>')
+        self.assertEqual(placemark[1].text, 'x ]]> y')
+        self.assertEqual(placemark[2].tag,
+                         '{http://www.google.com/kml/ext/2.2}balloonVisibility')
+        self.assertEqual(placemark[2].text, '1')
+
+        with self.assertRaises(ValueError):
+            with KmlWriter(BytesIO()) as writer:
+                writer.element('{urn:unknown}name', 'x')
+
+    def test_containers(self):
+        """Tests that containers are only written when they are entered"""
+        output = BytesIO()
+        with KmlWriter(output) as writer:
+            writer.folder(name='unused')
+            placemark = writer.placemark(name='a')
+            writer.element('name', 'document')
+            with placemark:
+                writer.point((1, 2))
+        root = etree.fromstring(output.getvalue())
+        self.assertEqual([el.tag.rpartition('}')[2] for el in root],
+                         ['name', 'Placemark'])
+        self.assertEqual(root[1][0].text, 'a')
+
+    def test_pretty_print(self):
+        """Tests writing an indented document"""
+        output = BytesIO()
+        with KmlWriter(output, pretty_print=True, cdata_elements=()) as writer:
+            write_document(writer)
+        self.assertEqual(
+            output.getvalue(),
+            etree.tostring(EXPECTED, pretty_print=True, encoding='utf-8',
+                           xml_declaration=True)
+        )
+
+    def test_compression(self):
+        """Tests writing gzip files and KMZ archives"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'test.kml.gz')
+            with KmlWriter(path) as writer:
+                write_document(writer)
+            with gzip.open(path) as f:
+                self.assertXmlEquivalentOutputs(f.read(), etree.tostring(EXPECTED))
+
+            path = os.path.join(tmpdir, 'test.kmz')
+            with KmlWriter(path, compresslevel=9) as writer:
+                write_document(writer)
+            with KmzFile(path) as kmz:
+                self.assertEqual(kmz.namelist(), ['doc.kml'])
+            root = parse(path).getroot()
+            self.assertEqual(root.Document.Folder.Placemark.name, 'point')
+
+        output = BytesIO()
+        with KmlWriter(output, compression='kmz') as writer:
+            writer.write(KML.Placemark(KML.name('written')))
+        output.seek(0)
+        self.assertEqual(parse(output).getroot().Placemark.name, 'written')
+
+        with self.assertRaises(ValueError):
+            KmlWriter(BytesIO(), compression='bz2')
+
+
+if __name__ == '__main__':
+    unittest.main()